@@ -8,12 +8,16 @@ import pytest
 import numpy as np
 import pandas as pd
 
-from distributed import Client
-
 
 @pytest.fixture(scope='session')
 def dask_client():
-    return Client()
+    # Only the tests that exercise the dask executor pay for a cluster, and
+    # it's an in-process one, without nannies or a dashboard.
+    from distributed import Client # pylint: disable=import-outside-toplevel
+
+    client = Client(processes=False, dashboard_address=None)
+    yield client
+    client.close()
 
 @pytest.fixture
 def multinomial_RV():
@@ -0,0 +1,196 @@
+"""
+    adjacencies.py
+
+    Mutable adjacency bookkeeping for skeleton searches, with degree
+    counters that get updated as edges are removed.
+
+    - Adjacencies
+    - candidate_tests
+"""
+
+import heapq
+
+
+class Adjacencies:
+    """
+        The neighbors of each node, their number (degree), and a heap of
+        degrees for the largest one.
+
+        Removing an edge updates the two degrees and pushes them on the heap.
+        Entries made stale by later removals are dropped lazily, so
+        "max_degree" is O(1) amortized.
+
+        Edges are also kept in buckets by the larger degree of their two
+        endpoints. Removing an edge only moves the edges of its endpoints
+        to their new buckets, and "edges_to_test" reads whole buckets
+        instead of going through every node.
+
+        Parameters:
+            adjacencies: dict[str, iterable[str]]
+                key: name of a node.
+                value: names of the nodes adjacent to it.
+    """
+    def __init__(self, adjacencies):
+        self.neighbors = {
+            node: set(neighbors) for node, neighbors in adjacencies.items()
+        }
+        self.degrees = {
+            node: len(neighbors) for node, neighbors in self.neighbors.items()
+        }
+        self.num_edges = sum(self.degrees.values()) // 2
+        self._heap = [(-degree, node) for node, degree in self.degrees.items()]
+        heapq.heapify(self._heap)
+
+        self._edge_degrees = {}
+        self._edges_by_degree = {}
+
+        for node, neighbors in self.neighbors.items():
+            for neighbor in neighbors:
+                self._bucket(node, neighbor)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+            Parameters:
+                graph:
+                    responds to:
+                        - get_nodes()
+                        - get_neighbors(node)
+
+            Returns: Adjacencies
+        """
+        return cls({
+            str(node): [str(i) for i in graph.get_neighbors(node)]
+            for node in graph.get_nodes()
+        })
+
+    def remove_edge(self, node_1, node_2):
+        """
+            Removes the edge between node_1 and node_2, if there's one.
+        """
+        if node_2 not in self.neighbors[node_1]:
+            return
+
+        self.neighbors[node_1].discard(node_2)
+        self.neighbors[node_2].discard(node_1)
+        self.num_edges -= 1
+
+        edge = _edge(node_1, node_2)
+        self._edges_by_degree[self._edge_degrees.pop(edge)].discard(edge)
+
+        for node in (node_1, node_2):
+            self.degrees[node] -= 1
+            heapq.heappush(self._heap, (-self.degrees[node], node))
+
+        for node in (node_1, node_2):
+            for neighbor in self.neighbors[node]:
+                self._bucket(node, neighbor)
+
+    def max_degree(self):
+        """
+            Returns: int
+                The largest number of neighbors a node has. 0 if there are no
+                nodes.
+        """
+        while self._heap:
+            negative_degree, node = self._heap[0]
+
+            if -negative_degree == self.degrees[node]:
+                return -negative_degree
+
+            heapq.heappop(self._heap)
+
+        return 0
+
+    def has_edges_to_test(self, depth):
+        """
+            Whether some edge has an endpoint with at least "depth" other
+            neighbors, i.e. whether a conditioning set of size "depth" can
+            still be formed for some edge.
+
+            Returns: bool
+        """
+        return self.num_edges > 0 and self.max_degree() - 1 >= depth
+
+    def edges_to_test(self, depth):
+        """
+            The edges that have an endpoint with at least "depth" other
+            neighbors, read from the buckets of degree depth + 1 and up.
+
+            Returns: list[tuple[str]]
+                Sorted pairs of node names, in sorted order.
+        """
+        edges = []
+
+        for degree, bucket in self._edges_by_degree.items():
+            if degree - 1 >= depth:
+                edges.extend(bucket)
+
+        return sorted(edges)
+
+    def _bucket(self, node_1, node_2):
+        """
+            Puts the edge in the bucket of the larger degree of its
+            endpoints, moving it out of its previous bucket if needed.
+        """
+        edge = _edge(node_1, node_2)
+        degree = max(self.degrees[node_1], self.degrees[node_2])
+        previous = self._edge_degrees.get(edge)
+
+        if previous == degree:
+            return
+
+        if previous is not None:
+            self._edges_by_degree[previous].discard(edge)
+
+        self._edge_degrees[edge] = degree
+        self._edges_by_degree.setdefault(degree, set()).add(edge)
+
+    def snapshot(self):
+        """
+            Returns: dict[str, frozenset[str]]
+                An immutable copy of the neighbors of each node.
+        """
+        return {
+            node: frozenset(neighbors)
+            for node, neighbors in self.neighbors.items()
+        }
+
+
+def _edge(node_1, node_2):
+    return (node_1, node_2) if node_1 < node_2 else (node_2, node_1)
+
+
+def candidate_tests(edge, neighbors_of, depth, ordering):
+    """
+        The tests that could separate the nodes of an edge at a depth, in
+        the order they should be tried. The conditioning sets are drawn from
+        the neighbors of the first node, then from those of the second one.
+        The neighbors are looked up lazily, so removals made while
+        iterating are taken into account.
+
+        Parameters:
+            edge: tuple[str]
+            neighbors_of: dict[str, set[str]]
+            depth: int
+            ordering: function
+                See constraint_based.conditioning_set_orderings.
+
+        Returns: generator of tuple
+            ordered_node_1: str
+            ordered_node_2: str
+            combo: tuple[str]
+                The conditioning set.
+    """
+    node_1, node_2 = edge
+
+    for ordered_node_1, ordered_node_2 in [(node_1, node_2), (node_2, node_1)]:
+        conditionables = sorted(
+            neighbors_of[ordered_node_1] - set({ordered_node_2})
+        )
+
+        if len(conditionables) < depth:
+            continue
+
+        for combo in ordering(ordered_node_1, ordered_node_2, conditionables, depth):
+            yield ordered_node_1, ordered_node_2, combo
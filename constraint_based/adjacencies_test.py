@@ -0,0 +1,92 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import random
+from itertools import combinations
+from causal_discovery.constraint_based.adjacencies import Adjacencies
+from causal_discovery.graphs.partial_ancestral_graph import PartialAncestralGraph as Graph
+
+
+def test_from_graph():
+    graph = Graph(variables=['a', 'b', 'c'], complete=True)
+    adjacencies = Adjacencies.from_graph(graph)
+
+    assert adjacencies.snapshot() == {
+        'a': frozenset({'b', 'c'}),
+        'b': frozenset({'a', 'c'}),
+        'c': frozenset({'a', 'b'}),
+    }
+    assert adjacencies.num_edges == 3
+    assert adjacencies.max_degree() == 2
+
+
+def test_remove_edge_updates_degrees():
+    adjacencies = Adjacencies({
+        'a': ['b', 'c', 'd'],
+        'b': ['a', 'c'],
+        'c': ['a', 'b'],
+        'd': ['a'],
+    })
+
+    assert adjacencies.max_degree() == 3
+    assert adjacencies.has_edges_to_test(2)
+    assert not adjacencies.has_edges_to_test(3)
+
+    adjacencies.remove_edge('a', 'd')
+    # removing it twice is a no-op
+    adjacencies.remove_edge('d', 'a')
+
+    assert adjacencies.degrees == {'a': 2, 'b': 2, 'c': 2, 'd': 0}
+    assert adjacencies.num_edges == 3
+    assert adjacencies.max_degree() == 2
+    assert not adjacencies.has_edges_to_test(2)
+    assert adjacencies.has_edges_to_test(1)
+
+
+def test_edges_to_test():
+    # a - b - c, and d - e
+    adjacencies = Adjacencies({
+        'a': ['b'],
+        'b': ['a', 'c'],
+        'c': ['b'],
+        'd': ['e'],
+        'e': ['d'],
+    })
+
+    assert adjacencies.edges_to_test(0) == [('a', 'b'), ('b', 'c'), ('d', 'e')]
+    assert adjacencies.edges_to_test(1) == [('a', 'b'), ('b', 'c')]
+    assert adjacencies.edges_to_test(2) == []
+
+
+def test_edges_to_test_after_removals():
+    rng = random.Random(0)
+    nodes = ['n{}'.format(i) for i in range(12)]
+    neighbors = {node: set() for node in nodes}
+
+    for node_1, node_2 in combinations(nodes, 2):
+        if rng.random() < 0.5:
+            neighbors[node_1].add(node_2)
+            neighbors[node_2].add(node_1)
+
+    adjacencies = Adjacencies(neighbors)
+    edges = sorted(
+        edge for edge in combinations(nodes, 2) if edge[1] in neighbors[edge[0]]
+    )
+
+    for edge in rng.sample(edges, len(edges) // 2):
+        adjacencies.remove_edge(*edge)
+
+        for depth in range(6):
+            assert adjacencies.edges_to_test(depth) == sorted(
+                tuple(sorted((node_1, node_2)))
+                for node_1, node_2 in combinations(nodes, 2)
+                if node_2 in adjacencies.neighbors[node_1]
+                and max(
+                    adjacencies.degrees[node_1],
+                    adjacencies.degrees[node_2]
+                ) - 1 >= depth
+            )
+
+def test_no_edges():
+    adjacencies = Adjacencies({'a': [], 'b': []})
+
+    assert adjacencies.max_degree() == 0
+    assert not adjacencies.has_edges_to_test(0)
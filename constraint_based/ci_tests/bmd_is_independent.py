@@ -6,7 +6,8 @@ def bmd_is_independent(
     vars_1=[],
     vars_2=[],
     conditioning_set=[],
-    threshold=0.99
+    threshold=0.99,
+    weights=None
 ):
     """
         This is a Bayesian Multinomial Dirichlet independence test. We assume
@@ -43,6 +44,12 @@ def bmd_is_independent(
                 are dependent given the conditioning_set. Otherwise, we
                 consider the relationship as independent.
 
+            weights: array-like. Defaults to None.
+                The number of observations each row stands for. Lets data be
+                a count table (e.g. the distinct rows of a dataset, and how
+                many times each appears) instead of raw rows. If None, each
+                row counts once.
+
         Returns: boolean
             If the difference between at least one posterior vs. another is
             greater than the threshold parameter, then we consider the two
@@ -60,7 +67,11 @@ def bmd_is_independent(
     var_1 = vars_1[0]
     var_2 = vars_2[0]
     _data = data.copy()
-    _data['tmp_count'] = 0
+
+    if weights is None:
+        _data['tmp_count'] = 1
+    else:
+        _data['tmp_count'] = np.asarray(weights)
 
     classes_for_var_2 = _data\
         .groupby(var_2).count().index
@@ -145,7 +156,7 @@ def posterior(data, variable, conditioning_set={}, size=10000):
             size: int. Defaults to 1,000
     """
     if conditioning_set == {}:
-        _counts = data.groupby(variable).count()
+        _counts = data.groupby(variable)[['tmp_count']].sum()
         bdeu_prior = np.ones(_counts.shape[0]) / _counts.shape[0]
 
         num_rows = _counts.shape[0]
@@ -162,7 +173,7 @@ def posterior(data, variable, conditioning_set={}, size=10000):
     for key, val in conditioning_set.items():
         data_copy = data_copy[data_copy[key] == val]
 
-    counts = data_copy.groupby(variable).count()
+    counts = data_copy.groupby(variable)[['tmp_count']].sum()
     num_rows = counts.shape[0]
 
     bdeu_prior = np.ones(var_num_classes) / var_num_classes
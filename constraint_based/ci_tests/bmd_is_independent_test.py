@@ -247,3 +247,45 @@ def test_dog_example():
     }
 
     bmd_is_independent(**params) == False
+
+def test_weights_of_count_table_match_raw_rows():
+    size = 300
+    z = np.random.binomial(n=1, p=0.5, size=size)
+    x = np.abs(z - np.random.binomial(n=1, p=0.3, size=size)).astype(float)
+    y = np.abs(z - np.random.binomial(n=1, p=0.3, size=size)).astype(float)
+    x[:30] = np.nan
+
+    df = pd.DataFrame({'x': x, 'y': y, 'z': z})
+
+    counts = df.groupby(['x', 'y', 'z'], dropna=False).size()
+    table = counts.index.to_frame(index=False)
+
+    for conditioning_set in [[], ['z']]:
+        np.random.seed(0)
+        from_rows = decisions_at_thresholds(df, conditioning_set)
+
+        np.random.seed(0)
+        from_table = decisions_at_thresholds(
+            table,
+            conditioning_set,
+            weights=counts.values
+        )
+
+        assert from_rows == from_table
+
+def decisions_at_thresholds(data, conditioning_set, weights=None):
+    decisions = []
+
+    for threshold in [0.5, 0.9, 0.99]:
+        decisions.append(
+            bmd_is_independent(
+                data=data,
+                vars_1=['x'],
+                vars_2=['y'],
+                conditioning_set=conditioning_set,
+                threshold=threshold,
+                weights=weights
+            )
+        )
+
+    return decisions
@@ -1,7 +1,17 @@
+import numpy as np
+
 from causal_discovery.information_theory import stochastic_complexity_score
+from causal_discovery.information_theory import total_count
 from causal_discovery.information_theory import conditional_mutual_information
 
-def sci_is_independent(data, vars_1=[], vars_2=[], conditioning_set=[]):
+def sci_is_independent(
+    data,
+    vars_1=[],
+    vars_2=[],
+    conditioning_set=[],
+    weights=None,
+    missingness_profile=None
+):
     """
         This is an implementation of Stochastic Complexity Based
         Conditional Independence Based Test.
@@ -41,6 +51,17 @@ def sci_is_independent(data, vars_1=[], vars_2=[], conditioning_set=[]):
             conditioning_set: list[str]. Defaults to empty list.
                 Disjoint from vars_1 and vars_2.
 
+            weights: array-like. Defaults to None.
+                The number of observations each row stands for. Lets data be
+                a count table (e.g. the distinct rows of a dataset, and how
+                many times each appears) instead of raw rows. If None, each
+                row counts once.
+
+            missingness_profile: MissingnessProfile. Defaults to None.
+                The profile of data (see MissingnessProfile), if it was
+                already made. The rows kept by test-wise deletion are then
+                read off its patterns, instead of checking every value.
+
         Returns true if vars_1 is independent from vars_2 given conditioning
         set, false otherwise.
 
@@ -75,11 +96,19 @@ def sci_is_independent(data, vars_1=[], vars_2=[], conditioning_set=[]):
             >>> ) == True
     """
 
-    testwise_deleted_data = \
-        data[
-            list(set(conditioning_set).union(set(vars_1)).union(set(vars_2)))
-        ].dropna()
-    sample_size = testwise_deleted_data.shape[0]
+    columns = \
+        list(set(conditioning_set).union(set(vars_1)).union(set(vars_2)))
+    if missingness_profile is None:
+        observed = data[columns].notnull().all(axis=1).values
+    else:
+        observed = missingness_profile.complete_rows(columns)
+
+    testwise_deleted_data = data[columns][observed]
+
+    if weights is not None:
+        weights = np.asarray(weights)[observed]
+
+    sample_size = total_count(testwise_deleted_data, weights)
 
     score_1 = \
         stochastic_complexity_score(
@@ -87,7 +116,8 @@ def sci_is_independent(data, vars_1=[], vars_2=[], conditioning_set=[]):
             vars_1=vars_1,
             vars_2=vars_2,
             conditioning_set=conditioning_set,
-            sample_size=sample_size
+            sample_size=sample_size,
+            weights=weights
         )
 
     score_2 = \
@@ -96,7 +126,8 @@ def sci_is_independent(data, vars_1=[], vars_2=[], conditioning_set=[]):
             vars_1=vars_2,
             vars_2=vars_1,
             conditioning_set=conditioning_set,
-            sample_size=sample_size
+            sample_size=sample_size,
+            weights=weights
         )
 
     score = max(score_1, score_2)
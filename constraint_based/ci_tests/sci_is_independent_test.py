@@ -1,6 +1,8 @@
 import pandas as pd
+import numpy as np
 import pytest
 from causal_discovery.constraint_based.ci_tests.sci_is_independent import sci_is_independent
+from causal_discovery.constraint_based.missingness_profile import MissingnessProfile
 
 def test_long_chains_collider_bias_without_MI(
     df_long_chains_and_collider_without_MI
@@ -175,3 +177,56 @@ def test_3_multinom_RVs_MAR(
     }
 
     assert sci_is_independent(**params) == True
+
+def test_weights_of_count_table_match_raw_rows(
+    df_long_chains_and_collider_without_MI
+):
+    df = df_long_chains_and_collider_without_MI(size=2000)
+    df.loc[:100, 'a'] = np.nan
+
+    counts = df.groupby(list(df.columns), dropna=False).size()
+    table = counts.index.to_frame(index=False)
+
+    for vars_1, vars_2, conditioning_set in [
+        (['d'], ['b'], []),
+        (['a'], ['c'], []),
+        (['a'], ['e'], ['c']),
+    ]:
+        assert sci_is_independent(
+            data=table,
+            vars_1=vars_1,
+            vars_2=vars_2,
+            conditioning_set=conditioning_set,
+            weights=counts.values
+        ) == sci_is_independent(
+            data=df,
+            vars_1=vars_1,
+            vars_2=vars_2,
+            conditioning_set=conditioning_set
+        )
+
+def test_missingness_profile_gives_the_same_test_wise_deletion(
+    df_long_chains_and_collider_without_MI
+):
+    df = df_long_chains_and_collider_without_MI(size=2000)
+    df.loc[:100, 'a'] = np.nan
+    df.loc[50:300, 'c'] = np.nan
+    profile = MissingnessProfile(df)
+
+    for vars_1, vars_2, conditioning_set in [
+        (['d'], ['b'], []),
+        (['a'], ['c'], []),
+        (['a'], ['e'], ['c']),
+    ]:
+        assert sci_is_independent(
+            data=df,
+            vars_1=vars_1,
+            vars_2=vars_2,
+            conditioning_set=conditioning_set,
+            missingness_profile=profile
+        ) == sci_is_independent(
+            data=df,
+            vars_1=vars_1,
+            vars_2=vars_2,
+            conditioning_set=conditioning_set
+        )
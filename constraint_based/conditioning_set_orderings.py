@@ -0,0 +1,179 @@
+"""
+    conditioning_set_orderings.py
+
+    Strategies for the order in which candidate conditioning sets are tried
+    when looking for a set that separates two variables. The search stops at
+    the first set that works, so trying likely separators first saves tests.
+
+    An ordering is a function (or callable object) with parameters:
+        node_1: str
+        node_2: str
+        conditionables: list[str]
+            The candidates for the conditioning set.
+        depth: int
+            The size of the conditioning sets.
+
+    and it returns an iterable of tuples of size depth.
+
+    - default_ordering
+    - AssociationOrdering
+    - get_ordering
+    - count_rows
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from causal_discovery.information_theory import conditional_mutual_information
+from causal_discovery.constraint_based.misc import key_for_pair
+
+
+def default_ordering(node_1, node_2, conditionables, depth): # pylint: disable=unused-argument
+    """
+        Tries the conditioning sets in lexicographic order of the names of
+        the candidates.
+    """
+    return combinations(sorted(conditionables), depth)
+
+
+class AssociationOrdering:
+    """
+        Tries first the conditioning sets made of the candidates that are
+        most associated with both nodes of the edge. A candidate's score is the
+        smaller of its mutual informations with the two nodes, so common causes
+        and mediators come before variables that only relate to one side.
+
+        Pairwise mutual informations are computed once, when the ordering is
+        created, on the rows where both variables are observed. They only
+        need the count table of each pair of variables: getting those
+        scans the rows once per pair (O(V^2) passes over the data), which
+        is where the cost is. The mutual informations are then computed
+        from the tables, which are small. Pass "counts" to get the tables
+        from elsewhere, e.g. from the shards of ShardedCounts, so that the
+        rows get scanned where they are held instead of by the caller.
+
+        Parameters:
+            data: pandas.DataFrame
+            variables: list[str]. Defaults to all the columns of data.
+            weights: array-like. Defaults to None.
+                The number of observations each row of data stands for.
+                Ignored if counts is given.
+            counts: callable. Defaults to None.
+                Takes a list of tuples of columns, and returns their count
+                tables, like ShardedCounts.count. If None, they're counted
+                from data with count_rows.
+    """
+    def __init__(self, data, variables=None, weights=None, counts=None):
+        if variables is None:
+            variables = list(data.columns)
+
+        pairs = list(combinations(variables, 2))
+
+        if counts is None:
+            tables = count_rows(data, pairs, weights=weights)
+        else:
+            tables = counts(pairs)
+
+        self.mutual_information = {}
+
+        for var_1, var_2 in pairs:
+            table, table_weights = tables[(var_1, var_2)]
+            observed = table.notnull().all(axis=1).values
+
+            if table_weights[observed].sum() == 0:
+                mutual_information = 0.0
+            else:
+                mutual_information = conditional_mutual_information(
+                    data=table[observed],
+                    vars_1=[var_1],
+                    vars_2=[var_2],
+                    weights=table_weights[observed]
+                )
+
+            self.mutual_information[key_for_pair((var_1, var_2))] = \
+                mutual_information
+
+    def score(self, candidate, node_1, node_2):
+        """
+            Returns: float
+                How associated the candidate is with both nodes.
+        """
+        return min(
+            self.mutual_information.get(key_for_pair((candidate, node_1)), 0.0),
+            self.mutual_information.get(key_for_pair((candidate, node_2)), 0.0)
+        )
+
+    def __call__(self, node_1, node_2, conditionables, depth):
+        ranked = sorted(
+            conditionables,
+            key=lambda candidate: (-self.score(candidate, node_1, node_2), candidate)
+        )
+
+        return combinations(ranked, depth)
+
+
+def get_ordering(ordering, data, weights=None, counts=None):
+    """
+        Parameters:
+            ordering: str or callable. "default" or "association", or an
+                ordering, which is returned as is. None means "default".
+            data: pandas.DataFrame
+                Used by orderings that need statistics of the data.
+            weights: array-like. Defaults to None.
+                The number of observations each row of data stands for.
+            counts: callable. Defaults to None.
+                Where orderings get their count tables from. See
+                AssociationOrdering.
+
+        Returns: callable
+    """
+    if ordering is None or ordering == 'default':
+        return default_ordering
+
+    if ordering == 'association':
+        return AssociationOrdering(data, weights=weights, counts=counts)
+
+    if callable(ordering):
+        return ordering
+
+    raise ValueError(
+        'Unknown ordering {}. Possible orderings: default, association'.format(
+            ordering
+        )
+    )
+
+
+def count_rows(data, column_sets, weights=None):
+    """
+        Counts the combinations of values of each column set, missing
+        values included.
+
+        Parameters:
+            data: pandas.DataFrame
+            column_sets: list[tuple[str]]
+            weights: array-like. Defaults to None.
+                The number of observations each row of data stands for.
+
+        Returns: dict
+            Same as ShardedCounts.count.
+    """
+    if weights is None:
+        weights = np.ones(data.shape[0])
+
+    row_weights = pd.Series(np.asarray(weights), index=data.index)
+    tables = {}
+
+    for columns in column_sets:
+        summed = row_weights.groupby(
+            [data[column] for column in columns],
+            dropna=False
+        ).sum()
+
+        table = summed.index.to_frame(index=False)
+        table.columns = list(columns)
+
+        tables[columns] = (table, summed.values)
+
+    return tables
@@ -0,0 +1,64 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import pytest
+import numpy as np
+import pandas as pd
+from causal_discovery.constraint_based.conditioning_set_orderings import \
+    AssociationOrdering, default_ordering, get_ordering
+from causal_discovery.constraint_based.executors import SerialExecutor
+from causal_discovery.constraint_based.sharded_counts import ShardedCounts
+
+
+def mediated_data(size=2000):
+    # x -> m -> y, and n is noise.
+    np.random.seed(0)
+    x = np.random.randint(0, 2, size=size)
+    flip_1 = np.random.binomial(1, 0.1, size=size)
+    m = np.abs(x - flip_1)
+    flip_2 = np.random.binomial(1, 0.1, size=size)
+    y = np.abs(m - flip_2)
+    n = np.random.randint(0, 2, size=size)
+
+    return pd.DataFrame({'n': n, 'x': x, 'm': m, 'y': y})
+
+
+def test_default_ordering_is_lexicographic():
+    assert list(default_ordering('x', 'y', ['c', 'a', 'b'], 2)) == [
+        ('a', 'b'), ('a', 'c'), ('b', 'c')
+    ]
+
+
+def test_association_ordering_tries_mediator_first():
+    ordering = AssociationOrdering(mediated_data())
+
+    assert list(ordering('x', 'y', ['n', 'm'], 1)) == [('m',), ('n',)]
+
+
+def test_association_ordering_with_missing_values():
+    df = mediated_data()
+    df.loc[:999, 'm'] = np.nan
+
+    ordering = AssociationOrdering(df)
+
+    assert list(ordering('x', 'y', ['n', 'm'], 1)) == [('m',), ('n',)]
+
+
+def test_association_ordering_from_sharded_counts():
+    df = mediated_data()
+    df.loc[:999, 'm'] = np.nan
+
+    sharded_counts = ShardedCounts(df, 3, SerialExecutor())
+    ordering = AssociationOrdering(df, counts=sharded_counts.count)
+
+    assert ordering.mutual_information == \
+        pytest.approx(AssociationOrdering(df).mutual_information)
+
+def test_get_ordering():
+    df = mediated_data(size=10)
+
+    assert get_ordering(None, df) is default_ordering
+    assert get_ordering('default', df) is default_ordering
+    assert isinstance(get_ordering('association', df), AssociationOrdering)
+    assert get_ordering(default_ordering, df) is default_ordering
+
+    with pytest.raises(ValueError):
+        get_ordering('fancy', df)
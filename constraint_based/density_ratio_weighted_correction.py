@@ -1,14 +1,28 @@
+import numpy as np
 import pandas as pd
 
+from constraint_based.misc import expand_counts
+from constraint_based.missingness_profile import MissingnessProfile
+
 class DensityRatioWeightedCorrection(object):
     """
         Takes in data with missingness, and produces a corrected data set
         without missingness. Makes use of R Factorization as listed in Mohan &
         Pearl (2020).
 
+        Only var_names, and the variables whose missingness indicators
+        they depend on (parents of the missingness indicators of var_names,
+        the parents of their missingness indicators, and so on), take part
+        in the correction. The other columns of data are dropped up front.
+
+        The rows are counted once, over all the relevant columns and their
+        missingness indicators (the joint count cube). Every probability the
+        correction needs is a marginal of that cube.
+
         Parameters:
             var_names: set
                 The name of variables that are being considered to produce
+                the corrected data. Missingness indicators in it are ignored.
 
             data: pandas.DataFrame
                 A dataframe where var_names is a subset of the columns.
@@ -17,55 +31,110 @@ class DensityRatioWeightedCorrection(object):
                 keys: missingness indicators (e.g. 'MI_x')
                 values: set(str)
                     Parents of the missingness indicator (e.g. {'Y', 'Z'})
+
+            missingness_profile: MissingnessProfile. Defaults to None.
+                The profile of data, if it was already made. Otherwise, the
+                relevant columns get profiled.
+
+            weights: array-like. Defaults to None.
+                The number of observations each row of data stands for (see
+                misc.deduplicate). If None, each row counts once.
     """
     def __init__(
         self,
         data,
         var_names,
         graph,
-        missingness_indicator_prefix='MI_'
+        missingness_indicator_prefix='MI_',
+        missingness_profile=None,
+        weights=None
    ):
-        self.data = data.merge(
-            data.isnull().add_prefix(missingness_indicator_prefix),
-            left_index=True,
-            right_index=True
-        )
-
-        self.all_cols = data.columns
-        self.var_names = var_names
         self.graph = graph
         self.missingness_indicator_prefix = missingness_indicator_prefix
+        self.var_names = [
+            var_name for var_name in var_names
+            if missingness_indicator_prefix not in var_name
+        ]
+
+        _data = data[self._relevant_columns(data.columns)]
+
+        if missingness_profile is None:
+            missingness_profile = MissingnessProfile(
+                _data,
+                missingness_indicator_prefix=missingness_indicator_prefix
+            )
+
+        # Taken from the indicators the profile keeps, instead of making a
+        # frame of the data and its indicators for every correction.
+        indicators = missingness_profile.indicators(_data.columns)
+
+        self.all_cols = _data.columns
+        self.missingness_indicators = indicators.columns
+        self._columns = _data
+        self._indicators = indicators
+
+        if weights is None:
+            weights = np.ones(_data.shape[0], dtype=int)
+
+        self.num_rows = np.asarray(weights).sum()
+
+        columns = list(_data.columns) + list(indicators.columns)
+        self.joint_counts = pd.Series(np.asarray(weights)).groupby(
+            [_data[column].values for column in _data.columns]
+            + [indicators[column].values for column in indicators.columns],
+            dropna=False
+        ).sum()
+        self.joint_counts.index.names = columns
+
+    @property
+    def data(self):
+        """
+            Returns: pandas.DataFrame
+                The relevant columns of data, followed by their missingness
+                indicators. Made when asked for; the correction only needs
+                joint_counts.
+        """
+        return pd.concat([self._columns, self._indicators], axis=1)
 
     def correct(self):
         """
             Returns: pandas.DataFrame
                 a corrected DataFrame with var_names as columns without any
-                missingness.
+                missingness. Each row of "correct_counts" is repeated as many
+                times as its count.
         """
+        return expand_counts(*self.correct_counts())
 
-        self.data['tmp_count'] = 0
-
+    def correct_counts(self):
+        """
+            The corrected data as a count table, so that CI tests can use it
+            through their "weights" without materializing rows.
+
+            Returns: tuple
+                table: pandas.DataFrame
+                    The distinct combinations of values of var_names, without
+                    any missingness.
+                weights: numpy.ndarray
+                    The corrected number of rows of each combination, rounded
+                    down. Combinations that round down to 0 are left out.
+        """
         probas = (self._constant() * self._density_ratio()).dropna()
 
-        counts = probas / probas.sum() * self.data.shape[0]
+        counts = probas / probas.sum() * self.num_rows
+        counts = counts.groupby(level=self.var_names).sum()
 
-        collection = []
+        weights = np.floor(counts.iloc[:, 0].values).astype(int)
+        nonzero = weights > 0
 
-        for index, count in counts.iterrows():
-            for i in range(int(count)):
-                collection.append(index)
+        table = counts.index.to_frame(index=False)[nonzero].reset_index(drop=True)
 
-        df = pd.DataFrame(collection, columns=counts.index.names)
-
-        return df
+        return table, weights[nonzero]
 
     def _constant(self):
-        num_counts = self.data[self._missingness_indicators()].copy()
-        num_counts['tmp_count'] = 0
-        counts = num_counts.groupby(list(self._missingness_indicators())).count()
+        counts = self._counts(list(self._missingness_indicators()))
         running_vals = counts.xs(
-            [False for i in range(len(self._missingness_indicators()))], level=list(self._missingness_indicators())
-        )[['tmp_count']] / self.data.shape[0]
+            tuple(False for i in range(len(self._missingness_indicators()))), level=list(self._missingness_indicators())
+        )[['tmp_count']] / self.num_rows
 
         for mi in self._missingness_indicators():
             cond_var_values = self._missingness_indicator_of_parents_of_missingness_indicator(mi)
@@ -82,7 +151,7 @@ class DensityRatioWeightedCorrection(object):
         return running_vals
 
     def _density_ratio(self):
-        var_values = list((set(self.data.columns) - set(self._missingness_indicators()) - set({'tmp_count'})))
+        var_values = list(self.all_cols)
         cond_var_values = self._missingness_indicators()
 
         running_probas = self._proba(
@@ -113,12 +182,33 @@ class DensityRatioWeightedCorrection(object):
 
         return running_probas
 
+    def _relevant_columns(self, columns):
+        """
+            Returns: list[str]
+                The columns that are in var_names, or that are parents of the
+                missingness indicator of a relevant column.
+        """
+        relevant = set({})
+        to_visit = list(self.var_names)
+
+        while len(to_visit) > 0:
+            var_name = to_visit.pop()
+
+            if var_name in relevant or var_name not in columns:
+                continue
+
+            relevant.add(var_name)
+            to_visit += self._find_parents_of_missingness_indicator(
+                self.missingness_indicator_prefix + var_name
+            )
+
+        return [column for column in columns if column in relevant]
+
     def _missingness_indicator_of_parents_of_missingness_indicator(self, mi):
         return [self.missingness_indicator_prefix + p for p in self._find_parents_of_missingness_indicator(mi)]
 
     def _numerator(self):
-        return self.data.groupby(self.all_cols).count() \
-                / self.data.shape[0]
+        return self._counts(list(self.all_cols)) / self.num_rows
 
     def _denominator(self):
         prod = 1.0
@@ -169,22 +259,43 @@ class DensityRatioWeightedCorrection(object):
                     value: The value of the variable in the conditioning set.
 
         """
-        numerator = self.data.groupby( list(set(var_values).union(cond_var_values))).count()
+        numerator = self._counts(list(set(var_values).union(cond_var_values)))
         if len(cond_var_values) == 0:
-            return numerator / self.data.shape[0]
+            return numerator / self.num_rows
 
-        denominator = self.data.groupby(list(cond_var_values)).count()
+        denominator = self._counts(list(cond_var_values))
 
         return (numerator / denominator)[['tmp_count']]
 
+    def _counts(self, columns):
+        """
+            Marginal of the joint count cube.
+
+            Parameters:
+                columns: list[str]
+
+            Returns: pandas.DataFrame
+                The number of rows of each combination of values of the
+                columns, in a "tmp_count" column. Combinations with missing
+                values are left out.
+        """
+        return self.joint_counts\
+            .groupby(level=columns)\
+            .sum()\
+            .to_frame('tmp_count')
+
     def _find_parents_of_missingness_indicator(self, missingness_indicator):
-        parents = []
+        if not hasattr(self, 'parents_of_missingness_indicators'):
+            self.parents_of_missingness_indicators = {}
 
-        for from_node, to_node in self._marked_arrows():
-            if to_node == missingness_indicator:
-                parents.append(from_node)
+            for from_node, to_node in self._marked_arrows():
+                self.parents_of_missingness_indicators\
+                    .setdefault(to_node, [])\
+                    .append(from_node)
 
-        return parents
+        return list(
+            self.parents_of_missingness_indicators.get(missingness_indicator, [])
+        )
 
     def _mis_of_parents_of_mi(self, missingness_indicator):
         parents = self._find_parents_of_missingness_indicator(
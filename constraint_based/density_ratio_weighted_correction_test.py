@@ -4,6 +4,7 @@ import numpy as np
 from pytest import approx
 from graphs.marked_pattern_graph import MarkedPatternGraph
 from constraint_based.density_ratio_weighted_correction import DensityRatioWeightedCorrection
+from constraint_based.misc import deduplicate
 
 def test_deterministic_cause_of_missingness():
     size = 1000
@@ -146,3 +147,121 @@ def test_long_chains_collider_bias_with_MI(
 
     assert corrected_df_counts.xs([1, True], level=['b', 'd']).values[0] \
             == approx(0.175, abs=0.02)
+
+def test_only_relevant_columns_are_used():
+    size = 1000
+    df = pd.DataFrame({
+        'x{}'.format(i): np.random.binomial(n=1, p=0.5, size=size)
+        for i in range(40)
+    }).astype(float)
+
+    # x1 is missing because of x2, which is missing because of x3.
+    df.loc[(df['x2'] == 1) & (np.random.binomial(n=1, p=0.5, size=size) == 1), 'x1'] = np.nan
+    df.loc[(df['x3'] == 1) & (np.random.binomial(n=1, p=0.5, size=size) == 1), 'x2'] = np.nan
+    df.loc[:100, 'x10'] = np.nan
+
+    graph = MarkedPatternGraph(
+        nodes=list(df.columns) + ['MI_x1', 'MI_x2', 'MI_x10'],
+        marked_arrows=[('x2', 'MI_x1'), ('x3', 'MI_x2'), ('x11', 'MI_x10')]
+    )
+
+    correction = DensityRatioWeightedCorrection(
+        data=df,
+        var_names=['x0', 'x1', 'MI_x1'],
+        graph=graph
+    )
+
+    assert list(correction.all_cols) == ['x0', 'x1', 'x2', 'x3']
+
+    corrected = correction.correct()
+
+    assert set(corrected.columns) == set({'x0', 'x1'})
+    assert corrected.isnull().sum().sum() == 0
+
+def test_counts_match_corrected_rows():
+    size = 1000
+    x = np.random.binomial(n=1, p=0.5, size=size)
+    y = np.random.binomial(n=1, p=0.3 + 0.4 * x, size=size)
+
+    df = pd.DataFrame({'x': x, 'y': y}).astype(float)
+    df.loc[(df['x'] == 1) & (np.random.binomial(n=1, p=0.5, size=size) == 1), 'y'] = np.nan
+
+    graph = MarkedPatternGraph(
+        nodes=['x', 'y', 'MI_y'],
+        marked_arrows=[('x', 'MI_y')]
+    )
+
+    correction = DensityRatioWeightedCorrection(
+        data=df,
+        var_names=['x', 'y'],
+        graph=graph
+    )
+
+    table, weights = correction.correct_counts()
+
+    assert list(table.columns) == ['x', 'y']
+    assert (weights > 0).all()
+
+    counts_from_rows = correction.correct().groupby(['x', 'y']).size()
+
+    for row, weight in zip(table.itertuples(index=False), weights):
+        assert counts_from_rows[tuple(row)] == weight
+
+    assert counts_from_rows.sum() == weights.sum()
+
+def test_marginals_come_from_joint_counts():
+    size = 500
+    df = pd.DataFrame({
+        'x': np.random.binomial(n=1, p=0.5, size=size),
+        'y': np.random.binomial(n=1, p=0.5, size=size),
+    }).astype(float)
+    df.loc[df.sample(frac=0.2).index, 'y'] = np.nan
+
+    graph = MarkedPatternGraph(
+        nodes=['x', 'y', 'MI_y'],
+        marked_arrows=[('x', 'MI_y')]
+    )
+
+    correction = DensityRatioWeightedCorrection(
+        data=df,
+        var_names=['x', 'y'],
+        graph=graph
+    )
+
+    assert correction.joint_counts.sum() == size
+
+    marginal = correction._counts(['y', 'MI_y'])['tmp_count']
+    expected = correction.data.groupby(['y', 'MI_y']).size()
+
+    assert marginal.to_dict() == expected.to_dict()
+
+def test_weights_of_deduplicated_rows():
+    size = 1000
+    x = np.random.binomial(n=1, p=0.5, size=size)
+    y = np.random.binomial(n=1, p=0.3 + 0.4 * x, size=size)
+
+    df = pd.DataFrame({'x': x, 'y': y}).astype(float)
+    df.loc[(df['x'] == 1) & (np.random.binomial(n=1, p=0.5, size=size) == 1), 'y'] = np.nan
+
+    graph = MarkedPatternGraph(
+        nodes=['x', 'y', 'MI_y'],
+        marked_arrows=[('x', 'MI_y')]
+    )
+
+    unique_rows, weights = deduplicate(df)
+
+    from_rows = DensityRatioWeightedCorrection(
+        data=df,
+        var_names=['x', 'y'],
+        graph=graph
+    ).correct_counts()
+
+    from_unique_rows = DensityRatioWeightedCorrection(
+        data=unique_rows,
+        var_names=['x', 'y'],
+        graph=graph,
+        weights=weights
+    ).correct_counts()
+
+    pd.testing.assert_frame_equal(from_rows[0], from_unique_rows[0])
+    assert list(from_rows[1]) == list(from_unique_rows[1])
@@ -1,5 +1,8 @@
 from causal_discovery.constraint_based.ci_tests.bmd_is_independent import bmd_is_independent
+from causal_discovery.constraint_based.executors import get_executor, owns_executor
 from causal_discovery.constraint_based.misc import setup_logging
+from causal_discovery.constraint_based.missingness_profile import MissingnessProfile
+from functools import partial
 from itertools import combinations
 
 class DirectCausesOfMissingnessFinder(object):
@@ -37,6 +40,23 @@ class DirectCausesOfMissingnessFinder(object):
                    vars_1: list[str]
                    vars_2: list[str]
                    conditioning_set: list[str]
+
+            executor: Executor or str. Defaults to None, i.e. "serial".
+                The (column with missingness, potential parent) pairs are
+                searched in parallel on it, one task per pair. See
+                constraint_based.executors. One built from a name gets
+                closed when "find" returns.
+
+            num_progress_reports: int. Defaults to 10.
+                How many times progress gets logged during "find".
+
+            missingness_profile: MissingnessProfile. Defaults to None.
+                The profile of data, if it was already made.
+
+            weights: array-like. Defaults to None.
+                The number of observations each row of data stands for (see
+                misc.deduplicate). It gets passed to cond_indep_test as
+                "weights".
     """
     def __init__(
         self,
@@ -44,72 +64,128 @@ class DirectCausesOfMissingnessFinder(object):
         graph,
         missingness_indicator_prefix='MI_',
         cond_indep_test=bmd_is_independent,
+        executor=None,
+        num_progress_reports=10,
+        missingness_profile=None,
+        weights=None
     ):
-        self.data = data.merge(
-            data.isnull().add_prefix(missingness_indicator_prefix),
-            left_index=True,
-            right_index=True
+        if missingness_profile is None:
+            missingness_profile = MissingnessProfile(
+                data,
+                missingness_indicator_prefix=missingness_indicator_prefix,
+                weights=weights
+            )
+
+        if weights is not None:
+            cond_indep_test = partial(cond_indep_test, weights=weights)
+
+        self.missingness_profile = missingness_profile
+        self.data = missingness_profile.with_indicators(
+            data,
+            missingness_profile.cols_with_missingness()
         )
 
         self.orig_data_cols = self.data.columns
         self.missingness_indicator_prefix = missingness_indicator_prefix
         self.cond_indep_test = cond_indep_test
         self.graph = graph
+        self.executor = get_executor(executor)
+        self._owns_executor = owns_executor(executor)
+        self.num_progress_reports = num_progress_reports
 
     def find(self):
         """
             If applicable, returns a list of marked arrows. A marked arrow is a
             tuple with two items. The first one is the from node and the last
             one is the to node.
+
+            The marked arrows are in the order of the columns with
+            missingness, then of the potential parents, whatever order the
+            searches finish in.
         """
+        logging = setup_logging()
 
-        marked_arrows = []
+        pairs = self._pairs()
+
+        try:
+            data = self.executor.scatter(self.data)
+
+            logging.info(
+                'Searching direct causes of missingness of {} columns ({} potential parents)...'.format(
+                    len(self._cols_with_missingness()),
+                    len(pairs)
+                )
+            )
+
+            futures = [
+                self.executor.submit(
+                    is_direct_cause,
+                    data=data,
+                    potential_parent=potential_parent,
+                    missingness_col_name=missingness_col_name,
+                    conditionables=conditionables,
+                    cond_indep_test=self.cond_indep_test
+                )
+                for potential_parent, missingness_col_name, conditionables in pairs
+            ]
+
+            report_every = max(1, len(pairs) // max(1, self.num_progress_reports))
+            marked_arrows = []
+
+            for index, (pair, future) in enumerate(zip(pairs, futures)):
+                potential_parent, missingness_col_name, _ = pair
+
+                if future.result():
+                    marked_arrows.append((potential_parent, missingness_col_name))
+
+                if (index + 1) % report_every == 0 or index + 1 == len(pairs):
+                    logging.info(
+                        'Searched {} of {} potential parents. Found {} direct causes of missingness.'.format(
+                            index + 1,
+                            len(pairs),
+                            len(marked_arrows)
+                        )
+                    )
+        finally:
+            if self._owns_executor:
+                self.executor.close()
 
-        logging = setup_logging()
+        return marked_arrows
+
+    def _pairs(self):
+        """
+            Returns: list[tuple]
+                potential_parent: str
+                missingness_col_name: str
+                conditionables: list[str]
+                    Where the conditioning sets of the pair get drawn from.
+        """
+        pairs = []
 
         for col_with_missingness in self._cols_with_missingness():
             missingness_col_name = self.missingness_indicator_prefix + col_with_missingness
 
-            logging.info('Finding direct parents of {}...'.format(missingness_col_name))
-
             for potential_parent in self._orig_vars():
                 # Assumption: no self-masking (i.e. A doesn't cause MI_A)
-                if potential_parent != col_with_missingness:
-                    neighbors = self.graph.get_neighbors(potential_parent)
-
-                    if col_with_missingness in neighbors:
-                        col_with_miss_neighbors = self.graph.get_neighbors(col_with_missingness)
-
-                        potential_parent_neighbors = neighbors.union(col_with_miss_neighbors) - set({col_with_missingness, potential_parent})
-                    else:
-                        potential_parent_neighbors = neighbors
-
-                    depth = 0
-                    independent = False
-
-                    while depth <= len(potential_parent_neighbors):
-                        if independent:
-                            break
-
-                        for combo in combinations(potential_parent_neighbors, depth):
-                            if self.cond_indep_test(
-                                self.data,
-                                vars_1=[potential_parent],
-                                vars_2=[missingness_col_name],
-                                conditioning_set=list(combo)
-                            ):
-                                independent = True
-                                break
-                        depth += 1
-
-                    if not independent:
-                        logging.info('Found direct parents of {}: {}'.format(missingness_col_name, potential_parent))
-
-                        marked_arrows.append(
-                            (potential_parent, missingness_col_name)
-                        )
+                if potential_parent == col_with_missingness:
+                    continue
 
-        return marked_arrows
+                neighbors = self.graph.get_neighbors(potential_parent)
+
+                if col_with_missingness in neighbors:
+                    col_with_miss_neighbors = self.graph.get_neighbors(col_with_missingness)
+
+                    potential_parent_neighbors = neighbors.union(col_with_miss_neighbors) - set({col_with_missingness, potential_parent})
+                else:
+                    potential_parent_neighbors = neighbors
+
+                pairs.append((
+                    potential_parent,
+                    missingness_col_name,
+                    sorted(potential_parent_neighbors)
+                ))
+
+        return pairs
 
     def _orig_vars(self):
         return self.data.columns[
@@ -117,14 +193,44 @@ class DirectCausesOfMissingnessFinder(object):
         ]
 
     def _cols_with_missingness(self):
-        self.data.columns.str.contains(self.missingness_indicator_prefix)
+        return self.missingness_profile.cols_with_missingness()
+
+
+def is_direct_cause(
+    data,
+    potential_parent,
+    missingness_col_name,
+    conditionables,
+    cond_indep_test
+):
+    """
+        Searches conditioning sets of increasing size for one that makes the
+        potential parent independent of the missingness indicator.
 
-        if len(set(dir(self)).intersection(set(['cols_with_missingness']))) > 0:
-            return self.cols_with_missingness
+        Parameters:
+            data: pd.DataFrame
+                Has the missingness indicator columns.
+            potential_parent: str
+            missingness_col_name: str
+            conditionables: list[str]
+            cond_indep_test: function
+
+        Returns: bool
+            True if no conditioning set was found, i.e. the potential parent
+            is a direct cause of the missingness.
+    """
+    depth = 0
 
-        cols_missing_count = self.data.isnull().sum()
-        self.cols_with_missingness = \
-            cols_missing_count[cols_missing_count > 0].index.values
+    while depth <= len(conditionables):
+        for combo in combinations(conditionables, depth):
+            if cond_indep_test(
+                data,
+                vars_1=[potential_parent],
+                vars_2=[missingness_col_name],
+                conditioning_set=list(combo)
+            ):
+                return False
 
-        return self.cols_with_missingness
+        depth += 1
 
+    return True
@@ -154,3 +154,27 @@ def test_long_chains_collider_bias_with_MI(
     })
 
     assert frozenset(marked_arrows) == expected_marked_arrows
+
+@pytest.mark.parametrize('executor', ['serial', 'threads'])
+def test_parallel_search(
+    executor,
+    df_X_Y_indep_Y_causes_MI_X
+):
+    df = df_X_Y_indep_Y_causes_MI_X(size=500)
+    df.loc[:50, 'y'] = np.nan
+
+    graph = MarkedPatternGraph(
+        nodes=['x','y']
+    )
+
+    def cond_indep_test(data, vars_1, vars_2, conditioning_set):
+        return vars_1 != ['y']
+
+    marked_arrows = DirectCausesOfMissingnessFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=cond_indep_test,
+        executor=executor
+    ).find()
+
+    assert marked_arrows == [('y', 'MI_x')]
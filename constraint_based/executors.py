@@ -0,0 +1,421 @@
+"""
+    executors.py
+
+    Backends for running independent pieces of work, such as batches of
+    conditional independence tests.
+
+    - SerialExecutor
+    - ThreadExecutor
+    - ProcessExecutor
+    - DaskExecutor
+    - Shard
+    - get_executor
+    - owns_executor
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+import concurrent.futures
+import os
+
+
+def get_num_workers(client):
+    """
+    Get the number of workers from a Dask client
+    """
+    return len(client.scheduler_info()['workers'])
+
+
+class Executor(ABC):
+    """
+        Something that runs functions, possibly in parallel.
+
+        Subclasses implement "submit", which returns an object that responds
+        to "result()".
+
+        Can be used as a context manager, which closes the executor on exit.
+
+        Any class with "submit" and "place_shards" counts as an Executor in
+        isinstance checks, so that executors made by this module under
+        another import path (e.g. causal_discovery.constraint_based) are
+        still recognized.
+    """
+    num_workers = 1
+
+    @classmethod
+    def __subclasshook__(cls, subclass):
+        if cls is Executor and all(
+            any(name in klass.__dict__ for klass in subclass.__mro__)
+            for name in ('submit', 'place_shards')
+        ):
+            return True
+
+        return NotImplemented
+
+    @abstractmethod
+    def submit(self, func, *args, **kwargs):
+        """
+            Schedules func(*args, **kwargs).
+
+            Returns: a future that responds to "result()".
+        """
+
+    def scatter(self, data):
+        """
+            Makes data available to the workers once, so that it doesn't get
+            shipped with every submitted function.
+
+            Returns: something that can be passed to "submit" in place of
+            data.
+        """
+        return data
+
+    def gather(self, futures):
+        """
+            Parameters:
+                futures: list
+                    Futures returned by "submit".
+
+            Returns: list
+                The results, in the same order as the futures.
+        """
+        return [future.result() for future in futures]
+
+    def wait(self, futures, timeout=None, return_when='ALL_COMPLETED'):
+        """
+            Waits for the futures to finish, for at most timeout seconds.
+
+            Parameters:
+                futures: list
+                    Futures returned by "submit".
+                timeout: float. Defaults to None (i.e. no time limit).
+                return_when: str. Defaults to "ALL_COMPLETED".
+                    Either "ALL_COMPLETED" or "FIRST_COMPLETED".
+
+            Returns: tuple[set]
+                The futures that are done, and the ones that aren't.
+        """
+        done, not_done = concurrent.futures.wait(
+            futures,
+            timeout=timeout,
+            return_when=return_when
+        )
+
+        return set(done), set(not_done)
+
+    def cancel(self, futures):
+        """
+            Cancels futures that haven't finished. Functions that are
+            already running might run to completion.
+        """
+        for future in futures:
+            future.cancel()
+
+    def place_shards(self, shards):
+        """
+            Puts each shard (e.g. a partition of the rows of a dataset) where
+            the work on it will run, so that it only gets shipped once.
+
+            Parameters:
+                shards: list
+
+            Returns: list[Shard]
+                One per shard, in the same order.
+        """
+        return [Shard(executor=self, shard=shard) for shard in shards]
+
+    def map(self, func, *iterables):
+        """
+            Like the builtin map, but returns a list and might run the calls
+            in parallel.
+        """
+        return self.gather(
+            [self.submit(func, *args) for args in zip(*iterables)]
+        )
+
+    def close(self):
+        """
+            Releases the resources held by the executor, if any. It can
+            still be used afterwards, and acquires them again if needed.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Shard:
+    """
+        Data placed by an executor. "submit(func, *args)" runs
+        func(shard, *args) where the shard is held.
+    """
+    def __init__(self, executor, shard):
+        self.executor = executor
+        self.shard = shard
+
+    def submit(self, func, *args):
+        """
+            Returns: a future of func(shard, *args).
+        """
+        return self.executor.submit(func, self.shard, *args)
+
+    def close(self):
+        """
+            Releases the shard.
+        """
+        self.shard = None
+
+
+_LOADED_SHARD = None
+
+
+def _load_shard(shard):
+    global _LOADED_SHARD # pylint: disable=global-statement
+    _LOADED_SHARD = shard
+
+
+def _call_with_loaded_shard(func, *args):
+    return func(_LOADED_SHARD, *args)
+
+
+class _ShardInProcess(Shard):
+    """
+        A shard held by its own worker process, which receives it once when
+        it starts.
+    """
+    def __init__(self, shard): # pylint: disable=super-init-not-called
+        self.pool = ProcessPoolExecutor(
+            max_workers=1,
+            initializer=_load_shard,
+            initargs=(shard,)
+        )
+
+    def submit(self, func, *args):
+        return self.pool.submit(_call_with_loaded_shard, func, *args)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class _ShardOnDaskWorker(Shard):
+    """
+        A shard scattered to one dask worker. Work on it runs on that worker.
+    """
+    def __init__(self, client, shard, worker): # pylint: disable=super-init-not-called
+        self.client = client
+        self.worker = worker
+        # Wrapped, so that a list or dict shard is scattered whole.
+        self.future = client.scatter([shard], workers=[worker])[0]
+
+    def submit(self, func, *args):
+        return self.client.submit(
+            func,
+            self.future,
+            *args,
+            workers=[self.worker],
+            pure=False
+        )
+
+    def close(self):
+        self.future.release()
+
+
+class SerialExecutor(Executor):
+    """
+        Runs everything in the calling process, one function at a time.
+        Meant for short runs and unit tests.
+    """
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as exc: # pylint: disable=broad-except
+            future.set_exception(exc)
+
+        return future
+
+
+class _PoolExecutor(Executor):
+    pool_class = None
+
+    def __init__(self, max_workers=None):
+        self.num_workers = max_workers or os.cpu_count() or 1
+        self.pool = None
+
+    def submit(self, func, *args, **kwargs):
+        if self.pool is None:
+            self.pool = self.pool_class(max_workers=self.num_workers) # pylint: disable=not-callable
+
+        return self.pool.submit(func, *args, **kwargs)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+class ThreadExecutor(_PoolExecutor):
+    """
+        Runs functions on a concurrent.futures thread pool.
+
+        Parameters:
+            max_workers: int. Defaults to the number of CPUs.
+    """
+    pool_class = ThreadPoolExecutor
+
+
+class ProcessExecutor(_PoolExecutor):
+    """
+        Runs functions on a concurrent.futures process pool. Functions and
+        their arguments must be picklable.
+
+        Parameters:
+            max_workers: int. Defaults to the number of CPUs.
+    """
+    pool_class = ProcessPoolExecutor
+
+    def place_shards(self, shards):
+        """
+            Starts one worker process per shard, which holds it.
+        """
+        return [_ShardInProcess(shard) for shard in shards]
+
+
+class DaskExecutor(Executor):
+    """
+        Runs functions on a dask cluster.
+
+        Parameters:
+            client: distributed.Client. Defaults to None.
+                If None, a local cluster gets started the first time the
+                executor is used, and shut down by "close".
+    """
+    def __init__(self, client=None):
+        self._client = client
+        self._owns_client = client is None
+
+    @property
+    def client(self):
+        """
+            Returns: distributed.Client
+        """
+        if self._client is None:
+            from distributed import Client # pylint: disable=import-outside-toplevel
+
+            self._client = Client()
+
+        return self._client
+
+    @property
+    def num_workers(self):
+        return get_num_workers(client=self.client)
+
+    def submit(self, func, *args, **kwargs):
+        return self.client.submit(func, *args, pure=False, **kwargs)
+
+    def scatter(self, data):
+        return self.client.scatter(data, broadcast=True)
+
+    def gather(self, futures):
+        return self.client.gather(futures)
+
+    def wait(self, futures, timeout=None, return_when='ALL_COMPLETED'):
+        from distributed import wait # pylint: disable=import-outside-toplevel
+
+        try:
+            wait(futures, timeout=timeout, return_when=return_when)
+        except TimeoutError:
+            pass
+
+        done = {future for future in futures if future.done()}
+
+        return done, set(futures) - done
+
+    def cancel(self, futures):
+        self.client.cancel(list(futures))
+
+    def close(self):
+        if self._owns_client and self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def place_shards(self, shards):
+        """
+            Scatters the shards round-robin over the workers of the cluster.
+        """
+        workers = sorted(self.client.scheduler_info()['workers'].keys())
+
+        return [
+            _ShardOnDaskWorker(
+                client=self.client,
+                shard=shard,
+                worker=workers[index % len(workers)]
+            )
+            for index, shard in enumerate(shards)
+        ]
+
+
+EXECUTORS = {
+    'serial': SerialExecutor,
+    'threads': ThreadExecutor,
+    'processes': ProcessExecutor,
+    'dask': DaskExecutor,
+}
+
+
+def owns_executor(executor):
+    """
+        Parameters:
+            executor: Executor or str.
+                What was passed to get_executor.
+
+        Returns: bool
+            Whether get_executor built a new executor for it, which the
+            caller is then responsible for closing.
+    """
+    return not isinstance(executor, Executor)
+
+
+def get_executor(executor=None, client=None):
+    """
+        Parameters:
+            executor: Executor or str. Defaults to None.
+                One of "serial", "threads", "processes" or "dask", or an
+                Executor instance, which is returned as is.
+
+                If None, it is "dask" when a client is given and "serial"
+                otherwise.
+
+            client: distributed.Client. Defaults to None.
+                Only used by the dask backend.
+
+        Returns: Executor
+    """
+    if isinstance(executor, Executor):
+        return executor
+
+    if executor is not None and not isinstance(executor, str):
+        raise TypeError(
+            'Expected an Executor or the name of one, got {}'.format(
+                type(executor).__name__
+            )
+        )
+
+    if executor is None:
+        executor = 'serial' if client is None else 'dask'
+
+    if executor not in EXECUTORS:
+        raise ValueError(
+            'Unknown executor {}. Possible executors: {}'.format(
+                executor,
+                list(EXECUTORS.keys())
+            )
+        )
+
+    if executor == 'dask':
+        return DaskExecutor(client=client)
+
+    return EXECUTORS[executor]()
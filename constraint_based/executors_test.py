@@ -0,0 +1,101 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import pytest
+
+from causal_discovery.constraint_based.executors import get_executor, \
+    owns_executor, Executor, SerialExecutor, ThreadExecutor, ProcessExecutor, DaskExecutor
+
+
+def square(x):
+    return x * x
+
+@pytest.mark.parametrize('name', ['serial', 'threads', 'processes'])
+def test_map_keeps_order(name):
+    executor = get_executor(name)
+
+    assert executor.map(square, [3, 1, 2]) == [9, 1, 4]
+
+    executor.close()
+
+def test_serial_executor_raises_on_result():
+    future = SerialExecutor().submit(square, None)
+
+    with pytest.raises(TypeError):
+        future.result()
+
+def test_get_executor_defaults():
+    assert isinstance(get_executor(), SerialExecutor)
+    assert isinstance(get_executor('threads'), ThreadExecutor)
+    assert isinstance(get_executor('processes'), ProcessExecutor)
+    assert isinstance(get_executor(client='some client'), DaskExecutor)
+
+    executor = ThreadExecutor(max_workers=2)
+    assert get_executor(executor) is executor
+    assert executor.num_workers == 2
+
+def test_get_executor_unknown():
+    with pytest.raises(ValueError):
+        get_executor('gpu')
+
+def test_get_executor_rejects_other_objects():
+    with pytest.raises(TypeError):
+        get_executor(object())
+
+def test_executor_needs_submit():
+    with pytest.raises(TypeError):
+        Executor() # pylint: disable=abstract-class-instantiated
+
+def test_executors_from_another_import_path_are_recognized():
+    from constraint_based import executors # pylint: disable=import-outside-toplevel
+
+    executor = executors.ThreadExecutor()
+
+    assert get_executor(executor) is executor
+    assert not owns_executor(executor)
+    assert not isinstance(object(), Executor)
+
+    executor.close()
+
+def test_owns_executor():
+    assert owns_executor(None)
+    assert owns_executor('threads')
+    assert not owns_executor(SerialExecutor())
+
+def test_context_manager_closes_the_pool():
+    with get_executor('threads') as executor:
+        assert executor.map(square, [3]) == [9]
+        assert executor.pool is not None
+
+    assert executor.pool is None
+
+def test_dask_client_is_created_lazily():
+    executor = get_executor('dask')
+
+    # pylint: disable=protected-access
+    assert executor._client is None
+
+def test_dask_executor(dask_client):
+    executor = get_executor('dask', client=dask_client)
+
+    assert executor.map(square, [3, 1, 2]) == [9, 1, 4]
+
+def add_to_shard(shard, x):
+    return [value + x for value in shard]
+
+@pytest.mark.parametrize('name', ['serial', 'threads', 'processes'])
+def test_place_shards(name):
+    shards = get_executor(name).place_shards([[1, 2], [10]])
+
+    assert [shard.submit(add_to_shard, 1).result() for shard in shards] == \
+        [[2, 3], [11]]
+
+    for shard in shards:
+        shard.close()
+
+def test_place_shards_on_dask(dask_client):
+    shards = get_executor('dask', client=dask_client).place_shards([[1, 2], [10]])
+
+    assert [shard.submit(add_to_shard, 1).result() for shard in shards] == \
+        [[2, 3], [11]]
+
+    for shard in shards:
+        shard.close()
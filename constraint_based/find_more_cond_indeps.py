@@ -2,9 +2,13 @@ from constraint_based.ci_tests.bmd_is_independent import bmd_is_independent
 from constraint_based.ci_tests.sci_is_independent import sci_is_independent
 from itertools import combinations
 from graphs.marked_pattern_graph import MarkedPatternGraph
+from graphs.union_find import connected_components
 from tqdm import tqdm
-from constraint_based.misc import setup_logging, ConditioningSets, key_for_pair
+from constraint_based.misc import setup_logging, key_for_pair, CorrectedDataCache, \
+    accepts_weights, expand_counts
+from constraint_based.executors import get_executor, owns_executor
 from constraint_based.density_ratio_weighted_correction import DensityRatioWeightedCorrection
+from constraint_based.missingness_profile import MissingnessProfile
 
 class FindMoreCondIndeps():
     """
@@ -19,9 +23,27 @@ class FindMoreCondIndeps():
             data [pandas.DataFrame]
                 Contains data. Each column is a variable.
             graph: Graph
-            cond_sets: misc.ConditioningSets
+            cond_sets: misc.SepSets
             cond_indep_test: function
-                Defaults to bmd_is_independent
+                Defaults to bmd_is_independent. Gets passed "weights": the
+                counts of the rows when the data is a corrected count table,
+                and the weights of data otherwise.
+            missingness_profile: MissingnessProfile. Defaults to None.
+                The profile of data, if it was already made.
+            weights: array-like. Defaults to None.
+                The number of observations each row of data stands for (see
+                misc.deduplicate).
+            executor: Executor or str. Defaults to None, i.e. "serial".
+                The corrections, and the pairs of a depth, run in parallel
+                on it. See constraint_based.executors. One built from a name
+                gets closed when "find" returns.
+            missingness_indicator_prefix: str. Defaults to None, i.e. the
+                prefix of graph.
+            cache_size: int. Defaults to 128.
+                How many corrected count tables to keep (see
+                misc.CorrectedDataCache). The pairs of a depth are corrected
+                and submitted in chunks of that many, so that a chunk's
+                corrections are still cached when its pairs get submitted.
     """
     def __init__(
         self,
@@ -29,11 +51,41 @@ class FindMoreCondIndeps():
         graph,
         cond_sets,
         cond_indep_test=bmd_is_independent,
+        missingness_profile=None,
+        weights=None,
+        executor=None,
+        missingness_indicator_prefix=None,
+        cache_size=128
     ):
+        if missingness_indicator_prefix is None:
+            missingness_indicator_prefix = graph.missingness_indicator_prefix
+
+        if missingness_profile is None:
+            missingness_profile = MissingnessProfile(
+                data,
+                missingness_indicator_prefix=missingness_indicator_prefix,
+                weights=weights
+            )
+
         self.data = data
         self.graph = graph
         self.cond_indep_test = cond_indep_test
         self.cond_sets = cond_sets
+        self.missingness_indicator_prefix = missingness_indicator_prefix
+        self.missingness_profile = missingness_profile
+        self.weights = weights
+        self.executor = get_executor(executor)
+        self._owns_executor = owns_executor(executor)
+        self.cache_size = cache_size
+        self.corrected_data_cache = CorrectedDataCache(
+            DensityRatioWeightedCorrection,
+            data,
+            graph=graph,
+            maxsize=cache_size,
+            missingness_indicator_prefix=missingness_indicator_prefix,
+            missingness_profile=missingness_profile,
+            weights=weights
+        )
 
     def find(self):
         """
@@ -41,70 +93,117 @@ class FindMoreCondIndeps():
             For each pair, find a conditioning set that renders the two variables
             independent.
 
+            The data a pair is tested on (corrected for missingness or not)
+            only depends on the pair and its neighbors, so it's made once
+            per pair and depth, and corrections are shared between pairs
+            (and depths) that have the same variables. The pairs of a depth
+            are tested in parallel, and their separating sets added in the
+            order of the pairs.
         """
         depth = 0
 
         logging = setup_logging()
 
-        nodes = self.graph.get_observable_nodes()
+        try:
+            data = self.executor.scatter(self.data)
 
-        unmarked_arrows = self.graph.get_unmarked_arrows()
-        has_missing_data = self.data.isnull().sum().sum() > 0
-
-        while self._depth_not_greater_than_num_adj_nodes_per_var(depth):
-            visited = {}
-            for node_1, node_2 in combinations(nodes, 2):
-                node_1_neighbors = self.graph.get_neighbors(node_1)
-                node_2_neighbors = self.graph.get_neighbors(node_2)
-
-                _neighbors = node_1_neighbors.union(node_2_neighbors)
-                if key_for_pair((node_1, node_2)) in visited:
-                    continue
-
-                if len(_neighbors.intersection(set({node_1, node_2}))) > 0:
-                    continue
-
-                if node_1 == node_2:
-                    continue
-
-                if not self.graph.has_path((node_1, node_2)):
-                    continue
-
-                neighbors = _neighbors - set({node_1, node_2})
-
-                for conditionable in combinations(neighbors, depth):
-                    # TODO: it's not just about having missing data; we care
-                    # about having missing data that is directly associated to
-                    # one of the variables
-                    if has_missing_data and self._has_common_neighbor_not_immoral(
-                        node_1,
-                        node_2,
-                        node_1_neighbors,
-                        node_2_neighbors,
-                        unmarked_arrows
-                    ):
-                        var_names = neighbors.union(set({node_1, node_2}))
-
-                        _data = DensityRatioWeightedCorrection(
-                            data=self.data,
-                            var_names=var_names,
-                            graph=self.graph,
-                            missingness_indicator_prefix='MI_'
-                        ).correct()
-                    else:
-                        _data = self.data
-
-                    if self.cond_indep_test(
-                        _data,
-                        vars_1=[node_1],
-                        vars_2=[node_2],
-                        conditioning_set=list(conditionable)
-                    ):
+            while self._depth_not_greater_than_num_adj_nodes_per_var(depth):
+                pairs = self._pairs(depth)
+                futures = []
+
+                for start in range(0, len(pairs), self.cache_size):
+                    chunk = pairs[start:start + self.cache_size]
+
+                    self.corrected_data_cache.prefetch(
+                        [var_names for _, _, _, var_names in chunk if var_names is not None],
+                        self.executor
+                    )
+
+                    for node_1, node_2, neighbors, var_names in chunk:
+                        if var_names is None:
+                            _data, weights = data, self.weights
+                        else:
+                            _data, weights = self.corrected_data_cache.get(var_names)
+
+                        futures.append(
+                            self.executor.submit(
+                                separating_sets,
+                                data=_data,
+                                weights=weights,
+                                node_1=node_1,
+                                node_2=node_2,
+                                neighbors=neighbors,
+                                depth=depth,
+                                cond_indep_test=self.cond_indep_test
+                            )
+                        )
+
+                for (node_1, node_2, _, _), future in zip(pairs, futures):
+                    for conditionable in future.result():
                         self.cond_sets.add(node_1, node_2, conditionable)
 
-                visited[key_for_pair((node_1, node_2))] = True
+                depth += 1
+        finally:
+            if self._owns_executor:
+                self.executor.close()
+
+    def _pairs(self, depth):
+        """
+            The pairs of nodes to test at a depth: non-adjacent pairs that
+            are connected and have at least "depth" neighbors.
+
+            Returns: list[tuple]
+                node_1: str
+                node_2: str
+                neighbors: list[str]
+                    Where the conditioning sets get drawn from.
+                var_names: set[str] or None
+                    The variables to correct the data for, or None if the
+                    pair gets tested on the data as is.
+        """
+        nodes = sorted(self.graph.get_observable_nodes())
+
+        unmarked_arrows = self.graph.get_unmarked_arrows()
+        has_missing_data = \
+            len(self.missingness_profile.cols_with_missingness()) > 0
+        components = connected_components(self.graph)
+
+        pairs = []
+
+        for node_1, node_2 in combinations(nodes, 2):
+            node_1_neighbors = self.graph.get_neighbors(node_1)
+            node_2_neighbors = self.graph.get_neighbors(node_2)
 
-            depth += 1
+            _neighbors = node_1_neighbors.union(node_2_neighbors)
+
+            if len(_neighbors.intersection(set({node_1, node_2}))) > 0:
+                continue
+
+            if not components.connected(node_1, node_2):
+                continue
+
+            neighbors = _neighbors - set({node_1, node_2})
+
+            if len(neighbors) < depth:
+                continue
+
+            # TODO: it's not just about having missing data; we care
+            # about having missing data that is directly associated to
+            # one of the variables
+            if has_missing_data and self._has_common_neighbor_not_immoral(
+                node_1,
+                node_2,
+                node_1_neighbors,
+                node_2_neighbors,
+                unmarked_arrows
+            ):
+                var_names = neighbors.union(set({node_1, node_2}))
+            else:
+                var_names = None
+
+            pairs.append((node_1, node_2, sorted(neighbors), var_names))
+
+        return pairs
 
     def _has_common_neighbor_not_immoral(
          self,
@@ -148,3 +247,49 @@ class FindMoreCondIndeps():
 
         return False
 
+
+def separating_sets(
+    data,
+    weights,
+    node_1,
+    node_2,
+    neighbors,
+    depth,
+    cond_indep_test
+):
+    """
+        Parameters:
+            data: pandas.DataFrame
+            weights: array-like or None
+                Passed to cond_indep_test if it's not None and the test
+                takes "weights". If the test doesn't, the rows of data get
+                repeated as many times as their weight instead.
+            node_1: str
+            node_2: str
+            neighbors: list[str]
+            depth: int
+            cond_indep_test: function
+
+        Returns: list[tuple[str]]
+            The subsets of neighbors of size depth that make node_1 and
+            node_2 independent.
+    """
+    test_kwargs = {}
+
+    if weights is not None:
+        if accepts_weights(cond_indep_test):
+            test_kwargs['weights'] = weights
+        else:
+            data = expand_counts(data, weights)
+
+    return [
+        conditionable
+        for conditionable in combinations(neighbors, depth)
+        if cond_indep_test(
+            data,
+            vars_1=[node_1],
+            vars_2=[node_2],
+            conditioning_set=list(conditionable),
+            **test_kwargs
+        )
+    ]
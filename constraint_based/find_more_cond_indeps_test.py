@@ -2,6 +2,9 @@ import pytest
 from constraint_based.pc_skeleton_finder import PCSkeletonFinder
 from constraint_based.find_more_cond_indeps import FindMoreCondIndeps
 from data import dog_example
+import pandas as pd
+from constraint_based.misc import SepSets
+from graphs.marked_pattern_graph import MarkedPatternGraph
 
 def test_dog_example():
     df = dog_example(size=100000)
@@ -41,3 +44,71 @@ def test_dog_example():
         frozenset(('mentally_exhausted_before_bed', 'dog_teeth_brushed')),
         frozenset(('dog_tired', 'dog_teeth_brushed')),
     })
+
+def test_pairs_in_different_components_are_not_tested():
+    df = pd.DataFrame({var: [0, 1] for var in ['a', 'b', 'c', 'd']})
+    graph = MarkedPatternGraph(
+        nodes=['a', 'b', 'c', 'd'],
+        undirected_edges=[('a', 'c'), ('c', 'b')]
+    )
+    tested = []
+
+    def cond_indep_test(data, vars_1, vars_2, conditioning_set, weights=None): # pylint: disable=unused-argument
+        tested.append(set(vars_1 + vars_2))
+
+        return conditioning_set == ['c']
+
+    cond_sets = SepSets()
+
+    FindMoreCondIndeps(
+        data=df,
+        graph=graph,
+        cond_sets=cond_sets,
+        cond_indep_test=cond_indep_test
+    ).find()
+
+    assert cond_sets.get('a', 'b') == set({frozenset({'c'})})
+    assert all('d' not in pair for pair in tested)
+
+def test_missingness_indicator_prefix_comes_from_the_graph():
+    df = pd.DataFrame({'a': [0, None], 'b': [0, 1]})
+    graph = MarkedPatternGraph(
+        nodes=['a', 'b'],
+        missingness_indicator_prefix='missing_'
+    )
+
+    finder = FindMoreCondIndeps(data=df, graph=graph, cond_sets=SepSets())
+
+    assert list(finder.missingness_profile.indicators().columns) == \
+        ['missing_a', 'missing_b']
+
+@pytest.mark.parametrize('cache_size', [1, 128])
+def test_cond_indep_test_without_weights(cache_size):
+    df = pd.DataFrame({
+        'a': [0, 1, 0, 1, None, 1],
+        'b': [0, 1, 1, 0, 1, 1],
+        'c': [1, 1, 0, 0, 1, 0],
+    })
+    graph = MarkedPatternGraph(
+        nodes=['a', 'b', 'c'],
+        undirected_edges=[('a', 'c'), ('c', 'b')]
+    )
+
+    def cond_indep_test(data, vars_1, vars_2, conditioning_set):
+        assert data.notnull().all().all()
+
+        return conditioning_set == ['c']
+
+    cond_sets = SepSets()
+
+    finder = FindMoreCondIndeps(
+        data=df,
+        graph=graph,
+        cond_sets=cond_sets,
+        cond_indep_test=cond_indep_test,
+        cache_size=cache_size
+    )
+    finder.find()
+
+    assert cond_sets.get('a', 'b') == set({frozenset({'c'})})
+    assert len(finder.corrected_data_cache.cache) <= cache_size
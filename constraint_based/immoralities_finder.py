@@ -60,20 +60,25 @@ class ImmoralitiesFinder: #pylint: disable=too-few-public-methods
         immoralities = []
 
         for edge in edges:
-            node_2_neighbors = list(set(self.graph.get_neighbors(edge.node_2)) - set({edge.node_1}))
-            var_set = set({edge.node_2})
+            node_1 = str(edge.node_1)
+            node_2 = str(edge.node_2)
+
+            node_2_neighbors = sorted(
+                set(str(i) for i in self.graph.get_neighbors(node_2)) - set({node_1})
+            )
+            var_set = set({node_2})
 
             for node_2_neighbor in node_2_neighbors:
                 if not self.graph.has_adjacency(
-                        (edge.node_1, node_2_neighbor)
+                        (node_1, node_2_neighbor)
                     ) \
                     and not self.sep_sets.include(
                         some_set=var_set,
-                        node_1=edge.node_1,
+                        node_1=node_1,
                         node_2=node_2_neighbor
                     ):
 
-                    immorality = (edge.node_1, edge.node_2, node_2_neighbor)
+                    immorality = (node_1, node_2, node_2_neighbor)
                     immoralities.append(immorality)
 
         return immoralities
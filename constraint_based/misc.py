@@ -4,12 +4,20 @@
     A library of miscellaneous functions.
 
     - conditioning_sets_satisfying_conditional_independence
+    - CorrectedDataCache
+    - correct_counts
+    - deduplicate
+    - expand_counts
+    - accepts_weights
 """
 
+from collections import OrderedDict
 from itertools import combinations
+import inspect
 import logging
 
 import numpy as np
+import pandas as pd
 
 # pylint: disable=too-many-arguments
 def conditioning_sets_satisfying_conditional_independence(
@@ -21,7 +29,8 @@ def conditioning_sets_satisfying_conditional_independence(
     possible_conditioning_set_vars=None,
     only_find_one=False,
     data_correction=None,
-    marked_pattern_graph=None
+    marked_pattern_graph=None,
+    corrected_data_cache=None
 ):
     """
         Does pairwise conditional independence testing. Tries to find
@@ -58,11 +67,13 @@ def conditioning_sets_satisfying_conditional_independence(
                 If this exists, the class will be passed in the following:
                     data: pandas.DataFrame
                     var_names: list[str]
-                    marked_pattern_graph: MarkedPatternGraph
-                    missing_indicator_prefix: str, Defaults to 'MI_'
-                The instance responds to "correct", which returns a
-                pandas.DataFrame that would hopefully be more representative of
-                the underlying distribution.
+                    graph: MarkedPatternGraph
+                The instance responds to "correct_counts", which returns a
+                count table (a pandas.DataFrame and the weights of its rows)
+                that would hopefully be more representative of the underlying
+                distribution. cond_indep_test then gets the weights as
+                "weights", or the table with each row repeated by its
+                weight if it takes no "weights".
 
             possible_conditioning_set_vars: list. Defaults to None.
                 The list of variables that we could possibly condition on.
@@ -80,6 +91,11 @@ def conditioning_sets_satisfying_conditional_independence(
             marked_pattern_graph: MarkedPatternGraph. Defaults to None.
                 The existing graph.
 
+            corrected_data_cache: CorrectedDataCache. Defaults to None.
+                Where the corrected datasets come from. Pass the same one
+                across pairs to reuse corrections of the same variables. If
+                None, one is made for this call.
+
 
         Returns: list if there's at least one. Otherwise, returns None
     """
@@ -100,6 +116,14 @@ def conditioning_sets_satisfying_conditional_independence(
     else:
         combo_length = len(possible_conditioning_set_vars)
 
+    if data_correction is not None and corrected_data_cache is None:
+        corrected_data_cache = CorrectedDataCache(
+            data_correction=data_correction,
+            data=data,
+            graph=marked_pattern_graph
+        )
+
+    test_takes_weights = accepts_weights(cond_indep_test)
     cond_set_combo_satisfies_cond_ind = []
 
     for cond_set_length in np.arange(combo_length + 1):
@@ -110,20 +134,33 @@ def conditioning_sets_satisfying_conditional_independence(
 
         for cond_set_combo in cond_set_combos:
             if data_correction is not None:
-                _data = data_correction(
-                    data=data,
-                    var_names=set(cond_set_combo)\
-                        .union(set({var_name_1, var_name_2})),
-                    marked_pattern_graph=marked_pattern_graph).correct()
+                _data, weights = corrected_data_cache.get(
+                    set(cond_set_combo).union(set({var_name_1, var_name_2}))
+                )
+
+                test_kwargs = {}
+                if weights is not None:
+                    if test_takes_weights:
+                        test_kwargs['weights'] = weights
+                    else:
+                        _data = expand_counts(_data, weights)
+
+                is_independent = cond_indep_test(
+                    data=_data,
+                    vars_1=[var_name_1],
+                    vars_2=[var_name_2],
+                    conditioning_set=list(cond_set_combo),
+                    **test_kwargs
+                )
             else:
-                _data = data
+                is_independent = cond_indep_test(
+                    data=data,
+                    vars_1=[var_name_1],
+                    vars_2=[var_name_2],
+                    conditioning_set=list(cond_set_combo),
+                )
 
-            if cond_indep_test(
-                   data=_data,
-                   vars_1=[var_name_1],
-                   vars_2=[var_name_2],
-                   conditioning_set=list(cond_set_combo),
-               ):
+            if is_independent:
 
                 cond_set_combo_satisfies_cond_ind.append(set(cond_set_combo))
 
@@ -132,6 +169,215 @@ def conditioning_sets_satisfying_conditional_independence(
 
     return cond_set_combo_satisfies_cond_ind
 
+class CorrectedDataCache:
+    """
+        Least-recently-used cache of corrected count tables. Correcting for
+        missingness regroups the whole dataset, and the same sets of
+        variables come up again across pairs and depths.
+
+        Entries are keyed by the set of variables and the version of the
+        graph, so a correction made before the graph changed isn't reused.
+
+        Parameters:
+            data_correction: class
+                Gets passed data, var_names and graph, and responds to
+                "correct_counts". E.g. DensityRatioWeightedCorrection.
+            data: pandas.DataFrame
+            graph: MarkedPatternGraph. Defaults to None.
+            maxsize: int. Defaults to 128.
+                How many corrected count tables to keep. If None, there's no
+                limit.
+            correction_kwargs:
+                Passed to data_correction as is, e.g. missingness_profile or
+                weights.
+    """
+    def __init__(
+        self,
+        data_correction,
+        data,
+        graph=None,
+        maxsize=128,
+        **correction_kwargs
+    ):
+        self.data_correction = data_correction
+        self.data = data
+        self.graph = graph
+        self.maxsize = maxsize
+        self.correction_kwargs = correction_kwargs
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, var_names):
+        """
+            Parameters:
+                var_names: iterable[str]
+
+            Returns: tuple[pandas.DataFrame, numpy.ndarray]
+                The count table corrected for var_names, and the counts.
+                See DensityRatioWeightedCorrection.correct_counts.
+        """
+        key = self._key(var_names)
+
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+
+            return self.cache[key]
+
+        self.misses += 1
+
+        corrected = correct_counts(
+            self.data_correction,
+            self.data,
+            set(var_names),
+            self.graph,
+            self.correction_kwargs
+        )
+
+        self._store(key, corrected)
+
+        return corrected
+
+    def prefetch(self, var_name_sets, executor):
+        """
+            Makes the corrections that aren't cached yet, in parallel, and
+            caches them. Each distinct set of variables is corrected once.
+
+            Parameters:
+                var_name_sets: iterable[iterable[str]]
+                executor: Executor
+                    See constraint_based.executors.
+        """
+        keys = []
+
+        for var_names in var_name_sets:
+            key = self._key(var_names)
+
+            if key not in self.cache and key not in keys:
+                keys.append(key)
+
+        if len(keys) == 0:
+            return
+
+        data = executor.scatter(self.data)
+
+        futures = [
+            executor.submit(
+                correct_counts,
+                self.data_correction,
+                data,
+                set(var_names),
+                self.graph,
+                self.correction_kwargs
+            )
+            for var_names, _ in keys
+        ]
+
+        self.misses += len(keys)
+
+        for key, corrected in zip(keys, executor.gather(futures)):
+            self._store(key, corrected)
+
+    def _key(self, var_names):
+        return (frozenset(var_names), getattr(self.graph, 'version', None))
+
+    def _store(self, key, corrected):
+        self.cache[key] = corrected
+
+        if self.maxsize is not None and len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+
+def correct_counts(data_correction, data, var_names, graph, correction_kwargs):
+    """
+        Returns: tuple[pandas.DataFrame, numpy.ndarray]
+            data_correction(...).correct_counts(). A module function, so that
+            it can run on any executor.
+    """
+    return data_correction(
+        data=data,
+        var_names=var_names,
+        graph=graph,
+        **correction_kwargs
+    ).correct_counts()
+
+def deduplicate(data):
+    """
+        Collapses data into its distinct rows and the number of times each
+        one appears. Missing values count as a value of their own. Discrete
+        data usually has far fewer distinct rows than rows, and counting
+        code that takes "weights" then only scans the distinct ones.
+
+        Parameters:
+            data: pandas.DataFrame
+
+        Returns: tuple
+            unique_rows: pandas.DataFrame
+                The distinct rows, in order of first appearance, with the
+                dtypes of data and a fresh index.
+            weights: numpy.ndarray[int]
+                The number of rows of data equal to each of them.
+    """
+    group_ids = data.groupby(
+        list(data.columns),
+        dropna=False,
+        sort=False
+    ).ngroup().values
+
+    unique_rows = data[~pd.Series(group_ids).duplicated().values]\
+        .reset_index(drop=True)
+
+    return unique_rows, np.bincount(group_ids)
+
+def expand_counts(table, weights):
+    """
+        The opposite of deduplicate: repeats each row of a count table as
+        many times as its count.
+
+        Parameters:
+            table: pandas.DataFrame
+            weights: array-like[int]
+
+        Returns: pandas.DataFrame
+            With a fresh index.
+    """
+    return table.loc[table.index.repeat(weights)].reset_index(drop=True)
+
+def accepts_weights(func):
+    """
+        Whether a conditional independence test can be passed "weights",
+        i.e. has a parameter named so, or takes **kwargs.
+
+        Parameters:
+            func: callable
+
+        Returns: bool
+    """
+    return accepts_argument(func, 'weights')
+
+def accepts_argument(func, name):
+    """
+        Whether func can be passed the keyword argument name, i.e. has a
+        parameter named so, or takes **kwargs.
+
+        Parameters:
+            func: callable
+            name: str
+
+        Returns: bool
+    """
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+
+    return any(
+        parameter.name == name
+        or parameter.kind == inspect.Parameter.VAR_KEYWORD
+        for parameter in parameters
+    )
+
 def key_for_pair(var_names):
     """
         Used for accessing the cond_sets_that_satisfy_cond_indep.
@@ -159,9 +405,17 @@ class SepSets:
         An object that abstracts adding a conditioning set to an item. This is
         meant to contain the separating sets that make two pairs of variables
         independent.
+
+        Nodes get small integer ids as they're first seen. A pair is keyed by
+        its two ids, and each separating set is stored as an int bitmask of
+        the ids of its nodes. Memory grows with the number of separated
+        pairs, and pickling it (e.g. to ship it to workers) is cheap.
     """
     def __init__(self):
-        self.dict = {}
+        self.ids = {}
+        self.names = []
+        self.masks = {}
+        self._dict = None
 
     def add(
         self,
@@ -176,16 +430,14 @@ class SepSets:
                 node_2: str
                 cond_set: set
         """
-        if key_for_pair((node_1, node_2)) not in self.dict:
-            self.dict[
-                key_for_pair((node_1, node_2))
-            ] = set({})
+        pair = self._pair(node_1, node_2, create=True)
+        mask = self._mask(cond_set, create=True)
 
-        self.dict[
-            key_for_pair((node_1, node_2))
-        ] = self.dict[
-            key_for_pair((node_1, node_2))
-        ].union(set({frozenset(cond_set)}))
+        if pair not in self.masks:
+            self.masks[pair] = set({})
+
+        self.masks[pair].add(mask)
+        self._dict = None
 
     def get(self, node_1, node_2):
         """
@@ -199,13 +451,130 @@ class SepSets:
                 Will raise a KeyError if a separating set for the pair node_1
                 and node_2 hasn't been added.
         """
-        return self.dict[key_for_pair((node_1, node_2))]
+        pair = self._pair(node_1, node_2)
+
+        if pair not in self.masks:
+            raise KeyError(key_for_pair((node_1, node_2)))
+
+        return set(frozenset(self._names_of(mask)) for mask in self.masks[pair])
+
+    def include(self, some_set, node_1, node_2):
+        """
+            Parameters:
+
+                some_set: set
+                node_1: str
+                node_2: str
+
+            Returns: bool
+                True if some_set is part of at least one of the sets that
+                separate node_1 and node_2. False otherwise, including when no
+                separating set was added for the pair.
+
+                The empty set is part of every set, so include(set(), ...)
+                is True for any pair that has a separating set, i.e. it
+                tells whether the pair was separated at all.
+        """
+        pair = self._pair(node_1, node_2)
+
+        if pair not in self.masks:
+            return False
+
+        mask = self._mask(some_set)
+
+        if mask is None:
+            return False
+
+        return any(
+            sep_set & mask == mask for sep_set in self.masks[pair]
+        )
+
+    @property
+    def dict(self):
+        """
+            Returns: dict
+                key: str
+                    Ex: "A _||_ B". See key_for_pair.
+                value: set[frozenset[str]]
+                    The sets that separate the pair.
+
+            It's built the first time it's needed after a change, and
+            shared by later calls, so it shouldn't be modified.
+        """
+        if self._dict is None:
+            self._dict = {
+                key_for_pair((self.names[id_1], self.names[id_2])):
+                    set(frozenset(self._names_of(mask)) for mask in masks)
+                for (id_1, id_2), masks in self.masks.items()
+            }
+
+        return self._dict
+
+    def _pair(self, node_1, node_2, create=False):
+        id_1 = self._id(node_1, create=create)
+        id_2 = self._id(node_2, create=create)
+
+        if id_1 is None or id_2 is None:
+            return None
+
+        return (id_1, id_2) if id_1 < id_2 else (id_2, id_1)
+
+    def _id(self, node, create=False):
+        node = str(node)
+
+        if node not in self.ids:
+            if not create:
+                return None
+
+            self.ids[node] = len(self.names)
+            self.names.append(node)
+
+        return self.ids[node]
+
+    def _mask(self, nodes, create=False):
+        mask = 0
+
+        for node in nodes:
+            node_id = self._id(node, create=create)
+
+            if node_id is None:
+                return None
+
+            mask |= 1 << node_id
+
+        return mask
+
+    def _names_of(self, mask):
+        return [
+            name for node_id, name in enumerate(self.names)
+            if mask >> node_id & 1
+        ]
 
     def __str__(self):
         return str(self.dict)
 
     def __eq__(self, other):
+        if isinstance(other, SepSets):
+            # Same ids for the same nodes, so the masks can be compared as
+            # they are.
+            if self.names == other.names:
+                return self.masks == other.masks
+
+            return self.dict == other.dict
+
         return self.dict == other
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_dict'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault('_dict', None)
+
     def __getitem__(self, item):
-        return self.dict[item]
+        node_1, node_2 = item.split(' _||_ ')
+
+        return self.get(node_1, node_2)
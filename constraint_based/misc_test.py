@@ -0,0 +1,212 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import pickle
+from functools import partial
+import pytest
+import pandas as pd
+from causal_discovery.constraint_based.misc import CorrectedDataCache, SepSets, deduplicate, \
+    conditioning_sets_satisfying_conditional_independence, accepts_weights, expand_counts
+from causal_discovery.constraint_based.executors import get_executor
+from causal_discovery.graphs.marked_pattern_graph import MarkedPatternGraph
+
+
+class CountingCorrection:
+    calls = []
+
+    def __init__(self, data, var_names, graph):
+        self.data = data
+        self.var_names = var_names
+        CountingCorrection.calls.append(frozenset(var_names))
+
+    def correct_counts(self):
+        table = self.data[sorted(self.var_names)]
+
+        return table, [1] * table.shape[0]
+
+def test_corrected_data_cache_reuses_corrections():
+    CountingCorrection.calls = []
+    df = pd.DataFrame({'x': [0, 1], 'y': [1, 0], 'z': [0, 0]})
+    graph = MarkedPatternGraph(nodes=['x', 'y', 'z'])
+    cache = CorrectedDataCache(CountingCorrection, data=df, graph=graph)
+
+    first = cache.get(['x', 'y'])
+    assert cache.get(['y', 'x']) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # a change in the graph makes earlier corrections stale
+    graph.add_undirected_edge(('x', 'y'))
+    cache.get(['x', 'y'])
+
+    assert CountingCorrection.calls == [frozenset({'x', 'y'})] * 2
+
+def test_corrected_data_cache_evicts_least_recently_used():
+    CountingCorrection.calls = []
+    df = pd.DataFrame({'x': [0, 1], 'y': [1, 0], 'z': [0, 0]})
+    cache = CorrectedDataCache(CountingCorrection, data=df, maxsize=2)
+
+    cache.get(['x'])
+    cache.get(['y'])
+    cache.get(['x'])
+    cache.get(['z'])
+
+    assert set(key for key, _ in cache.cache.keys()) == \
+        set({frozenset({'x'}), frozenset({'z'})})
+
+def test_corrected_data_cache_prefetch_corrects_each_set_once():
+    CountingCorrection.calls = []
+    df = pd.DataFrame({'x': [0, 1], 'y': [1, 0], 'z': [0, 0]})
+    cache = CorrectedDataCache(CountingCorrection, data=df)
+    cache.get(['x'])
+
+    cache.prefetch([['x'], ['x', 'y'], ['y', 'x']], get_executor('threads'))
+
+    assert sorted(CountingCorrection.calls, key=len) == [
+        frozenset({'x'}),
+        frozenset({'x', 'y'})
+    ]
+    assert cache.get(['x', 'y'])[0].columns.tolist() == ['x', 'y']
+    assert len(CountingCorrection.calls) == 2
+
+def test_conditioning_sets_share_corrections_through_cache():
+    CountingCorrection.calls = []
+    df = pd.DataFrame({'x': [0, 1], 'y': [1, 0], 'z': [0, 0]})
+    cache = CorrectedDataCache(CountingCorrection, data=df)
+
+    for _ in range(2):
+        conditioning_sets_satisfying_conditional_independence(
+            data=df,
+            var_name_1='x',
+            var_name_2='y',
+            cond_indep_test=lambda **kwargs: False,
+            possible_conditioning_set_vars=['z'],
+            data_correction=CountingCorrection,
+            corrected_data_cache=cache
+        )
+
+    assert sorted(CountingCorrection.calls, key=len) == [
+        frozenset({'x', 'y'}),
+        frozenset({'x', 'y', 'z'})
+    ]
+
+def test_corrected_counts_are_expanded_for_tests_without_weights():
+    df = pd.DataFrame({'x': [0, 1, 1], 'y': [1, 0, 0]})
+    num_rows = []
+
+    def without_weights(data, vars_1, vars_2, conditioning_set):
+        num_rows.append(data.shape[0])
+        return False
+
+    class DoublingCorrection(CountingCorrection):
+        def correct_counts(self):
+            table, weights = super().correct_counts()
+
+            return table, [2] * len(weights)
+
+    conditioning_sets_satisfying_conditional_independence(
+        data=df,
+        var_name_1='x',
+        var_name_2='y',
+        cond_indep_test=without_weights,
+        data_correction=DoublingCorrection,
+        marked_pattern_graph=MarkedPatternGraph(nodes=['x', 'y'])
+    )
+
+    assert num_rows == [6]
+
+def test_sep_sets():
+    sep_sets = SepSets()
+    sep_sets.add('b', 'a', set({'c', 'd'}))
+    sep_sets.add('a', 'b', set({'e'}))
+    sep_sets.add('a', 'b', ['d', 'c'])
+    sep_sets.add('c', 'e', set())
+
+    assert sep_sets.get('a', 'b') == set({frozenset({'c', 'd'}), frozenset({'e'})})
+    assert sep_sets['a _||_ b'] == sep_sets.get('b', 'a')
+    assert sep_sets.get('e', 'c') == set({frozenset()})
+    assert sep_sets == {
+        'a _||_ b': set({frozenset({'c', 'd'}), frozenset({'e'})}),
+        'c _||_ e': set({frozenset()}),
+    }
+
+    with pytest.raises(KeyError):
+        sep_sets.get('a', 'c')
+
+def test_sep_sets_include():
+    sep_sets = SepSets()
+    sep_sets.add('a', 'b', set({'c', 'd'}))
+
+    assert sep_sets.include(set({'c'}), 'b', 'a')
+    assert sep_sets.include(set({'c', 'd'}), 'a', 'b')
+    assert sep_sets.include(set(), 'a', 'b')
+    assert not sep_sets.include(set({'c', 'e'}), 'a', 'b')
+    assert not sep_sets.include(set({'unseen'}), 'a', 'b')
+    assert not sep_sets.include(set({'c'}), 'a', 'd')
+
+def test_sep_sets_pickle():
+    sep_sets = SepSets()
+    sep_sets.add('a', 'b', set({'c'}))
+
+    assert pickle.loads(pickle.dumps(sep_sets)) == sep_sets
+
+def test_sep_sets_dict_is_rebuilt_after_add():
+    sep_sets = SepSets()
+    sep_sets.add('a', 'b', set({'c'}))
+
+    assert sep_sets.dict is sep_sets.dict
+    assert str(sep_sets) == str({'a _||_ b': set({frozenset({'c'})})})
+
+    sep_sets.add('a', 'c', set())
+
+    assert sep_sets.dict == {
+        'a _||_ b': set({frozenset({'c'})}),
+        'a _||_ c': set({frozenset()}),
+    }
+
+def test_sep_sets_equal_whatever_order_nodes_were_seen_in():
+    sep_sets_1 = SepSets()
+    sep_sets_1.add('a', 'b', set({'c'}))
+    sep_sets_1.add('a', 'd', set())
+
+    sep_sets_2 = SepSets()
+    sep_sets_2.add('d', 'a', set())
+    sep_sets_2.add('b', 'a', set({'c'}))
+
+    assert sep_sets_1 == sep_sets_2
+
+    sep_sets_2.add('a', 'b', set({'d'}))
+
+    assert sep_sets_1 != sep_sets_2
+
+def test_deduplicate_counts_missing_values_as_values():
+    df = pd.DataFrame({
+        'x': [0, 0, None, None, 1, 0],
+        'y': [True, True, False, False, True, False],
+    })
+
+    unique_rows, weights = deduplicate(df)
+
+    assert unique_rows['x'].isnull().tolist() == [False, True, False, False]
+    assert unique_rows['x'].fillna(-1).tolist() == [0, -1, 1, 0]
+    assert unique_rows['y'].tolist() == [True, False, True, False]
+    assert list(weights) == [2, 2, 1, 1]
+    assert list(unique_rows.dtypes) == list(df.dtypes)
+    assert list(unique_rows.index) == [0, 1, 2, 3]
+
+def test_accepts_weights():
+    def with_weights(data, vars_1, vars_2, conditioning_set, weights=None): # pylint: disable=unused-argument
+        pass
+
+    def without_weights(data, vars_1, vars_2, conditioning_set): # pylint: disable=unused-argument
+        pass
+
+    assert accepts_weights(with_weights)
+    assert accepts_weights(partial(with_weights, weights=[1]))
+    assert accepts_weights(lambda **kwargs: True)
+    assert not accepts_weights(without_weights)
+
+def test_expand_counts_undoes_deduplicate():
+    df = pd.DataFrame({'a': [0, 1, 0, 0], 'b': [1, 1, 1, 0]})
+
+    expanded = expand_counts(*deduplicate(df))
+
+    assert expanded.sort_values(['a', 'b']).values.tolist() == \
+        df.sort_values(['a', 'b']).values.tolist()
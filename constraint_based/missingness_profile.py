@@ -0,0 +1,168 @@
+"""
+    missingness_profile.py
+
+    Which values of a dataset are missing, worked out once and shared by the
+    stages that need it (finding the direct causes of missingness, and
+    correcting for it).
+
+    - MissingnessProfile
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class MissingnessProfile:
+    """
+        The distinct missingness patterns of a dataset. A pattern is the set
+        of columns missing in a row; rows are stored as the index of their
+        pattern, and the patterns as packed booleans (one bit per column).
+
+        Missingness indicators (e.g. "MI_x") are unpacked from the patterns
+        into one frame the first time they're asked for. It's kept, and
+        later requests take the columns they need from it.
+
+        Parameters:
+            data: pandas.DataFrame
+            missingness_indicator_prefix: str. Defaults to 'MI_'.
+            weights: array-like. Defaults to None.
+                The number of observations each row stands for (see
+                misc.deduplicate). Counts are in observations.
+    """
+    def __init__(self, data, missingness_indicator_prefix='MI_', weights=None):
+        self.columns = list(data.columns)
+        self.index = data.index
+        self.missingness_indicator_prefix = missingness_indicator_prefix
+
+        packed_rows = np.packbits(data.isnull().values, axis=1)
+
+        self.patterns, self.pattern_of_row = np.unique(
+            packed_rows,
+            axis=0,
+            return_inverse=True
+        )
+        self.pattern_of_row = self.pattern_of_row.reshape(-1)
+
+        if weights is None:
+            weights = np.ones(data.shape[0], dtype=int)
+
+        weights = np.asarray(weights)
+
+        self.num_rows = weights.sum()
+        self.rows_per_pattern = np.bincount(
+            self.pattern_of_row,
+            weights=weights,
+            minlength=self.patterns.shape[0]
+        ).astype(weights.dtype)
+
+        self.missing_counts = pd.Series(
+            self._pattern_masks().T.astype(int) @ self.rows_per_pattern,
+            index=self.columns
+        )
+
+        self._indicators = None
+
+    def cols_with_missingness(self):
+        """
+            Returns: list[str]
+                The columns with at least one missing value, in the order of
+                the columns of the data.
+        """
+        return list(self.missing_counts[self.missing_counts > 0].index)
+
+    def rows_of_pattern(self, pattern):
+        """
+            Parameters:
+                pattern: int
+                    Index of a pattern.
+
+            Returns: numpy.ndarray
+                The positions of the rows that have the pattern.
+        """
+        return np.flatnonzero(self.pattern_of_row == pattern)
+
+    def missing_columns_of_pattern(self, pattern):
+        """
+            Returns: list[str]
+                The columns missing in the rows of the pattern.
+        """
+        mask = self._pattern_masks()[pattern]
+
+        return [column for column, missing in zip(self.columns, mask) if missing]
+
+    def complete_rows(self, columns):
+        """
+            Test-wise deletion: the rows where none of the columns are
+            missing. Only the patterns get looked at.
+
+            Parameters:
+                columns: iterable[str]
+
+            Returns: numpy.ndarray[bool]
+                One per row.
+        """
+        positions = [self.columns.index(column) for column in columns]
+        complete_patterns = ~self._pattern_masks()[:, positions].any(axis=1)
+
+        return complete_patterns[self.pattern_of_row]
+
+    def indicator(self, column):
+        """
+            Parameters:
+                column: str
+
+            Returns: numpy.ndarray[bool]
+                Whether the column is missing, per row.
+        """
+        return self.indicators()[self.missingness_indicator_prefix + column].values
+
+    def indicators(self, columns=None):
+        """
+            Parameters:
+                columns: iterable[str]. Defaults to all the columns.
+
+            Returns: pandas.DataFrame
+                The missingness indicators of the columns, named with the
+                prefix (e.g. "MI_x"), with the index of the data. Without
+                columns, it's the frame that's kept, which shouldn't be
+                modified.
+        """
+        if self._indicators is None:
+            self._indicators = pd.DataFrame(
+                self._pattern_masks()[self.pattern_of_row],
+                columns=[
+                    self.missingness_indicator_prefix + column
+                    for column in self.columns
+                ],
+                index=self.index
+            )
+
+        if columns is None:
+            return self._indicators
+
+        return self._indicators[
+            [self.missingness_indicator_prefix + column for column in columns]
+        ]
+
+    def with_indicators(self, data, columns=None):
+        """
+            Parameters:
+                data: pandas.DataFrame
+                    The profiled data, or a subset of its columns.
+                columns: iterable[str]. Defaults to the columns of data.
+                    Whose missingness indicators get added.
+
+            Returns: pandas.DataFrame
+                data, followed by the missingness indicators of the columns.
+        """
+        if columns is None:
+            columns = data.columns
+
+        return pd.concat([data, self.indicators(columns)], axis=1)
+
+    def _pattern_masks(self):
+        return np.unpackbits(
+            self.patterns,
+            axis=1,
+            count=len(self.columns)
+        ).astype(bool)
@@ -0,0 +1,66 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import numpy as np
+import pandas as pd
+from causal_discovery.constraint_based.missingness_profile import MissingnessProfile
+
+
+def make_data():
+    return pd.DataFrame({
+        'x': [0, np.nan, 1, np.nan, 1, 0],
+        'y': [1, 0, np.nan, np.nan, 1, 1],
+        'z': [0, 1, 0, 1, 0, 1],
+    }, index=[10, 11, 12, 13, 14, 15])
+
+def test_patterns_and_counts():
+    profile = MissingnessProfile(make_data())
+
+    # complete, x missing, y missing, x and y missing
+    assert profile.patterns.shape[0] == 4
+    assert profile.rows_per_pattern.sum() == 6
+    assert profile.missing_counts.to_dict() == {'x': 2, 'y': 2, 'z': 0}
+    assert profile.cols_with_missingness() == ['x', 'y']
+
+    patterns = {
+        tuple(profile.missing_columns_of_pattern(pattern)):
+            list(profile.rows_of_pattern(pattern))
+        for pattern in range(profile.patterns.shape[0])
+    }
+
+    assert patterns == {
+        (): [0, 4, 5],
+        ('x',): [1],
+        ('y',): [2],
+        ('x', 'y'): [3],
+    }
+
+def test_indicators_match_isnull():
+    data = make_data()
+    profile = MissingnessProfile(data)
+
+    expected = data.isnull().add_prefix('MI_')
+
+    pd.testing.assert_frame_equal(profile.indicators(), expected)
+    pd.testing.assert_frame_equal(
+        profile.with_indicators(data[['x', 'z']]),
+        data[['x', 'z']].merge(
+            expected[['MI_x', 'MI_z']],
+            left_index=True,
+            right_index=True
+        )
+    )
+
+def test_indicators_are_made_once():
+    profile = MissingnessProfile(make_data())
+
+    assert profile.indicators() is profile.indicators()
+    assert list(profile.indicators(['y']).columns) == ['MI_y']
+    assert list(profile.indicator('x')) == \
+        [False, True, False, True, False, False]
+
+def test_complete_rows_is_test_wise_deletion():
+    data = make_data()
+    profile = MissingnessProfile(data)
+
+    for columns in [['x'], ['x', 'z'], ['x', 'y'], ['z']]:
+        assert list(profile.complete_rows(columns)) == \
+            list(data[columns].notnull().all(axis=1))
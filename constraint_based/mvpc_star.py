@@ -12,8 +12,12 @@ from constraint_based.immoralities_finder import ImmoralitiesFinder
 from constraint_based.density_ratio_weighted_correction import DensityRatioWeightedCorrection
 from constraint_based.recursive_edge_orienter import RecursiveEdgeOrienter
 from graphs.marked_pattern_graph import MarkedPatternGraph
+from graphs.partial_ancestral_graph import PartialAncestralGraph
 from information_theory import conditional_mutual_information
-from constraint_based.misc import setup_logging
+from constraint_based.misc import setup_logging, deduplicate, accepts_weights
+from constraint_based.executors import get_executor, owns_executor, \
+    SerialExecutor
+from constraint_based.missingness_profile import MissingnessProfile
 
 class MVPCStar(object):
     """
@@ -44,6 +48,34 @@ class MVPCStar(object):
                 Columns are variables, and rows are instances. May have missing
                 data, denoted as NaN.
 
+            executor: constraint_based.executors.Executor or str.
+                Defaults to "serial".
+                Where the skeleton search runs its batches of tests, and
+                where the searches for direct causes of missingness and for
+                removable edges run: "serial", "threads", "processes" or
+                "dask". One built from a name gets closed when "predict"
+                returns.
+
+            stable: bool. Defaults to None.
+                Whether the skeleton search runs PC-stable (see
+                PCSkeletonFinder). Only stable mode spreads the tests of a
+                depth over the executor: without it, they run one batch at a
+                time. None means True for any executor but "serial", so
+                that the skeleton search gets the parallelism too.
+
+            deduplicate_rows: bool. Defaults to None.
+                If True, data is collapsed into its distinct rows and their
+                counts (see constraint_based.misc.deduplicate) up front, and
+                every stage works on those, passing the counts to
+                cond_indep_test as "weights". The results are the same, but
+                the cost of a test then depends on the number of distinct
+                rows rather than of rows.
+
+                None means True if cond_indep_test takes "weights" (see
+                constraint_based.misc.accepts_weights), and False otherwise.
+                True with a cond_indep_test that doesn't raises a
+                ValueError.
+
         Returns: graphs.marked_pattern_graph.MarkedPatternGraph
 
             A Marked Pattern represents a set of DAGs (Pearl, 2009). It has
@@ -275,33 +307,107 @@ class MVPCStar(object):
         self,
         data,
         cond_indep_test=bmd_is_independent,
-        missingness_indicator_prefix='MI_'
+        missingness_indicator_prefix='MI_',
+        executor='serial',
+        deduplicate_rows=None,
+        stable=None
     ):
-        self.data = data.copy()
+        if deduplicate_rows is None:
+            deduplicate_rows = accepts_weights(cond_indep_test)
+        elif deduplicate_rows and not accepts_weights(cond_indep_test):
+            raise ValueError(
+                'deduplicate_rows needs a cond_indep_test that takes "weights".'
+            )
+
+        if deduplicate_rows:
+            self.data, self.weights = deduplicate(data)
+        else:
+            self.data, self.weights = data.copy(), None
+
         self.orig_columns = data.columns
         self.missingness_indicator_prefix = missingness_indicator_prefix
         self.cond_indep_test=cond_indep_test
+        self.executor = get_executor(executor)
+        self._owns_executor = owns_executor(executor)
+
+        if stable is None:
+            stable = not isinstance(self.executor, SerialExecutor)
+
+        self.stable = stable
         # self.max_depth=max_depth
 
     def predict(self, debug=False):
+        """
+            Parameters:
+                debug: bool. Defaults to False.
+                    If True, "debug_info" gets a snapshot of the graph (see
+                    MarkedPatternGraph.snapshot) after each stage, and the
+                    separating sets after the stages that change them.
+                    Snapshots are cheap: the changes made to the graph are
+                    logged, and a snapshot's graph gets rebuilt from the
+                    log by calling its "graph()".
+
+            Returns: graphs.marked_pattern_graph.MarkedPatternGraph
+        """
+        try:
+            return self._predict(debug)
+        finally:
+            if self._owns_executor:
+                self.executor.close()
+
+    def _predict(self, debug):
         logging = setup_logging()
 
         self.debug_info = []
 
+        def capture(name, graph, cond_sets=None):
+            if not debug:
+                return
+
+            info = {'name': name, 'graph': graph.snapshot()}
+
+            if cond_sets is not None:
+                info['cond_sets'] = dict(cond_sets.dict)
+
+            self.debug_info.append(info)
+
         logging.info('Finding skeleton...')
 
+        skeleton = PartialAncestralGraph(
+            variables=list(self.orig_columns),
+            complete=True
+        )
+
+        missingness_profile = MissingnessProfile(
+            self.data,
+            missingness_indicator_prefix=self.missingness_indicator_prefix,
+            weights=self.weights
+        )
+
         skeleton_finder = PCSkeletonFinder(
             data=self.data,
-            cond_indep_test=self.cond_indep_test
+            graph=skeleton,
+            cond_indep_test=self.cond_indep_test,
+            executor=self.executor,
+            stable=self.stable,
+            weights=self.weights,
+            missingness_profile=missingness_profile
+        )
+
+        cond_sets = skeleton_finder.find()
+
+        graph = MarkedPatternGraph(
+            nodes=list(self.orig_columns),
+            undirected_edges=[
+                (str(edge.node_1), str(edge.node_2))
+                for edge in skeleton.get_edges()
+            ]
         )
 
-        graph, cond_sets = skeleton_finder.find()
+        if debug:
+            graph.record_mutations()
 
-        self.debug_info.append({
-            'name': 'after skeleton finding',
-            'graph': graph.copy(),
-            'cond_sets': dict(cond_sets.dict)
-        })
+        capture('after skeleton finding', graph, cond_sets)
 
         logging.info('Done finding skeleton. Now Finding direct causes of missingness...')
 
@@ -309,15 +415,15 @@ class MVPCStar(object):
             data=self.data,
             graph=graph,
             missingness_indicator_prefix=self.missingness_indicator_prefix,
-            cond_indep_test=self.cond_indep_test
+            cond_indep_test=self.cond_indep_test,
+            executor=self.executor,
+            missingness_profile=missingness_profile,
+            weights=self.weights
         ).find()
 
         graph.add_marked_arrows(marked_arrows)
 
-        self.debug_info.append({
-            'name': 'after adding direct causes of missingness',
-            'graph': graph.copy()
-        })
+        capture('after adding direct causes of missingness', graph)
 
         logging.info('Done finding direct causes of missingness. Now finding potential edges to remove...')
 
@@ -334,39 +440,44 @@ class MVPCStar(object):
             cond_sets=cond_sets,
             graph=graph,
             missingness_indicator_prefix=self.missingness_indicator_prefix,
-            cond_indep_test=self.cond_indep_test
+            cond_indep_test=self.cond_indep_test,
+            executor=self.executor,
+            missingness_profile=missingness_profile,
+            weights=self.weights
         ).find()
 
         graph.remove_undirected_edges(edges_to_remove)
 
-        self.debug_info.append({
-            'name': 'after removing undirected edges',
-            'graph': graph.copy(),
-            'cond_sets': dict(cond_sets.dict)
-        })
+        for edge in edges_to_remove:
+            skeleton.remove_edge(tuple(edge))
+
+        capture('after removing undirected edges', graph, cond_sets)
 
         logging.info('Done removing extraneous edges. Now finding immoralities...')
 
+        # The skeleton, with the same edges removed, is what
+        # ImmoralitiesFinder knows how to walk.
         immoralities = ImmoralitiesFinder(
-            marked_pattern_graph=graph,
-            cond_sets=cond_sets
+            graph=skeleton,
+            sep_sets=cond_sets
         ).find()
 
-        graph.add_arrowheads(immoralities)
+        graph.add_arrowheads(
+            (parent, collider)
+            for parent_1, collider, parent_2 in immoralities
+            for parent in (parent_1, parent_2)
+        )
 
-        self.debug_info.append({
-            'name': 'after adding immoralities',
-            'graph': graph.copy()
-        })
+        capture('after adding immoralities', graph)
 
         logging.info('Done finding immoralities. Now recursively orienting edges...')
 
         RecursiveEdgeOrienter(marked_pattern_graph=graph).orient()
 
-        self.debug_info.append({
-            'name': 'after recursively orienting edges',
-            'graph': graph.copy()
-        })
+        capture('after recursively orienting edges', graph)
+
+        if debug:
+            graph.record_mutations(False)
 
         logging.info('Done recursively orienting edges!')
 
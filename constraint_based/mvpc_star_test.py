@@ -1,5 +1,26 @@
 import pytest
+import pandas as pd
 from constraint_based.mvpc_star import MVPCStar
+from graphs.marked_pattern_graph import MarkedPatternGraph
+
+def without_weights(data, vars_1, vars_2, conditioning_set): # pylint: disable=unused-argument
+    return False
+
+def test_rows_are_deduplicated_only_for_tests_that_take_weights():
+    df = pd.DataFrame({'a': [0, 0, 1], 'b': [1, 1, 0]})
+
+    assert MVPCStar(data=df).weights.tolist() == [2, 1]
+    assert MVPCStar(data=df, cond_indep_test=without_weights).weights is None
+
+    with pytest.raises(ValueError):
+        MVPCStar(data=df, cond_indep_test=without_weights, deduplicate_rows=True)
+
+def test_skeleton_search_is_stable_with_parallel_executors():
+    df = pd.DataFrame({'a': [0, 0, 1], 'b': [1, 1, 0]})
+
+    assert not MVPCStar(data=df).stable
+    assert MVPCStar(data=df, executor='threads').stable
+    assert not MVPCStar(data=df, executor='threads', stable=False).stable
 
 def test_long_chains_and_collider_without_MI(df_long_chains_and_collider_without_MI):
     df = df_long_chains_and_collider_without_MI(size=50000)
@@ -53,6 +74,43 @@ def test_chain_and_collider_with_MI(df_chain_and_collider_with_MI):
         ('d', 'MI_a')
     })
 
+def test_debug_snapshots_replay_to_the_graph_of_each_stage(
+    df_chain_and_collider_without_MI,
+    monkeypatch
+):
+    df = df_chain_and_collider_without_MI()
+    copies = []
+    snapshot = MarkedPatternGraph.snapshot
+
+    def snapshot_and_copy(graph):
+        copies.append(graph.copy())
+
+        return snapshot(graph)
+
+    monkeypatch.setattr(MarkedPatternGraph, 'snapshot', snapshot_and_copy)
+
+    mvpc_star = MVPCStar(data=df)
+    graph = mvpc_star.predict(debug=True)
+
+    assert [info['name'] for info in mvpc_star.debug_info] == [
+        'after skeleton finding',
+        'after adding direct causes of missingness',
+        'after removing undirected edges',
+        'after adding immoralities',
+        'after recursively orienting edges',
+    ]
+    assert len(copies) == len(mvpc_star.debug_info)
+
+    for info, copy in zip(mvpc_star.debug_info, copies):
+        assert info['graph'].graph() == copy
+
+    assert mvpc_star.debug_info[-1]['graph'].graph() == graph
+    assert mvpc_star.debug_info[0]['graph'].graph().get_unmarked_arrows() == set()
+
+    mvpc_star.predict()
+
+    assert mvpc_star.debug_info == []
+
 def test_chain_and_collider_without_MI(df_chain_and_collider_without_MI):
     df = df_chain_and_collider_without_MI()
 
@@ -4,15 +4,24 @@
 """
 
 
-from itertools import combinations
+import hashlib
+import os
+import pickle
 import time
-import dask
 from collections import deque
+from functools import partial
 
-from distributed import Client
+import numpy as np
+import pandas as pd
 
+from causal_discovery.constraint_based.adjacencies import Adjacencies, candidate_tests
 from causal_discovery.constraint_based.ci_tests.bmd_is_independent import bmd_is_independent
-from causal_discovery.constraint_based.misc import setup_logging, SepSets
+from causal_discovery.constraint_based.conditioning_set_orderings import get_ordering, \
+    default_ordering
+from causal_discovery.constraint_based.executors import get_executor, owns_executor
+from causal_discovery.constraint_based.misc import setup_logging, SepSets, \
+    accepts_weights, accepts_argument, expand_counts
+from causal_discovery.constraint_based.sharded_counts import ShardedCounts
 
 # from pc_skeleton_finder import PCSkeletonFinder
 from causal_discovery.data import dog_example
@@ -20,13 +29,6 @@ from causal_discovery.errors import SubprocessError
 from causal_discovery.graphs.partial_ancestral_graph import PartialAncestralGraph as Graph
 # pylint: disable=too-few-public-methods
 
-def get_num_workers(client):
-    """
-    Get the number of workers from a Dask client
-    """
-    return len(client.scheduler_info()['workers'])
-
-
 class PCSkeletonFinder():
     """
         Finds the set of undirected edges among nodes, along with conditioning
@@ -42,6 +44,92 @@ class PCSkeletonFinder():
                     - remove_edge((node_1, node_2))
             cond_indep_test: function.
                 Defaults to bmd_is_independent
+            timeout_limit: float. Defaults to 172,800 (i.e. two days).
+                Wall-clock budget for "find", in seconds. Once it's exceeded,
+                no new tests are launched, in-flight work is cancelled, and
+                "find" returns what it has found so far. See "timed_out",
+                "depth_reached" and "untested_edges". If None, there is no
+                budget.
+            stable: bool. Defaults to False.
+                If True, run PC-stable: the conditioning candidates of every
+                edge come from an adjacency snapshot taken at the start of
+                each depth, and the removals found at that depth are applied
+                in one pass at the end of it. Every edge test within a depth
+                is then independent of the others, so the result doesn't
+                depend on how edges are batched across workers.
+
+                If False, edges are tested in order and removed as soon as
+                they're found, so later edges see the smaller neighborhoods
+                (as in the original PC). The edges are split into contiguous
+                batches that run one after the other, each starting from the
+                removals of the ones before it, so the result doesn't depend
+                on the executor or on the number of workers either, but the
+                batches of a depth don't run in parallel.
+            executor: Executor or str. Defaults to None.
+                Where the batches of tests run: "serial", "threads",
+                "processes" or "dask", or an Executor. If None, it's "dask"
+                when a client is given and "serial" otherwise. See
+                constraint_based.executors.
+
+                The batches of a depth only run in parallel with
+                stable=True. Without it, they run one at a time (see
+                stable), whatever the executor.
+
+                An executor built from a name gets closed when "find" or
+                "resume" returns. One that's passed in is left open.
+            client: distributed.Client. Defaults to None.
+                Used by the "dask" executor.
+            checkpoint_path: str. Defaults to None.
+                If given, the state of the search is written there after
+                every depth, and when time runs out, so that "resume" can
+                continue it.
+            checkpoint_every: int. Defaults to None.
+                If given, a checkpoint is also written within a depth every
+                time that many more edges have been tested.
+            ordering: str or function. Defaults to "default".
+                The order in which the candidate conditioning sets of an edge
+                are tried. "default" is lexicographic. "association" tries
+                first the candidates most associated with both nodes of the
+                edge. See constraint_based.conditioning_set_orderings.
+
+                "association" counts every pair of variables once before the
+                search starts, on the shards if num_shards is given.
+
+                The number of tests run on each edge is kept in "num_tests".
+                "tests_per_removed_edge" summarizes it, so that orderings can
+                be compared.
+            num_shards: int. Defaults to None.
+                If given, the rows of data are split into that many shards,
+                held by the workers of the executor (one process per shard
+                for "processes", round-robin over the workers for "dask").
+                The whole dataset is then never shipped to a worker. At each
+                depth, the next candidate test of every edge is answered in
+                rounds: the shards count the rows of the columns involved,
+                the partial counts get summed, and cond_indep_test runs on
+                the summed count table, with the counts passed as "weights".
+                A cond_indep_test that doesn't take "weights" gets the rows
+                of the table repeated as many times as their count instead.
+
+                Decisions within a depth only use the adjacencies at the
+                start of the depth, as with stable=True.
+            max_depth: int. Defaults to None.
+                The largest conditioning set to try. If None, the search goes
+                on while some node has enough neighbors.
+            max_tests_per_edge: int. Defaults to None.
+                The most tests an edge gets at each depth. When an edge runs
+                out of budget before running out of conditioning sets, it's
+                kept, and the depth is recorded in "capped_edges". This stops
+                hub nodes from stalling a depth with a huge number of
+                combinations. If None, there's no limit.
+            weights: array-like. Defaults to None.
+                The number of observations each row of data stands for, e.g.
+                when data is the distinct rows returned by misc.deduplicate.
+                It gets passed to cond_indep_test as "weights". Can't be used
+                with num_shards.
+            missingness_profile: MissingnessProfile. Defaults to None.
+                The profile of data. Passed to a cond_indep_test that takes
+                "missingness_profile", for test-wise deletion. Ignored with
+                num_shards, since the tests then get count tables.
     """
     def __init__(
         self,
@@ -49,12 +137,34 @@ class PCSkeletonFinder():
         graph,
         cond_indep_test=bmd_is_independent,
         timeout_limit=172_800,
-        client=None
+        client=None,
+        stable=False,
+        executor=None,
+        checkpoint_path=None,
+        checkpoint_every=None,
+        ordering=None,
+        num_shards=None,
+        max_depth=None,
+        max_tests_per_edge=None,
+        weights=None,
+        missingness_profile=None
     ):
-        if client is None:
-            self.client = Client()
-        else:
-            self.client = client
+        if weights is not None:
+            if num_shards is not None:
+                raise ValueError("weights can't be used with num_shards.")
+
+            cond_indep_test = partial(cond_indep_test, weights=weights)
+
+        if missingness_profile is not None and num_shards is None \
+                and accepts_argument(cond_indep_test, 'missingness_profile'):
+            cond_indep_test = partial(
+                cond_indep_test,
+                missingness_profile=missingness_profile
+            )
+
+        self.client = client
+        self.executor = get_executor(executor, client=client)
+        self._owns_executor = owns_executor(executor)
 
         self.data = data
         self.graph = graph
@@ -62,6 +172,29 @@ class PCSkeletonFinder():
         self.cond_indep_test = cond_indep_test
         self.logging = setup_logging()
         self.timeout_limit = timeout_limit
+        self.stable = stable
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        if num_shards is None:
+            self.ordering = get_ordering(ordering, data, weights=weights)
+        else:
+            # Made in _search, from the counts of the shards.
+            self.ordering = None
+
+        self._requested_ordering = ordering
+        self.ordering_name = ordering_name(ordering)
+        self.num_shards = num_shards
+        self.max_depth = max_depth
+        self.max_tests_per_edge = max_tests_per_edge
+
+        self.timed_out = False
+        self.depth_reached = None
+        self.untested_edges = []
+        self.num_tests = {}
+        self.removed_edges = []
+        self.capped_edges = {}
+        self.adjacencies = None
+        self._fingerprint = None
 
     def find(self):
         """
@@ -84,66 +217,495 @@ class PCSkeletonFinder():
                     value: list(sets(str)).
                         The conditioning sets that make X and Y conditionally
                         independent.
+
+            If the time budget (timeout_limit) runs out, the graph and the
+            separating sets found so far are kept, and the following get
+            set:
+                timed_out: bool
+                    True.
+                depth_reached: int
+                    The depth that was being searched when time ran out.
+                untested_edges: list[tuple[str]]
+                    The edges that weren't fully tested at that depth.
+
+            Edges that ran out of their test budget (max_tests_per_edge) are
+            kept, and listed in:
+                capped_edges: dict
+                    key: tuple[str]
+                        The edge.
+                    value: list[int]
+                        The depths at which it ran out.
         """
 
-        cond_sets = SepSets()
-        num_cpus = get_num_workers(client = self.client)
+        try:
+            return self._search(cond_sets=SepSets(), depth=0)
+        finally:
+            self._close_executor()
 
-        depth = 0
-        # pylint: disable=too-many-nested-blocks
-        while self._depth_not_greater_than_num_adj_nodes_per_var(
-                depth, self.graph):
-            self.logging.debug("Finding skeleton. Depth: {}".format(depth))
+    def resume(self):
+        """
+            Continues a search from the checkpoint at checkpoint_path, without
+            redoing the depths (or the edges of the current depth) that were
+            already done. The graph gets the edges that were removed before
+            the checkpoint removed too.
+
+            Returns: SepSets
+                Same as "find".
+
+            Raises:
+                ValueError if the checkpoint was made from a different
+                dataset, or with a different "stable" or ordering.
+        """
+        with open(self.checkpoint_path, 'rb') as file:
+            checkpoint = pickle.load(file)
 
-            edges = self.graph.get_edges()
-
-            lazy_results = []
-            num_batches = min(len(edges), num_cpus)
-            batched_edges = batch_lists(num_batches=num_batches, arr=edges)
-
-            for batch in batched_edges:
-                lazy_results.append(
-                    dask.delayed(
-                        process_edges
-                    )(
-                        batch,
-                        self.graph,
-                        self.data,
-                        depth,
-                        self.cond_indep_test
+        if checkpoint['fingerprint'] != self.data_fingerprint():
+            raise ValueError(
+                "Checkpoint {} was made from a different dataset.".format(
+                    self.checkpoint_path
+                )
+            )
+
+        for name, value in [
+            ('stable', self.stable),
+            ('ordering', self.ordering_name)
+        ]:
+            if checkpoint[name] != value:
+                raise ValueError(
+                    "Checkpoint {} was made with {}={}, not {}.".format(
+                        self.checkpoint_path,
+                        name,
+                        checkpoint[name],
+                        value
                     )
                 )
 
-            computed = list(dask.compute(*lazy_results))
+        adjacencies = checkpoint['adjacencies']
+
+        for node_1, node_2 in edges_of(adjacency_snapshot(self.graph)):
+            if node_2 not in adjacencies.get(node_1, frozenset()):
+                self.graph.remove_edge((node_1, node_2))
+
+        self.logging.info(
+            "Resuming skeleton search from depth {}.".format(checkpoint['depth'])
+        )
+
+        try:
+            return self._search(
+                cond_sets=checkpoint['sep_sets'],
+                depth=checkpoint['depth'],
+                adjacencies=adjacencies,
+                tested_edges=checkpoint['tested_edges'],
+                removals=checkpoint['removals']
+            )
+        finally:
+            self._close_executor()
+
+    def _close_executor(self):
+        """
+            Closes the executor, unless it was passed in by the caller, who
+            might still be using it.
+        """
+        if self._owns_executor:
+            self.executor.close()
+
+    # pylint: disable=too-many-locals,too-many-arguments
+    def _search(
+        self,
+        cond_sets,
+        depth,
+        adjacencies=None,
+        tested_edges=None,
+        removals=None
+    ):
+        """
+            Parameters:
+                cond_sets: SepSets
+                depth: int
+                    The depth to start from.
+                adjacencies: dict[str, frozenset[str]]. Defaults to None.
+                    Snapshot to use for the starting depth. If None, it's
+                    taken from the graph.
+                tested_edges: list[tuple[str]]. Defaults to None.
+                    Edges of the starting depth that were already tested.
+                removals: list[tuple]. Defaults to None.
+                    Removals found for those edges, not yet applied.
+        """
+        if self.num_shards is None:
+            data = self.executor.scatter(self.data)
+            process_depth = self._process_depth
+        else:
+            data = ShardedCounts(self.data, self.num_shards, self.executor)
+            process_depth = self._process_depth_sharded
+
+            if self.ordering is None:
+                self.ordering = get_ordering(
+                    self._requested_ordering,
+                    self.data,
+                    counts=data.count
+                )
+
+        if self.timeout_limit is None:
+            deadline = None
+        else:
+            deadline = time.time() + self.timeout_limit
+
+        self.timed_out = False
+        self.untested_edges = []
+        self.num_tests = {}
+        self.removed_edges = []
+        self.capped_edges = {}
+
+        tested_edges = list(tested_edges or [])
+        removals = list(removals or [])
+
+        self.adjacencies = Adjacencies.from_graph(self.graph)
+
+        while self._depth_not_greater_than_num_adj_nodes_per_var(depth):
+            self.logging.debug("Finding skeleton. Depth: {}".format(depth))
+
+            self.depth_reached = depth
+
+            if adjacencies is None:
+                adjacencies = self.adjacencies.snapshot()
+
+            already_tested = set(tested_edges)
+            edges = [
+                edge for edge in self.adjacencies.edges_to_test(depth)
+                if edge not in already_tested
+            ]
+
+            untested_edges = process_depth(
+                data,
+                edges,
+                adjacencies,
+                depth,
+                deadline,
+                tested_edges,
+                removals,
+                cond_sets
+            )
+
+            if len(untested_edges) > 0:
+                self._time_out(untested_edges)
+                self._checkpoint(cond_sets, depth, adjacencies, tested_edges, removals)
 
-            for item in computed:
-                if item is None:
-                    continue
+            for node_1, node_2, cond_set in sorted(removals):
+                cond_sets.add(node_1, node_2, cond_set)
+                self.graph.remove_edge((node_1, node_2))
+                self.adjacencies.remove_edge(node_1, node_2)
+                self.removed_edges.append(tuple(sorted((node_1, node_2))))
 
-                cond_sets.add(item[0], item[1], item[2])
-                self.graph.remove_edge((item[0], item[1]))
+            if self.timed_out:
+                break
 
             depth += 1
+            adjacencies = None
+            tested_edges = []
+            removals = []
+
+            self._checkpoint(
+                cond_sets,
+                depth,
+                self.adjacencies.snapshot(),
+                tested_edges,
+                removals
+            )
+
+        if self.num_shards is not None:
+            data.close()
+
+        if len(self.capped_edges) > 0:
+            self.logging.warning(
+                "{} edges were kept because they ran out of tests: {}".format(
+                    len(self.capped_edges),
+                    sorted(self.capped_edges.keys())
+                )
+            )
+
+        self.logging.info(
+            "Skeleton search ran {} tests and removed {} edges ({} tests per removed edge).".format(
+                sum(self.num_tests.values()),
+                len(self.removed_edges),
+                self.tests_per_removed_edge()
+            )
+        )
 
         return cond_sets
 
-    def _depth_not_greater_than_num_adj_nodes_per_var(self, depth, graph):
-        edges = list(self.graph.get_edges())
+    def tests_per_removed_edge(self):
+        """
+            The average number of tests that the removed edges cost, over
+            all depths. Smaller is better.
 
-        if len(edges) == 0:
-            return False
+            Returns: float
+                NaN if no edge was removed.
+        """
+        if len(self.removed_edges) == 0:
+            return np.nan
+
+        return np.mean([self.num_tests.get(edge, 0) for edge in self.removed_edges])
+
+    # pylint: disable=too-many-arguments
+    def _process_depth(
+        self,
+        data,
+        edges,
+        adjacencies,
+        depth,
+        deadline,
+        tested_edges,
+        removals,
+        cond_sets
+    ):
+        """
+            Tests the edges of one depth on the executor. tested_edges and
+            removals get extended as batches finish.
+
+            Returns: list[tuple[str]]
+                The edges that couldn't be fully tested before the deadline.
+        """
+        if _is_past(deadline):
+            return edges
+
+        num_batches = min(len(edges), self.executor.num_workers)
+
+        if self.checkpoint_every is not None:
+            num_batches = max(
+                num_batches,
+                int(np.ceil(len(edges) / self.checkpoint_every))
+            )
+
+        if self.stable:
+            batches = deque(batch_lists(num_batches=num_batches, arr=edges))
+        else:
+            batches = deque(split_in_order(num_batches=num_batches, arr=edges))
+
+        pending = {}
+        untested_edges = []
+        num_tested_since_checkpoint = 0
+
+        while len(pending) > 0 or len(batches) > 0:
+            # Without stable, a batch needs the removals of the ones before
+            # it, so only one runs at a time.
+            while len(batches) > 0 and (self.stable or len(pending) == 0):
+                batch = batches.popleft()
+                future = self.executor.submit(
+                    process_edges,
+                    batch,
+                    adjacencies if self.stable \
+                        else without_removals(adjacencies, removals),
+                    data,
+                    depth,
+                    self.cond_indep_test,
+                    self.stable,
+                    deadline,
+                    self.ordering,
+                    self.max_tests_per_edge
+                )
+                pending[future] = batch
+
+            if deadline is None:
+                timeout = None
+            else:
+                timeout = max(deadline - time.time(), 0)
+
+            done, not_done = self.executor.wait(
+                list(pending.keys()),
+                timeout=timeout,
+                return_when='FIRST_COMPLETED'
+            )
+
+            if len(done) == 0:
+                self.executor.cancel(not_done)
+
+                for future in not_done:
+                    untested_edges += pending.pop(future)
+
+                for batch in batches:
+                    untested_edges += batch
+
+                break
+
+            for future in done:
+                batch = pending.pop(future)
+                result = future.result()
+
+                untested_edges += result.untested_edges
+                removals += result.removals
+
+                for edge, num_tests in result.num_tests.items():
+                    self.num_tests[edge] = self.num_tests.get(edge, 0) + num_tests
+
+                for edge in result.capped_edges:
+                    self._cap(edge, depth)
+
+                not_fully_tested = set(result.untested_edges)
+                newly_tested = [
+                    edge for edge in batch if edge not in not_fully_tested
+                ]
+                tested_edges += newly_tested
+                num_tested_since_checkpoint += len(newly_tested)
+
+            if self.checkpoint_every is not None \
+                    and num_tested_since_checkpoint >= self.checkpoint_every \
+                    and (len(pending) > 0 or len(batches) > 0):
+                self._checkpoint(cond_sets, depth, adjacencies, tested_edges, removals)
+                num_tested_since_checkpoint = 0
+
+        return untested_edges
+
+    # pylint: disable=too-many-arguments,too-many-locals
+    def _process_depth_sharded(
+        self,
+        sharded_counts,
+        edges,
+        adjacencies,
+        depth,
+        deadline,
+        tested_edges,
+        removals,
+        cond_sets
+    ):
+        """
+            Tests the edges of one depth against sharded data. Each round
+            takes the next candidate test of every edge that's still
+            undecided, gets the count tables of all of them from the shards
+            at once, and runs the tests on the sums.
 
-        for edge in edges:
-            node_1, _, node_2 = tuple(edge)
-            len_1 = len({str(i) for i in graph.get_neighbors(node_1)}
-                        - {node_2})
-            len_2 = len({str(i) for i in graph.get_neighbors(node_2)}
-                        - {node_1})
+            Returns: list[tuple[str]]
+                The edges that couldn't be fully tested before the deadline.
+        """
+        candidates = {
+            edge: candidate_tests(edge, adjacencies, depth, self.ordering)
+            for edge in edges
+        }
+        num_tests_at_depth = {edge: 0 for edge in edges}
+        num_tested_since_checkpoint = 0
+        test_takes_weights = accepts_weights(self.cond_indep_test)
+
+        while len(candidates) > 0:
+            if _is_past(deadline):
+                return sorted(candidates.keys())
+
+            queries = {}
+
+            for edge in sorted(candidates.keys()):
+                query = next(candidates[edge], None)
+
+                if query is not None \
+                        and self.max_tests_per_edge is not None \
+                        and num_tests_at_depth[edge] >= self.max_tests_per_edge:
+                    self._cap(edge, depth)
+                    query = None
+
+                if query is None:
+                    del candidates[edge]
+                    tested_edges.append(edge)
+                    num_tested_since_checkpoint += 1
+                else:
+                    queries[edge] = query
+
+            if len(queries) == 0:
+                break
+
+            column_sets = sorted({
+                columns_of(*query) for query in queries.values()
+            })
+            counts = sharded_counts.count(column_sets)
+
+            for edge, (node_1, node_2, combo) in queries.items():
+                self.num_tests[edge] = self.num_tests.get(edge, 0) + 1
+                num_tests_at_depth[edge] += 1
+                table, weights = counts[columns_of(node_1, node_2, combo)]
+
+                if test_takes_weights:
+                    test_kwargs = {'weights': weights}
+                else:
+                    table, test_kwargs = expand_counts(table, weights), {}
+
+                if self.cond_indep_test(
+                    table,
+                    vars_1=[node_1],
+                    vars_2=[node_2],
+                    conditioning_set=list(combo),
+                    **test_kwargs
+                ):
+                    removals.append((node_1, node_2, combo))
+                    del candidates[edge]
+                    tested_edges.append(edge)
+                    num_tested_since_checkpoint += 1
+
+            if self.checkpoint_every is not None \
+                    and num_tested_since_checkpoint >= self.checkpoint_every \
+                    and len(candidates) > 0:
+                self._checkpoint(cond_sets, depth, adjacencies, tested_edges, removals)
+                num_tested_since_checkpoint = 0
+
+        return []
+
+    # pylint: disable=too-many-arguments
+    def data_fingerprint(self):
+        """
+            The fingerprint of data, computed the first time it's needed.
 
-            if len_1 >= depth or len_2 >= depth:
-                return True
+            Returns: str
+        """
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self.data)
 
-        return False
+        return self._fingerprint
+
+    def _checkpoint(self, cond_sets, depth, adjacencies, tested_edges, removals):
+        """
+            Writes what's needed to continue the search to checkpoint_path,
+            if there's one. The file is replaced atomically, so a crash while
+            writing leaves the previous checkpoint intact.
+        """
+        if self.checkpoint_path is None:
+            return
+
+        checkpoint = {
+            'fingerprint': self.data_fingerprint(),
+            'stable': self.stable,
+            'ordering': self.ordering_name,
+            'depth': depth,
+            'adjacencies': adjacencies,
+            'sep_sets': cond_sets,
+            'tested_edges': list(tested_edges),
+            'removals': list(removals),
+        }
+
+        tmp_path = '{}.tmp'.format(self.checkpoint_path)
+
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(checkpoint, file)
+
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _time_out(self, untested_edges):
+        self.timed_out = True
+        self.untested_edges = sorted(untested_edges)
+
+        self.logging.warning(
+            "Time limit of {} seconds reached at depth {}. {} edges weren't fully tested.".format(
+                self.timeout_limit,
+                self.depth_reached,
+                len(self.untested_edges)
+            )
+        )
+
+    def _cap(self, edge, depth):
+        """
+            Records that an edge ran out of its test budget at a depth.
+        """
+        self.capped_edges.setdefault(edge, []).append(depth)
+
+    def _depth_not_greater_than_num_adj_nodes_per_var(self, depth):
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+
+        return self.adjacencies.has_edges_to_test(depth)
 
 
 def batch_lists(num_batches, arr):
@@ -170,50 +732,256 @@ def batch_lists(num_batches, arr):
     return batches
 
 
-def process_edges(edges, graph, data, depth, cond_indep_test):
+def split_in_order(num_batches, arr):
     """
-        Get a list of edges. For each edge, see if it doesn't exist (i.e.
-        there's a conditioning set that separates the nodes of the edge). If
-        so, add it to the queue, for later removal.
+        Splits a list into contiguous batches, keeping its order.
+
+        Parameters:
+            num_batches: int
+            arr: list
+
+        Returns: list[list]
+            At most num_batches batches, none of them empty.
+    """
+    if len(arr) == 0:
+        return []
+
+    batch_size = int(np.ceil(len(arr) / max(num_batches, 1)))
+
+    return [arr[i:i + batch_size] for i in range(0, len(arr), batch_size)]
+
+
+def without_removals(adjacencies, removals):
+    """
+        Parameters:
+            adjacencies: dict[str, frozenset[str]]
+            removals: list[tuple]
+                (node_1, node_2, conditioning set) for each removed edge.
+
+        Returns: dict[str, frozenset[str]]
+            The adjacencies, without the removed edges. adjacencies itself
+            isn't changed.
+    """
+    if len(removals) == 0:
+        return adjacencies
+
+    removed = {}
+
+    for node_1, node_2, _ in removals:
+        removed.setdefault(node_1, set()).add(node_2)
+        removed.setdefault(node_2, set()).add(node_1)
+
+    return {
+        node: neighbors - removed.get(node, set())
+        for node, neighbors in adjacencies.items()
+    }
+
+
+def adjacency_snapshot(graph):
+    """
+        Takes an immutable snapshot of the adjacencies of a graph.
 
         Parameters:
-            edges: list[Edge],
             graph:
                 responds to:
+                    - get_nodes()
                     - get_neighbors(node)
+
+        Returns: dict
+            key: str
+                Name of a node.
+            value: frozenset[str]
+                Names of the nodes adjacent to it.
+    """
+    return {
+        str(node): frozenset(str(i) for i in graph.get_neighbors(node))
+        for node in graph.get_nodes()
+    }
+
+
+def edges_of(adjacencies):
+    """
+        Lists the edges of an adjacency snapshot, in a deterministic order.
+
+        Parameters:
+            adjacencies: dict[str, frozenset[str]]
+
+        Returns: list[tuple[str]]
+            Each edge appears once, as a sorted pair of node names.
+    """
+    edges = set({})
+
+    for node, neighbors in adjacencies.items():
+        for neighbor in neighbors:
+            edges.add(tuple(sorted((node, neighbor))))
+
+    return sorted(edges)
+
+
+def fingerprint(data):
+    """
+        Fingerprint of a dataset, used to make sure that a checkpoint gets
+        resumed with the data it was made from.
+
+        Parameters:
+            data: pandas.DataFrame
+
+        Returns: str
+    """
+    digest = hashlib.sha1()
+    digest.update(str(list(data.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+
+    return digest.hexdigest()
+
+
+def ordering_name(ordering):
+    """
+        Names an ordering, so that a checkpoint can tell whether it's
+        resumed with the ordering it was made with.
+
+        Parameters:
+            ordering: str or callable or None
+                As passed to PCSkeletonFinder.
+
+        Returns: str
+    """
+    if ordering is None:
+        return 'default'
+
+    if isinstance(ordering, str):
+        return ordering
+
+    return '{}.{}'.format(
+        getattr(ordering, '__module__', None) or type(ordering).__module__,
+        getattr(ordering, '__qualname__', None) or type(ordering).__qualname__
+    )
+
+
+def _is_past(deadline):
+    return deadline is not None and time.time() >= deadline
+
+
+class BatchResult:
+    """
+        What process_edges found for a batch of edges.
+
+        Attributes:
+            removals: list[tuple]
+                (node_1, node_2, conditioning set) for each removable edge.
+            untested_edges: list[tuple[str]]
+                Edges whose tests weren't all run because the deadline
+                passed.
+            num_tests: dict[tuple[str], int]
+                The number of tests run for each edge.
+            capped_edges: list[tuple[str]]
+                Edges that hit the test budget with conditioning sets left.
+    """
+    def __init__(self):
+        self.removals = []
+        self.untested_edges = []
+        self.num_tests = {}
+        self.capped_edges = []
+
+
+# pylint: disable=too-many-arguments
+def process_edges(
+    edges,
+    adjacencies,
+    data,
+    depth,
+    cond_indep_test,
+    stable=True,
+    deadline=None,
+    ordering=None,
+    max_tests=None
+):
+    """
+        Get a list of edges. For each edge, see if it doesn't exist (i.e.
+        there's a conditioning set that separates the nodes of the edge). If
+        so, add it to the list of removals, for later removal.
+
+        Parameters:
+            edges: list[tuple[str]]
+            adjacencies: dict[str, frozenset[str]]
+                Adjacency snapshot taken at the start of the depth. It is
+                never mutated.
             data: pd.DataFrame
-            depth: Value
+            depth: int
             cond_indep_test: function
                 returns Boolean
+            stable: bool. Defaults to True.
+                If True, conditioning candidates always come from the
+                snapshot. Otherwise, edges removed earlier in this batch are
+                no longer considered neighbors.
+            deadline: float. Defaults to None.
+                Time (as in time.time()) after which no new test is started.
+            ordering: function. Defaults to None.
+                Gives the order in which conditioning sets are tried. See
+                constraint_based.conditioning_set_orderings. If None, they
+                are tried in lexicographic order.
+            max_tests: int. Defaults to None.
+                The most tests to run per edge. Edges that reach it with
+                conditioning sets left to try end up in "capped_edges".
+
+        Returns: BatchResult
     """
+    if ordering is None:
+        ordering = default_ordering
+
+    if stable:
+        neighbors_of = adjacencies
+    else:
+        neighbors_of = {
+            node: set(neighbors) for node, neighbors in adjacencies.items()
+        }
+
+    result = BatchResult()
+
+    for index, edge in enumerate(edges):
+        result.num_tests[edge] = 0
+
+        for ordered_node_1, ordered_node_2, combo in candidate_tests(
+            edge,
+            neighbors_of,
+            depth,
+            ordering
+        ):
+            if _is_past(deadline):
+                result.untested_edges += edges[index:]
+                return result
+
+            if max_tests is not None and result.num_tests[edge] >= max_tests:
+                result.capped_edges.append(edge)
+                break
+
+            result.num_tests[edge] += 1
+
+            if cond_indep_test(
+                data,
+                vars_1=[ordered_node_1],
+                vars_2=[ordered_node_2],
+                conditioning_set=list(combo)
+            ):
+                result.removals.append(
+                    (ordered_node_1, ordered_node_2, combo)
+                )
 
-    # edge, graph, data, depth, cond_indep_test
+                if not stable:
+                    neighbors_of[ordered_node_1].discard(ordered_node_2)
+                    neighbors_of[ordered_node_2].discard(ordered_node_1)
+                break
 
-    for edge in edges:
-        pairs = [
-            (str(edge.node_1), str(edge.node_2)),
-            (str(edge.node_2), str(edge.node_1))
-        ]
+    return result
 
-        # Note: if one of the pairs passes, then we don't need to do the
-        # preceding one.'
-        for ordered_edge in pairs:
-            ordered_node_1, ordered_node_2 = ordered_edge
 
-            conditionables = list(
-                {str(i) for i in graph.get_neighbors(ordered_node_1)}
-                - set({str(ordered_node_2)})
-            )
+def columns_of(node_1, node_2, combo):
+    """
+        Returns: tuple[str]
+            The columns a test involves, sorted.
+    """
+    return tuple(sorted(set((node_1, node_2) + tuple(combo))))
 
-            if len(conditionables) >= depth:
-                for combo in combinations(conditionables, depth):
-                    if cond_indep_test(
-                        data,
-                        vars_1=[ordered_node_1],
-                        vars_2=[ordered_node_2],
-                        conditioning_set=list(combo)
-                    ):
-                        return (ordered_node_1, ordered_node_2, combo)
 
 if __name__ == '__main__':
     logging = setup_logging()
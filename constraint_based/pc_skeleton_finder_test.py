@@ -2,11 +2,30 @@
 import pytest # pylint: disable=unused-import
 import numpy as np
 import pandas as pd
-from causal_discovery.constraint_based.misc import key_for_pair
-from causal_discovery.constraint_based.pc_skeleton_finder import PCSkeletonFinder
+import time
+from itertools import combinations
+from causal_discovery.constraint_based.misc import key_for_pair, deduplicate
+from causal_discovery.constraint_based.ci_tests.sci_is_independent import sci_is_independent
+from causal_discovery.constraint_based import pc_skeleton_finder
+from causal_discovery.constraint_based.pc_skeleton_finder import PCSkeletonFinder, \
+    adjacency_snapshot, edges_of, process_edges
+from causal_discovery.constraint_based.conditioning_set_orderings import AssociationOrdering
+from causal_discovery.constraint_based.executors import ThreadExecutor
+from causal_discovery.constraint_based.missingness_profile import MissingnessProfile
 from causal_discovery.data import dog_example
 from causal_discovery.graphs.partial_ancestral_graph import PartialAncestralGraph as Graph
 
+CHAIN = ['a', 'b', 'c', 'd']
+
+def chain_oracle_is_independent(data, vars_1, vars_2, conditioning_set): # pylint: disable=unused-argument
+    # a -> b -> c -> d: two nodes are separated by any set that contains a
+    # node lying between them.
+    index_1 = CHAIN.index(vars_1[0])
+    index_2 = CHAIN.index(vars_2[0])
+    between = set(CHAIN[min(index_1, index_2) + 1:max(index_1, index_2)])
+
+    return len(between.intersection(set(conditioning_set))) > 0
+
 
 # PCSkeletonFinder is missing an edge because the distribution we used is
 # unstable. It has independencies that is incompatible with the true DAG
@@ -309,3 +328,537 @@ def test_dog_example():
     assert graph.has_adjacency(('best_friends_visit', 'mentally_exhausted_before_bed'))
     assert graph.has_adjacency(('mentally_exhausted_before_bed', 'dog_teeth_brushed'))
     assert graph.has_adjacency(('dog_tired', 'dog_teeth_brushed'))
+
+def test_stable_process_edges_does_not_depend_on_batching():
+    graph = Graph(variables=CHAIN, complete=True)
+    adjacencies = adjacency_snapshot(graph)
+    edges = edges_of(adjacencies)
+
+    all_at_once = process_edges(
+        edges,
+        adjacencies,
+        None,
+        1,
+        chain_oracle_is_independent,
+        stable=True
+    )
+
+    one_at_a_time = []
+    for edge in edges:
+        one_at_a_time += process_edges(
+            [edge],
+            adjacencies,
+            None,
+            1,
+            chain_oracle_is_independent,
+            stable=True
+        ).removals
+
+    assert all_at_once.removals == one_at_a_time
+    assert adjacencies == adjacency_snapshot(graph)
+
+@pytest.mark.parametrize('executor', ['serial', 'threads', 'processes'])
+def test_stable_chain(executor):
+    df = pd.DataFrame({var: [0] for var in CHAIN})
+    graph = Graph(variables=CHAIN, complete=True)
+
+    cond_sets = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=chain_oracle_is_independent,
+        executor=executor,
+        stable=True
+    ).find()
+
+    assert graph.has_adjacency(('a', 'b'))
+    assert graph.has_adjacency(('b', 'c'))
+    assert graph.has_adjacency(('c', 'd'))
+    assert len(graph.get_edges()) == 3
+    assert cond_sets.get('a', 'c') == set({frozenset({'b'})})
+
+@pytest.mark.parametrize('executor,checkpoint_every', [
+    ('threads', None),
+    ('serial', 1),
+])
+def test_non_stable_does_not_depend_on_batching(executor, checkpoint_every, tmp_path):
+    def find(executor, checkpoint_every):
+        graph = Graph(variables=CHAIN, complete=True)
+        finder = PCSkeletonFinder(
+            data=pd.DataFrame({var: [0] for var in CHAIN}),
+            graph=graph,
+            cond_indep_test=chain_oracle_is_independent,
+            executor=executor,
+            checkpoint_path=str(tmp_path / 'checkpoint.pkl'),
+            checkpoint_every=checkpoint_every
+        )
+        cond_sets = finder.find()
+
+        return graph.get_edges(), cond_sets, finder.num_tests
+
+    assert find(executor, checkpoint_every) == find('serial', None)
+
+def test_closes_only_executors_it_built():
+    df = pd.DataFrame({var: [0] for var in CHAIN})
+
+    finder = PCSkeletonFinder(
+        data=df,
+        graph=Graph(variables=CHAIN, complete=True),
+        cond_indep_test=chain_oracle_is_independent,
+        executor='threads'
+    )
+    finder.find()
+
+    assert finder.executor.pool is None
+
+    executor = ThreadExecutor(max_workers=2)
+    PCSkeletonFinder(
+        data=df,
+        graph=Graph(variables=CHAIN, complete=True),
+        cond_indep_test=chain_oracle_is_independent,
+        executor=executor
+    ).find()
+
+    assert executor.pool is not None
+
+    executor.close()
+
+def slow_never_independent(data, vars_1, vars_2, conditioning_set): # pylint: disable=unused-argument
+    time.sleep(0.05)
+    return False
+
+@pytest.mark.parametrize('executor', ['serial', 'threads'])
+def test_timeout_limit(executor):
+    variables = ['a', 'b', 'c', 'd', 'e', 'f']
+    df = pd.DataFrame({var: [0] for var in variables})
+    graph = Graph(variables=variables, complete=True)
+
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=slow_never_independent,
+        executor=executor,
+        timeout_limit=0.3
+    )
+
+    start = time.time()
+    cond_sets = skeleton_finder.find()
+
+    assert time.time() - start < 2
+    assert skeleton_finder.timed_out
+    assert skeleton_finder.depth_reached is not None
+    assert len(skeleton_finder.untested_edges) > 0
+    assert cond_sets == {}
+    assert len(graph.get_edges()) == 15
+
+def test_no_timeout():
+    df = pd.DataFrame({var: [0] for var in CHAIN})
+    graph = Graph(variables=CHAIN, complete=True)
+
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=chain_oracle_is_independent,
+        timeout_limit=None
+    )
+    skeleton_finder.find()
+
+    assert not skeleton_finder.timed_out
+    assert skeleton_finder.untested_edges == []
+
+def test_timeout_limit_cancels_dask_futures(dask_client):
+    variables = ['a', 'b', 'c', 'd', 'e', 'f']
+    df = pd.DataFrame({var: [0] for var in variables})
+    graph = Graph(variables=variables, complete=True)
+
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=slow_never_independent,
+        client=dask_client,
+        timeout_limit=0.3
+    )
+    skeleton_finder.find()
+
+    assert skeleton_finder.timed_out
+    assert len(skeleton_finder.untested_edges) > 0
+
+def slow_chain_oracle_is_independent(data, vars_1, vars_2, conditioning_set):
+    time.sleep(0.02)
+    return chain_oracle_is_independent(data, vars_1, vars_2, conditioning_set)
+
+def test_checkpoint_and_resume_after_timeout(tmp_path):
+    checkpoint_path = str(tmp_path / 'skeleton.pkl')
+    df = pd.DataFrame({var: [0, 1] for var in CHAIN})
+
+    graph = Graph(variables=CHAIN, complete=True)
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=slow_chain_oracle_is_independent,
+        timeout_limit=0.15,
+        checkpoint_path=checkpoint_path,
+        checkpoint_every=1,
+        stable=True
+    )
+    skeleton_finder.find()
+
+    assert skeleton_finder.timed_out
+
+    resumed_graph = Graph(variables=CHAIN, complete=True)
+    resumed_finder = PCSkeletonFinder(
+        data=df,
+        graph=resumed_graph,
+        cond_indep_test=chain_oracle_is_independent,
+        timeout_limit=None,
+        checkpoint_path=checkpoint_path,
+        stable=True
+    )
+    cond_sets = resumed_finder.resume()
+
+    expected_graph = Graph(variables=CHAIN, complete=True)
+    expected_cond_sets = PCSkeletonFinder(
+        data=df,
+        graph=expected_graph,
+        cond_indep_test=chain_oracle_is_independent,
+        stable=True
+    ).find()
+
+    assert not resumed_finder.timed_out
+    assert cond_sets == expected_cond_sets.dict
+    assert adjacency_snapshot(resumed_graph) == adjacency_snapshot(expected_graph)
+
+def test_resume_skips_completed_depths(tmp_path):
+    checkpoint_path = str(tmp_path / 'skeleton.pkl')
+    df = pd.DataFrame({var: [0, 1] for var in CHAIN})
+
+    PCSkeletonFinder(
+        data=df,
+        graph=Graph(variables=CHAIN, complete=True),
+        cond_indep_test=chain_oracle_is_independent,
+        checkpoint_path=checkpoint_path
+    ).find()
+
+    calls = []
+
+    def counting_test(data, vars_1, vars_2, conditioning_set):
+        calls.append(1)
+        return chain_oracle_is_independent(data, vars_1, vars_2, conditioning_set)
+
+    graph = Graph(variables=CHAIN, complete=True)
+    PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=counting_test,
+        checkpoint_path=checkpoint_path
+    ).resume()
+
+    assert len(calls) == 0
+    assert len(graph.get_edges()) == 3
+
+def test_resume_with_different_data(tmp_path):
+    checkpoint_path = str(tmp_path / 'skeleton.pkl')
+    df = pd.DataFrame({var: [0, 1] for var in CHAIN})
+
+    PCSkeletonFinder(
+        data=df,
+        graph=Graph(variables=CHAIN, complete=True),
+        cond_indep_test=chain_oracle_is_independent,
+        checkpoint_path=checkpoint_path
+    ).find()
+
+    with pytest.raises(ValueError):
+        PCSkeletonFinder(
+            data=df.iloc[::-1],
+            graph=Graph(variables=CHAIN, complete=True),
+            cond_indep_test=chain_oracle_is_independent,
+            checkpoint_path=checkpoint_path
+        ).resume()
+
+def reversed_ordering(node_1, node_2, conditionables, depth): # pylint: disable=unused-argument
+    return reversed(list(combinations(sorted(conditionables), depth)))
+
+@pytest.mark.parametrize('changed', [
+    {'stable': True},
+    {'ordering': reversed_ordering},
+    {'ordering': 'association'},
+])
+def test_resume_with_different_settings(changed, tmp_path):
+    checkpoint_path = str(tmp_path / 'skeleton.pkl')
+    df = pd.DataFrame({var: [0, 1] for var in CHAIN})
+
+    PCSkeletonFinder(
+        data=df,
+        graph=Graph(variables=CHAIN, complete=True),
+        cond_indep_test=chain_oracle_is_independent,
+        checkpoint_path=checkpoint_path
+    ).find()
+
+    with pytest.raises(ValueError):
+        PCSkeletonFinder(
+            data=df,
+            graph=Graph(variables=CHAIN, complete=True),
+            cond_indep_test=chain_oracle_is_independent,
+            checkpoint_path=checkpoint_path,
+            **changed
+        ).resume()
+
+def test_fingerprint_is_computed_once(tmp_path, monkeypatch):
+    calls = []
+    fingerprint = pc_skeleton_finder.fingerprint
+
+    def counting_fingerprint(data):
+        calls.append(1)
+        return fingerprint(data)
+
+    monkeypatch.setattr(pc_skeleton_finder, 'fingerprint', counting_fingerprint)
+
+    finder = PCSkeletonFinder(
+        data=pd.DataFrame({var: [0, 1] for var in CHAIN}),
+        graph=Graph(variables=CHAIN, complete=True),
+        cond_indep_test=chain_oracle_is_independent,
+        checkpoint_path=str(tmp_path / 'skeleton.pkl'),
+        checkpoint_every=1
+    )
+    finder.find()
+    finder.graph = Graph(variables=CHAIN, complete=True)
+    finder.resume()
+
+    assert len(calls) == 1
+
+def test_ordering_changes_number_of_tests():
+    df = pd.DataFrame({var: [0, 1] for var in CHAIN})
+    num_tests = {}
+
+    for ordering in ['default', reversed_ordering]:
+        graph = Graph(variables=CHAIN, complete=True)
+        skeleton_finder = PCSkeletonFinder(
+            data=df,
+            graph=graph,
+            cond_indep_test=chain_oracle_is_independent,
+            ordering=ordering
+        )
+
+        skeleton_finder.find()
+
+        assert edges_of(adjacency_snapshot(graph)) == [
+            ('a', 'b'), ('b', 'c'), ('c', 'd')
+        ]
+        assert sorted(skeleton_finder.removed_edges) == [
+            ('a', 'c'), ('a', 'd'), ('b', 'd')
+        ]
+        num_tests[ordering if isinstance(ordering, str) else 'reversed'] = \
+            skeleton_finder.num_tests
+
+    # From b's side, (b, d) has candidates "a" and "c", and only "c"
+    # separates them. The reversed ordering tries "c" first.
+    assert num_tests['reversed'][('b', 'd')] < num_tests['default'][('b', 'd')]
+
+def test_tests_per_removed_edge():
+    df = pd.DataFrame({var: [0, 1] for var in CHAIN})
+    graph = Graph(variables=CHAIN, complete=True)
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=chain_oracle_is_independent
+    )
+
+    assert np.isnan(skeleton_finder.tests_per_removed_edge())
+
+    skeleton_finder.find()
+
+    assert skeleton_finder.tests_per_removed_edge() == np.mean([
+        skeleton_finder.num_tests[edge]
+        for edge in [('a', 'c'), ('a', 'd'), ('b', 'd')]
+    ])
+
+def weighted_chain_oracle_is_independent(
+    data,
+    vars_1,
+    vars_2,
+    conditioning_set,
+    weights
+):
+    # Every test sees the counts of all the rows.
+    assert weights.sum() == 40
+
+    return chain_oracle_is_independent(data, vars_1, vars_2, conditioning_set)
+
+@pytest.mark.parametrize('executor', ['serial', 'processes'])
+def test_sharded_chain(executor):
+    df = pd.DataFrame({var: np.arange(40) % 2 for var in CHAIN})
+    graph = Graph(variables=CHAIN, complete=True)
+
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=weighted_chain_oracle_is_independent,
+        executor=executor,
+        num_shards=3
+    )
+
+    cond_sets = skeleton_finder.find()
+
+    assert edges_of(adjacency_snapshot(graph)) == [
+        ('a', 'b'), ('b', 'c'), ('c', 'd')
+    ]
+    assert cond_sets['a _||_ c'] == {frozenset({'b'})}
+    assert cond_sets['b _||_ d'] == {frozenset({'c'})}
+
+def test_sharded_chain_without_weights():
+    df = pd.DataFrame({var: np.arange(40) % 2 for var in CHAIN})
+    graph = Graph(variables=CHAIN, complete=True)
+    num_rows = []
+
+    def cond_indep_test(data, vars_1, vars_2, conditioning_set):
+        num_rows.append(data.shape[0])
+
+        return chain_oracle_is_independent(data, vars_1, vars_2, conditioning_set)
+
+    PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=cond_indep_test,
+        num_shards=3
+    ).find()
+
+    assert edges_of(adjacency_snapshot(graph)) == [
+        ('a', 'b'), ('b', 'c'), ('c', 'd')
+    ]
+    assert set(num_rows) == set({40})
+
+def test_missingness_profile_is_passed_to_tests_that_take_it():
+    df = pd.DataFrame({var: np.arange(40) % 2 for var in CHAIN})
+    profile = MissingnessProfile(df)
+    graph = Graph(variables=CHAIN, complete=True)
+    profiles = []
+
+    def cond_indep_test(data, vars_1, vars_2, conditioning_set, missingness_profile):
+        profiles.append(missingness_profile)
+
+        return chain_oracle_is_independent(data, vars_1, vars_2, conditioning_set)
+
+    PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=cond_indep_test,
+        missingness_profile=profile
+    ).find()
+
+    assert edges_of(adjacency_snapshot(graph)) == [
+        ('a', 'b'), ('b', 'c'), ('c', 'd')
+    ]
+    assert set(map(id, profiles)) == set({id(profile)})
+
+def test_sharded_chain_with_association_ordering():
+    df = pd.DataFrame({var: np.arange(40) % 2 for var in CHAIN})
+    graph = Graph(variables=CHAIN, complete=True)
+
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=weighted_chain_oracle_is_independent,
+        num_shards=3,
+        ordering='association'
+    )
+    skeleton_finder.find()
+
+    assert skeleton_finder.ordering.mutual_information == \
+        pytest.approx(AssociationOrdering(df).mutual_information)
+    assert edges_of(adjacency_snapshot(graph)) == [
+        ('a', 'b'), ('b', 'c'), ('c', 'd')
+    ]
+
+def test_sharded_chain_on_dask(dask_client):
+    df = pd.DataFrame({var: np.arange(40) % 2 for var in CHAIN})
+    graph = Graph(variables=CHAIN, complete=True)
+
+    PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=weighted_chain_oracle_is_independent,
+        client=dask_client,
+        num_shards=2
+    ).find()
+
+    assert edges_of(adjacency_snapshot(graph)) == [
+        ('a', 'b'), ('b', 'c'), ('c', 'd')
+    ]
+
+def never_independent(data, vars_1, vars_2, conditioning_set, weights=None): # pylint: disable=unused-argument
+    return False
+
+def test_max_depth():
+    variables = ['a', 'b', 'c', 'd', 'e']
+    df = pd.DataFrame({var: [0, 1] for var in variables})
+    graph = Graph(variables=variables, complete=True)
+
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=never_independent,
+        max_depth=1
+    )
+
+    skeleton_finder.find()
+
+    assert skeleton_finder.depth_reached == 1
+    # Each of the 10 edges: 1 test per side at depth 0, 3 per side at depth 1.
+    assert set(skeleton_finder.num_tests.values()) == {8}
+
+@pytest.mark.parametrize('num_shards', [None, 2])
+def test_max_tests_per_edge(num_shards):
+    variables = ['a', 'b', 'c', 'd', 'e']
+    df = pd.DataFrame({var: [0, 1] for var in variables})
+    graph = Graph(variables=variables, complete=True)
+
+    skeleton_finder = PCSkeletonFinder(
+        data=df,
+        graph=graph,
+        cond_indep_test=never_independent,
+        max_tests_per_edge=4,
+        num_shards=num_shards
+    )
+
+    skeleton_finder.find()
+
+    assert len(graph.get_edges()) == 10
+    # Depth 0 needs 2 tests per edge. Depths 1 to 3 need 6, 6 and 2, so
+    # only depths 1 and 2 run out of budget.
+    assert skeleton_finder.capped_edges == {
+        edge: [1, 2] for edge in edges_of(adjacency_snapshot(graph))
+    }
+    assert set(skeleton_finder.num_tests.values()) == {2 + 4 + 4 + 2}
+
+def test_deduplicated_rows_give_the_same_skeleton():
+    df = dog_example(size=2000)
+    unique_rows, weights = deduplicate(df)
+
+    assert unique_rows.shape[0] < df.shape[0]
+
+    results = []
+
+    for data, _weights in [(df, None), (unique_rows, weights)]:
+        graph = Graph(variables=list(df.columns), complete=True)
+        skeleton_finder = PCSkeletonFinder(
+            data=data,
+            graph=graph,
+            cond_indep_test=sci_is_independent,
+            stable=True,
+            weights=_weights
+        )
+
+        cond_sets = skeleton_finder.find()
+        results.append((edges_of(adjacency_snapshot(graph)), cond_sets.dict))
+
+    assert results[0] == results[1]
+
+def test_weights_and_num_shards_are_exclusive():
+    df = pd.DataFrame({var: [0, 1] for var in CHAIN})
+
+    with pytest.raises(ValueError):
+        PCSkeletonFinder(
+            data=df,
+            graph=Graph(variables=CHAIN, complete=True),
+            num_shards=2,
+            weights=[1, 1]
+        )
@@ -1,3 +1,6 @@
+import logging
+from collections import deque
+from itertools import permutations
 from causal_discovery.graphs.marked_pattern_graph import MarkedPatternGraph
 
 class RecursiveEdgeOrienter(object):
@@ -21,65 +24,155 @@ class RecursiveEdgeOrienter(object):
 
     def orient(self):
         """
-            Applies the two rules recursively.
+            Applies the two rules until neither applies anywhere.
+
+            Orienting doesn't change which nodes are adjacent, so the places
+            where a rule could apply (triples A - C - B for rule 1, adjacent
+            pairs for rule 2) are known up front. They all get checked once;
+            after that, only the ones that involve an edge whose marks just
+            changed get checked again.
         """
+        self.adjacent = {}
+        self.in_neighbors = {}
+
+        for edge in self.marked_pattern_graph.get_edges():
+            if len(edge) != 2:
+                continue
+
+            node_1, node_2 = tuple(edge)
+            self.adjacent.setdefault(node_1, set()).add(node_2)
+            self.adjacent.setdefault(node_2, set()).add(node_1)
+
+        for node in self.adjacent:
+            for neighbor in self.marked_pattern_graph.get_neighbors(node):
+                self.in_neighbors.setdefault(neighbor, set()).add(node)
+
+        self.worklist = deque()
+        self.queued = set()
+
+        for common_neighbor in sorted(self.in_neighbors):
+            for node_1, node_2 in permutations(
+                sorted(self.in_neighbors[common_neighbor]),
+                2
+            ):
+                self._enqueue_rule_1(node_1, common_neighbor, node_2)
+
+        for node_1 in sorted(self.adjacent):
+            for node_2 in sorted(self.adjacent[node_1]):
+                self._enqueue_rule_2(node_1, node_2)
+
+        while len(self.worklist) > 0:
+            item = self.worklist.popleft()
+            self.queued.discard(item)
+
+            if len(item) == 3:
+                self._apply_rule_1_to(*item)
+            else:
+                self._apply_rule_2_to(*item)
+
+    def _apply_rule_1_to(self, node_1, common_neighbor, node_2):
+        if self.marked_pattern_graph.has_arrowhead(
+                (node_1, common_neighbor)
+            ) \
+            and not self.marked_pattern_graph.has_arrowhead((node_2, common_neighbor)) \
+            and not self.marked_pattern_graph.has_marked_arrowhead((common_neighbor, node_2)):
+
+            self.marked_pattern_graph.add_marked_arrowhead((common_neighbor, node_2))
+
+            logging.debug(
+                'Rule 1: %s *-> %s - %s, so %s -*> %s',
+                node_1,
+                common_neighbor,
+                node_2,
+                common_neighbor,
+                node_2
+            )
+
+            self._mark_changed(common_neighbor, node_2, marked=True)
+
+            return True
 
-        applied = True
+        return False
 
-        nodes = self.marked_pattern_graph.get_nodes_of_edges()
-        edges = self.marked_pattern_graph.get_edges()
+    def _apply_rule_2_to(self, node_1, node_2):
+        if (not self.marked_pattern_graph.has_arrowhead((node_1, node_2))) \
+            and self.marked_pattern_graph.has_marked_path((node_1, node_2)):
+                self.marked_pattern_graph.add_arrowhead((node_1, node_2))
 
-        while (applied):
-            applied = False
+                logging.debug(
+                    'Rule 2: marked path from %s to %s, so %s -> %s',
+                    node_1,
+                    node_2,
+                    node_1,
+                    node_2
+                )
 
-            for node_1 in nodes:
-                for node_2 in nodes:
-                    if node_1 == node_2:
-                        continue
+                self._mark_changed(node_1, node_2, marked=False)
 
-                    if set({frozenset({node_1, node_2})}).intersection(edges) == set({}):
-                        applied = applied or self._apply_rule_1_to(
-                            node_1,
-                            node_2
-                        )
-                    else:
-                        applied = applied or self._apply_rule_2_to(node_1, node_2)
+                return True
 
+        return False
 
-    def _apply_rule_1_to(self, node_1, node_2):
-        applied = False
+    def _mark_changed(self, node_1, node_2, marked):
+        """
+            Queues what could apply now that the mark node_1 has for node_2
+            changed: the triples that use it, and rule 2 for the pair. If it
+            became a marked arrowhead, the marked paths that appeared end at
+            node_2 or at a node with a marked path from it, so rule 2 also
+            gets queued for the adjacent pairs that end there.
+        """
+        for other in self.in_neighbors.get(node_2, set()) - set({node_1}):
+            self._enqueue_rule_1(node_1, node_2, other)
+            self._enqueue_rule_1(other, node_2, node_1)
 
-        common_neighbors = self.marked_pattern_graph.get_common_neighbors(node_1, node_2)
+        for other in self.in_neighbors.get(node_1, set()) - set({node_2}):
+            self._enqueue_rule_1(other, node_1, node_2)
 
-        for common_neighbor in common_neighbors:
-            if self.marked_pattern_graph.has_arrowhead(
-                    (node_1, common_neighbor)
-                ) \
-                and not self.marked_pattern_graph.has_arrowhead((node_2, common_neighbor)) \
-                and not self.marked_pattern_graph.has_marked_arrowhead((common_neighbor, node_2)):
+        self._enqueue_rule_2(node_1, node_2)
 
-                self.marked_pattern_graph.add_marked_arrowhead((common_neighbor, node_2))
+        if not marked:
+            return
 
-                applied = applied | True
+        for end in self._marked_descendants(node_2):
+            for start in self.adjacent.get(end, set()):
+                self._enqueue_rule_2(start, end)
 
-        return applied
+    def _marked_descendants(self, node):
+        """
+            Returns: set[str]
+                node, and the nodes with a path of marked arrows from it.
+        """
+        reached = set({node})
+        to_visit = [node]
 
-    def _apply_rule_2_to(self, node_1, node_2):
-        if (not self.marked_pattern_graph.has_arrowhead((node_1, node_2))) \
-            and self.marked_pattern_graph.has_marked_path((node_1, node_2)):
-                self.marked_pattern_graph.add_arrowhead((node_1, node_2))
+        while len(to_visit) > 0:
+            current = to_visit.pop()
 
+            for other in self.adjacent.get(current, set()):
+                if other not in reached \
+                    and self.marked_pattern_graph.has_marked_arrowhead((current, other)):
 
-                print('node_1: {}, node_2: {}, dict: {}'.format(node_1, node_2, self.marked_pattern_graph.dict))
+                    reached.add(other)
+                    to_visit.append(other)
 
-                return True
+        return reached
 
-        return False
+    def _enqueue_rule_1(self, node_1, common_neighbor, node_2):
+        if node_1 == node_2 \
+            or node_2 in self.adjacent.get(node_1, set()) \
+            or node_1 not in self.in_neighbors.get(common_neighbor, set()) \
+            or node_2 not in self.in_neighbors.get(common_neighbor, set()):
+            return
+
+        self._enqueue((node_1, common_neighbor, node_2))
 
-    def _nodes_of_edges(self):
-        if 'nodes_cache' in dir(self):
-            return self.nodes_cache
+    def _enqueue_rule_2(self, node_1, node_2):
+        if node_2 not in self.adjacent.get(node_1, set()):
+            return
 
-        self.nodes_cache = list(self.marked_pattern_graph.get_nodes_of_edges())
+        self._enqueue((node_1, node_2))
 
-        return self.nodes_cache
+    def _enqueue(self, item):
+        if item not in self.queued:
+            self.queued.add(item)
+            self.worklist.append(item)
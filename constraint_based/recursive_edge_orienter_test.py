@@ -113,3 +113,21 @@ def test_firing_squad():
 
     assert graph.get_marked_arrows() == set({('prisoner shot', 'prisoner death')})
 
+
+def test_propagates_down_a_long_chain():
+    #  a -> b <- c
+    #       |
+    #       x0 - x1 - ... - x999
+    chain = ['x{}'.format(i) for i in range(1000)]
+    graph = MarkedPatternGraph(
+        nodes=['a', 'b', 'c'] + chain,
+        undirected_edges=list(zip(['b'] + chain[:-1], chain)),
+        unmarked_arrows=[('a', 'b'), ('c', 'b')]
+    )
+
+    RecursiveEdgeOrienter(
+        marked_pattern_graph=graph
+    ).orient()
+
+    assert graph.get_marked_arrows() == set(zip(['b'] + chain[:-1], chain))
+    assert graph.get_undirected_edges() == set({})
@@ -1,6 +1,9 @@
 from constraint_based.density_ratio_weighted_correction import DensityRatioWeightedCorrection
 from constraint_based.ci_tests.bmd_is_independent import bmd_is_independent
-from constraint_based.density_ratio_weighted_correction import DensityRatioWeightedCorrection
+from constraint_based.executors import get_executor, owns_executor
+from constraint_based.misc import accepts_weights, expand_counts
+from constraint_based.missingness_profile import MissingnessProfile
+from graphs.marked_pattern_graph import MarkedPatternGraph
 from itertools import combinations
 import re
 
@@ -13,14 +16,29 @@ class RemovableEdgesFinder(object):
             graph: Graph
                 responds to ....
             data_correction: class
-                Some class that responds to "correct" which should
-                simulated data that adjusts for missingness. "correct" invocation
-                should return a pandas.DataFrame.
+                Gets passed data, var_names, graph, missingness_profile and
+                weights, and responds to "correct_counts", which should return a
+                count table (a pandas.DataFrame and the weights of its rows)
+                that adjusts for missingness. The graph it gets only has the
+                marked arrows of graph (e.g. the direct causes of
+                missingness), since the edges are what's being searched.
             cond_indep_test: function.
                 Defaults to constraint_based.ci_tests.bmd_is_independent
 
                 Some function that tells us whether or not sets of variables
                 are independent from each other given a conditioning set.
+                If it takes "weights", it gets the corrected count table and
+                its counts as weights. Otherwise, it gets the rows of the
+                table repeated as many times as their count.
+            executor: Executor or str. Defaults to None, i.e. "serial".
+                The edges are searched in parallel on it, one task per edge.
+                See constraint_based.executors. One built from a name gets
+                closed when "find" returns.
+            missingness_profile: MissingnessProfile. Defaults to None.
+                The profile of data, if it was already made.
+            weights: array-like. Defaults to None.
+                The number of observations each row of data stands for (see
+                misc.deduplicate).
     """
     def __init__(
         self,
@@ -30,7 +48,10 @@ class RemovableEdgesFinder(object):
         data_correction=DensityRatioWeightedCorrection,
         cond_indep_test=bmd_is_independent,
         potentially_extraneous_edges=[],
-        missingness_indicator_prefix='MI_'
+        missingness_indicator_prefix='MI_',
+        executor=None,
+        missingness_profile=None,
+        weights=None
     ):
         self.data = data
         self.potentially_extraneous_edges = potentially_extraneous_edges
@@ -39,63 +60,105 @@ class RemovableEdgesFinder(object):
         self.data_correction = data_correction
         self.cond_indep_test = cond_indep_test
         self.missingness_indicator_prefix = missingness_indicator_prefix
+        self.executor = get_executor(executor)
+        self._owns_executor = owns_executor(executor)
+        self.weights = weights
+
+        if missingness_profile is None:
+            missingness_profile = MissingnessProfile(
+                data,
+                missingness_indicator_prefix=missingness_indicator_prefix,
+                weights=weights
+            )
+
+        self.missingness_profile = missingness_profile
 
     def find(self):
+        """
+            Looks for a separating set of each potentially extraneous edge.
+            The edges are independent of each other (the graph isn't changed
+            while searching), so they run in parallel, and their separating
+            sets are added to cond_sets in the order of the edges.
+
+            Returns: list
+                The potentially extraneous edges that were separated.
+        """
         if len(self.potentially_extraneous_edges) == 0:
             return []
 
-        extraneous_edges = []
-
-        for potentially_extraneous_edge in self.potentially_extraneous_edges:
-            var_name_1, var_name_2 = tuple(potentially_extraneous_edge)
-
-            var_1_neighbors = \
-                self.graph.get_neighbors(var_name_1) - set({var_name_1, var_name_2})
-            var_2_neighbors = \
-                self.graph.get_neighbors(var_name_2) - set({var_name_1, var_name_2})
-
-            if len(var_1_neighbors) > len(var_2_neighbors):
-                nbrs = [var_2_neighbors, var_1_neighbors]
-            else:
-                nbrs = [var_1_neighbors, var_2_neighbors]
-
-            extraneous = False
-
-            for neighbors in nbrs:
-                depth = 0
-
-                if extraneous:
-                    break
-
-                while len(neighbors) > depth:
-                    if extraneous:
-                        break
-
-                    for cond_set in combinations(neighbors, depth):
-                        _data = self.data_correction(
-                            data=self.data,
-                            var_names=set(cond_set)\
-                                .union(set({var_name_1, var_name_2})),
-                            graph=self.graph
-                        ).correct()
+        edges = list(self.potentially_extraneous_edges)
+
+        try:
+            data = self.executor.scatter(self.data)
+            marked_arrows = self.executor.scatter(self._marked_arrows_graph())
+
+            futures = [
+                self.executor.submit(
+                    find_separating_set,
+                    data=data,
+                    graph=marked_arrows,
+                    var_names=tuple(sorted(edge)),
+                    neighbor_sets=self._neighbor_sets(edge),
+                    data_correction=self.data_correction,
+                    cond_indep_test=self.cond_indep_test,
+                    missingness_profile=self.missingness_profile,
+                    weights=self.weights
+                )
+                for edge in edges
+            ]
+
+            cond_sets = self.executor.gather(futures)
+        finally:
+            if self._owns_executor:
+                self.executor.close()
 
-                        if self.cond_indep_test(
-                               data=_data,
-                               vars_1=[var_name_1],
-                               vars_2=[var_name_2],
-                               conditioning_set=list(cond_set),
-                           ):
-
-                           self.cond_sets.add(var_name_1, var_name_2, cond_set)
+        extraneous_edges = []
 
-                           extraneous_edges.append(potentially_extraneous_edge)
-                           extraneous = True
-                           break
+        for edge, cond_set in zip(edges, cond_sets):
+            if cond_set is None:
+                continue
 
-                    depth += 1
+            var_name_1, var_name_2 = tuple(sorted(edge))
+            self.cond_sets.add(var_name_1, var_name_2, cond_set)
+            extraneous_edges.append(edge)
 
         return extraneous_edges
 
+    def _marked_arrows_graph(self):
+        """
+            Returns: MarkedPatternGraph
+                The nodes and marked arrows of graph, without its other
+                edges. It's what the tasks get instead of the whole graph.
+        """
+        return MarkedPatternGraph(
+            nodes=sorted(self.graph.get_nodes()),
+            marked_arrows=sorted(self.graph.get_marked_arrows()),
+            missingness_indicator_prefix=self.missingness_indicator_prefix
+        )
+
+    def _neighbor_sets(self, edge):
+        """
+            Returns: list[list[str]]
+                The other neighbors of each node of the edge, smallest
+                neighborhood first. Missingness indicators are left out,
+                since the corrected data has no missingness.
+        """
+        var_name_1, var_name_2 = tuple(sorted(edge))
+        excluded = set({var_name_1, var_name_2})\
+            .union(set(self._missingness_indicators()))
+
+        var_1_neighbors = sorted(
+            self.graph.get_neighbors(var_name_1) - excluded
+        )
+        var_2_neighbors = sorted(
+            self.graph.get_neighbors(var_name_2) - excluded
+        )
+
+        if len(var_1_neighbors) > len(var_2_neighbors):
+            return [var_2_neighbors, var_1_neighbors]
+
+        return [var_1_neighbors, var_2_neighbors]
+
     def _missingness_indicators(self):
         nodes = list(self.graph.get_nodes())
 
@@ -111,3 +174,71 @@ class RemovableEdgesFinder(object):
         return (
             set(self.data.columns) - set(self._missingness_indicators())
         ) - set({var_name_1, var_name_2})
+
+
+def find_separating_set(
+    data,
+    graph,
+    var_names,
+    neighbor_sets,
+    data_correction,
+    cond_indep_test,
+    missingness_profile=None,
+    weights=None
+):
+    """
+        Tries the subsets of each neighbor set, smallest first, on data
+        corrected for missingness, and stops at the first one that separates
+        the two variables.
+
+        Parameters:
+            data: pandas.DataFrame
+            graph: MarkedPatternGraph
+                Passed to data_correction. Its marked arrows are enough.
+            var_names: tuple[str]
+                The two nodes of the edge.
+            neighbor_sets: list[list[str]]
+                Where the conditioning sets are drawn from.
+            data_correction: class
+            cond_indep_test: function
+            missingness_profile: MissingnessProfile
+            weights: array-like
+                See RemovableEdgesFinder.
+
+        Returns: tuple[str] or None
+            The separating set, if one was found.
+    """
+    var_name_1, var_name_2 = var_names
+    test_takes_weights = accepts_weights(cond_indep_test)
+
+    for neighbors in neighbor_sets:
+        depth = 0
+
+        while len(neighbors) >= depth:
+            for cond_set in combinations(neighbors, depth):
+                _data, _weights = data_correction(
+                    data=data,
+                    var_names=set(cond_set)\
+                        .union(set({var_name_1, var_name_2})),
+                    graph=graph,
+                    missingness_profile=missingness_profile,
+                    weights=weights
+                ).correct_counts()
+
+                if test_takes_weights:
+                    test_kwargs = {'weights': _weights}
+                else:
+                    _data, test_kwargs = expand_counts(_data, _weights), {}
+
+                if cond_indep_test(
+                       data=_data,
+                       vars_1=[var_name_1],
+                       vars_2=[var_name_2],
+                       conditioning_set=list(cond_set),
+                       **test_kwargs
+                   ):
+                    return cond_set
+
+            depth += 1
+
+    return None
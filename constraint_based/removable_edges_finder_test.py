@@ -2,12 +2,12 @@ import pytest
 from constraint_based.removable_edges_finder import RemovableEdgesFinder
 from graphs.marked_pattern_graph import MarkedPatternGraph
 from constraint_based.density_ratio_weighted_correction import DensityRatioWeightedCorrection
-from constraint_based.misc import key_for_pair, ConditioningSets
+from constraint_based.misc import key_for_pair, SepSets
 
 def test_cond_on_collider(df_X_and_Y_cause_Z_and_Z_cause_MI_X):
     df = df_X_and_Y_cause_Z_and_Z_cause_MI_X(size=2000)
 
-    cond_sets = ConditioningSets()
+    cond_sets = SepSets()
 
     # extraneous edge x-y
     graph = MarkedPatternGraph(
@@ -44,7 +44,7 @@ def test_long_chains_and_collider_with_MI(df_long_chains_and_collider_with_MI):
         marked_arrows=[('c', 'MI_b')]
     )
 
-    cond_sets = ConditioningSets()
+    cond_sets = SepSets()
 
     finder = RemovableEdgesFinder(
         data=df,
@@ -84,7 +84,7 @@ def test_3_multinom_RVs_MAR(
         ]
     )
 
-    cond_sets = ConditioningSets()
+    cond_sets = SepSets()
 
     finder = RemovableEdgesFinder(
         data=df,
@@ -109,7 +109,7 @@ def test_chain_and_collider_with_MI(
 
     df = df_chain_and_collider_with_MI(size=size)
 
-    cond_sets = ConditioningSets()
+    cond_sets = SepSets()
 
     graph = MarkedPatternGraph(
         nodes=list(set(df.columns).union(set({'MI_y'}))),
@@ -147,3 +147,71 @@ def test_chain_and_collider_with_MI(
     assert cond_sets[key_for_pair(('a', 'c'))] != set({})
 
     assert set(removables) == set({ frozenset({'a', 'c'}) })
+
+class MarkedArrowsOnlyCorrection(DensityRatioWeightedCorrection):
+    def __init__(self, graph, **kwargs):
+        assert graph.get_undirected_edges() == set()
+
+        super().__init__(graph=graph, **kwargs)
+
+@pytest.mark.parametrize('executor', ['serial', 'threads'])
+def test_edges_in_parallel(executor, df_long_chains_and_collider_with_MI):
+    df = df_long_chains_and_collider_with_MI(size=1000, proba_noise=0.6)
+
+    graph = MarkedPatternGraph(
+        nodes=list(set(df.columns).union(set({'MI_b'}))),
+        undirected_edges=set({
+            frozenset({'b', 'a'}),
+            frozenset({'d', 'e'}),
+            frozenset({'d', 'c'}),
+            frozenset({'b', 'c'}),
+            frozenset({'d', 'b'})
+        }),
+        marked_arrows=[('c', 'MI_b')]
+    )
+
+    cond_sets = SepSets()
+
+    removables = RemovableEdgesFinder(
+        data=df,
+        cond_sets=cond_sets,
+        graph=graph,
+        potentially_extraneous_edges=[
+            frozenset({'d', 'b'}),
+            frozenset({'d', 'c'}),
+            frozenset({'b', 'c'})
+        ],
+        data_correction=MarkedArrowsOnlyCorrection,
+        cond_indep_test=lambda **kwargs: \
+            kwargs['vars_1'] == ['b'] and kwargs['vars_2'] == ['d'],
+        executor=executor
+    ).find()
+
+    assert removables == [frozenset({'d', 'b'})]
+    assert cond_sets == {'b _||_ d': set({frozenset()})}
+
+def test_cond_indep_test_without_weights(df_long_chains_and_collider_with_MI):
+    df = df_long_chains_and_collider_with_MI(size=1000, proba_noise=0.6)
+    graph = MarkedPatternGraph(
+        nodes=list(set(df.columns).union(set({'MI_b'}))),
+        undirected_edges=[('b', 'd'), ('b', 'c')],
+        marked_arrows=[('c', 'MI_b')]
+    )
+    num_rows = []
+
+    def cond_indep_test(data, vars_1, vars_2, conditioning_set): # pylint: disable=unused-argument
+        num_rows.append(data.shape[0])
+
+        return True
+
+    removables = RemovableEdgesFinder(
+        data=df,
+        cond_sets=SepSets(),
+        graph=graph,
+        potentially_extraneous_edges=[frozenset({'d', 'b'})],
+        cond_indep_test=cond_indep_test
+    ).find()
+
+    assert removables == [frozenset({'d', 'b'})]
+    # The rows of the corrected table, rather than its distinct rows.
+    assert num_rows[0] > 100
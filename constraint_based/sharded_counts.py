@@ -0,0 +1,120 @@
+"""
+    sharded_counts.py
+
+    Count tables (the sufficient statistics of discrete CI tests) computed
+    over a dataset whose rows are split into shards. Counts are additive
+    across shards, so each shard counts its own rows and the partial tables
+    get summed.
+
+    - ShardedCounts
+    - partial_counts
+    - sum_counts
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class ShardedCounts:
+    """
+        Splits the rows of a dataset into shards held by the workers of an
+        executor, and answers count queries from them.
+
+        Parameters:
+            data: pandas.DataFrame
+            num_shards: int
+            executor: Executor
+                Decides where the shards live. See Executor.place_shards.
+    """
+    def __init__(self, data, num_shards, executor):
+        row_indices = np.array_split(np.arange(data.shape[0]), num_shards)
+
+        self.shards = executor.place_shards(
+            [data.iloc[indices] for indices in row_indices]
+        )
+
+    def count(self, column_sets):
+        """
+            Parameters:
+                column_sets: list[tuple[str]]
+
+            Returns: dict
+                key: tuple[str]
+                    One of column_sets.
+                value: tuple
+                    table: pandas.DataFrame
+                        The distinct combinations of values of the columns,
+                        missing values included.
+                    weights: numpy.ndarray
+                        The number of rows that have each combination.
+        """
+        futures = [
+            shard.submit(partial_counts, column_sets) for shard in self.shards
+        ]
+        partials = [future.result() for future in futures]
+
+        return {
+            columns: sum_counts(
+                columns,
+                [partial[index] for partial in partials]
+            )
+            for index, columns in enumerate(column_sets)
+        }
+
+    def close(self):
+        """
+            Releases the shards.
+        """
+        for shard in self.shards:
+            shard.close()
+
+
+def partial_counts(shard, column_sets):
+    """
+        Counts the combinations of values of each column set in one shard.
+
+        Parameters:
+            shard: pandas.DataFrame
+            column_sets: list[tuple[str]]
+
+        Returns: list[pandas.Series]
+            Counts indexed by the combinations of values, in the order of
+            column_sets.
+    """
+    return [
+        shard.groupby(list(columns), dropna=False).size()
+        for columns in column_sets
+    ]
+
+
+def sum_counts(columns, partials):
+    """
+        Adds up the partial counts of the same columns.
+
+        Parameters:
+            columns: tuple[str]
+            partials: list[pandas.Series]
+                Returned by partial_counts.
+
+        Returns: tuple[pandas.DataFrame, numpy.ndarray]
+            See ShardedCounts.count.
+    """
+    # Positions instead of names, so that no column name can clash with the
+    # column holding the counts.
+    num_columns = len(columns)
+    frames = []
+
+    for partial in partials:
+        frame = partial.index.to_frame(index=False)
+        frame.columns = list(range(num_columns))
+        frame[num_columns] = partial.values
+        frames.append(frame)
+
+    summed = pd.concat(frames)\
+        .groupby(list(range(num_columns)), dropna=False)[num_columns]\
+        .sum()
+
+    table = summed.index.to_frame(index=False)
+    table.columns = list(columns)
+
+    return table, summed.values
@@ -0,0 +1,50 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import pytest
+import numpy as np
+import pandas as pd
+from causal_discovery.constraint_based.executors import get_executor
+from causal_discovery.constraint_based.sharded_counts import ShardedCounts
+
+
+def data_with_missing_values(size=200):
+    np.random.seed(0)
+    df = pd.DataFrame({
+        'x': np.random.randint(0, 3, size=size).astype(float),
+        'y': np.random.randint(0, 2, size=size).astype(float),
+        'z': np.random.randint(0, 2, size=size),
+    })
+    df.loc[:19, 'x'] = np.nan
+    df.loc[10:29, 'y'] = np.nan
+
+    return df
+
+def as_counts(table, weights):
+    counts = table.copy()
+    counts['count'] = weights
+
+    return counts.sort_values(list(table.columns)).reset_index(drop=True)
+
+@pytest.mark.parametrize('name', ['serial', 'threads', 'processes'])
+def test_counts_add_up_over_shards(name):
+    df = data_with_missing_values()
+    sharded_counts = ShardedCounts(df, num_shards=3, executor=get_executor(name))
+
+    counts = sharded_counts.count([('x',), ('x', 'y', 'z')])
+    sharded_counts.close()
+
+    for columns in [('x',), ('x', 'y', 'z')]:
+        expected = df.groupby(list(columns), dropna=False).size()
+
+        pd.testing.assert_frame_equal(
+            as_counts(*counts[columns]),
+            as_counts(expected.index.to_frame(index=False), expected.values),
+        )
+
+def test_more_shards_than_rows():
+    df = pd.DataFrame({'x': [0, 1]})
+    sharded_counts = ShardedCounts(df, num_shards=4, executor=get_executor())
+
+    table, weights = sharded_counts.count([('x',)])[('x',)]
+
+    assert list(table['x']) == [0, 1]
+    assert list(weights) == [1, 1]
@@ -1,12 +1,20 @@
+from constraint_based.adjacencies import Adjacencies, candidate_tests
 from constraint_based.ci_tests.bmd_is_independent import bmd_is_independent
-from itertools import combinations
-from constraint_based.misc import conditioning_sets_satisfying_conditional_independence, key_for_pair
+from constraint_based.conditioning_set_orderings import default_ordering
+from constraint_based.misc import key_for_pair
 from graphs.marked_pattern_graph import MarkedPatternGraph
 
 class SkeletonFinder():
     """
         Finds the set of undirected edges among nodes.
 
+        Runs in a single process. Starting from the complete graph, it looks
+        for conditioning sets of increasing size (depth), drawn only from the
+        current neighbors of the two nodes. Removing an edge shrinks the
+        neighborhoods used by the tests that come after it. For sparse
+        graphs, that's far fewer tests than trying all the subsets of all
+        the other variables.
+
         Parameters:
             var_names: [list[str]]
                 The names of variables that will be in the Skeleton. e.g.
@@ -15,6 +23,16 @@ class SkeletonFinder():
             data [pandas.DataFrame]
                 Contains data. Each column is a variable. Each column name must
                 match one and only of the var_names.
+
+            cond_indep_test: function. Defaults to bmd_is_independent
+
+            max_depth: int. Defaults to 8.
+                The largest conditioning set to try.
+
+            only_find_one: bool. Defaults to False.
+                If True, stop testing a pair at its first separating set.
+                Otherwise, all the separating sets of the depth at which the
+                pair got separated are kept.
     """
     def __init__(
         self,
@@ -57,30 +75,43 @@ class SkeletonFinder():
                         The conditioning sets that make X and Y conditionally
                         independent.
         """
-        undirected_edges = []
+        adjacencies = Adjacencies({
+            var_name: set(self.orig_cols) - set({var_name})
+            for var_name in self.orig_cols
+        })
         cond_sets_satisfying_cond_indep = {}
-
-        for var_name_1, var_name_2 in combinations(self.orig_cols, 2):
-            possible_conditioning_set_vars = \
-                set(self.orig_cols) \
-                - set([var_name_1, var_name_2])
-
-            cond_sets = conditioning_sets_satisfying_conditional_independence(
-                data=self.data,
-                var_name_1=var_name_1,
-                var_name_2=var_name_2,
-                cond_indep_test=self.cond_indep_test,
-                possible_conditioning_set_vars=possible_conditioning_set_vars,
-                only_find_one=self.only_find_one,
-                max_depth=self.max_depth
-            )
-
-            if len(cond_sets) == 0:
-                undirected_edges.append(frozenset((var_name_1, var_name_2)))
-            else:
-                cond_sets_satisfying_cond_indep[
-                    key_for_pair([var_name_1, var_name_2])
-                ] = cond_sets
+        column_index = {var_name: i for i, var_name in enumerate(self.orig_cols)}
+        depth = 0
+
+        while depth <= self.max_depth and adjacencies.has_edges_to_test(depth):
+            for edge in adjacencies.edges_to_test(depth):
+                var_name_1, var_name_2 = sorted(edge, key=column_index.get)
+
+                # removed earlier at this depth
+                if var_name_2 not in adjacencies.neighbors[var_name_1]:
+                    continue
+
+                cond_sets = self._separating_sets(
+                    var_name_1,
+                    var_name_2,
+                    adjacencies.neighbors,
+                    depth
+                )
+
+                if len(cond_sets) > 0:
+                    adjacencies.remove_edge(var_name_1, var_name_2)
+                    cond_sets_satisfying_cond_indep[
+                        key_for_pair([var_name_1, var_name_2])
+                    ] = cond_sets
+
+            depth += 1
+
+        undirected_edges = [
+            frozenset((var_name_1, var_name_2))
+            for var_name_1, neighbors in adjacencies.neighbors.items()
+            for var_name_2 in neighbors
+            if var_name_1 < var_name_2
+        ]
 
         marked_pattern = MarkedPatternGraph(
             nodes=list(self.data.columns),
@@ -89,29 +120,40 @@ class SkeletonFinder():
 
         return marked_pattern, cond_sets_satisfying_cond_indep
 
-    def _is_independent(self, var_name_1, var_name_2):
+    def _separating_sets(self, var_name_1, var_name_2, neighbors, depth):
         """
-            Goes through possible conditioning sets, including the empty set.
-        """
-
-        for cond_set_length in np.arange(len(self.var_names) - 1):
-            cond_set_combos = combinations(
-                list(
-                    set(self.var_names) - set([var_name_1, var_name_2])
-                ),
-                cond_set_length
-            )
-
+            Tries the conditioning sets of size depth drawn from the current
+            neighbors of either variable. The test is always run as
+            var_name_1 vs. var_name_2, since it needn't be symmetric.
 
-            for cond_set_combo in cond_set_combos:
-                if self.cond_indep_test(
-                       data=self.data,
-                       vars_1=[var_name_1],
-                       vars_2=[var_name_2],
-                       conditioning_set=list(cond_set_combo),
-                   ):
-
-                   return True
+            Returns: list[set[str]]
+                The ones that make the two variables independent. At most
+                one if only_find_one is True.
+        """
+        cond_sets = []
+        tried = set({})
+
+        for _, _, combo in candidate_tests(
+            (var_name_1, var_name_2),
+            neighbors,
+            depth,
+            default_ordering
+        ):
+            # Both neighborhoods can yield the same set.
+            if frozenset(combo) in tried:
+                continue
+
+            tried.add(frozenset(combo))
+
+            if self.cond_indep_test(
+                data=self.data,
+                vars_1=[var_name_1],
+                vars_2=[var_name_2],
+                conditioning_set=list(combo),
+            ):
+                cond_sets.append(set(combo))
 
-        return False
+                if self.only_find_one:
+                    break
 
+        return cond_sets
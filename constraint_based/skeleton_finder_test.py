@@ -1,5 +1,6 @@
 import pytest
 import numpy as np
+import pandas as pd
 from constraint_based.skeleton_finder import SkeletonFinder
 
 # SkeletonFinder is missing an edge because the distribution we used is
@@ -173,3 +174,39 @@ def test_3_multinom_RVs_MAR(
 
     assert set(graph.nodes).intersection(set(['x', 'y', 'MI_x']))
     assert set(graph.get_undirected_edges()) == frozenset({frozenset(('x', 'z')), frozenset(('z', 'y')), frozenset(('x', 'y'))})
+
+def test_conditioning_sets_come_from_neighbors():
+    # a -> b -> c -> d -> e, with an oracle for the independencies
+    chain = ['a', 'b', 'c', 'd', 'e']
+    tested = []
+
+    def oracle_is_independent(data, vars_1, vars_2, conditioning_set):
+        tested.append((vars_1[0], vars_2[0], frozenset(conditioning_set)))
+        index_1 = chain.index(vars_1[0])
+        index_2 = chain.index(vars_2[0])
+        between = set(chain[min(index_1, index_2) + 1:max(index_1, index_2)])
+
+        return len(between.intersection(conditioning_set)) > 0
+
+    df = pd.DataFrame({var: [0, 1] for var in chain})
+    skeleton_finder = SkeletonFinder(
+        data=df,
+        var_names=chain,
+        cond_indep_test=oracle_is_independent,
+        only_find_one=True
+    )
+
+    graph, cond_sets_satisfying_cond_indep = skeleton_finder.find()
+
+    assert graph.get_undirected_edges() == set({
+        frozenset(('a', 'b')),
+        frozenset(('b', 'c')),
+        frozenset(('c', 'd')),
+        frozenset(('d', 'e')),
+    })
+    assert cond_sets_satisfying_cond_indep['a _||_ c'] == [set({'b'})]
+
+    # a and e get separated by {b} at depth 1, so the larger sets are never
+    # tried. Trying every subset of the other variables would take 80 tests.
+    assert ('a', 'e', frozenset({'b', 'c', 'd'})) not in tested
+    assert len(tested) < 30
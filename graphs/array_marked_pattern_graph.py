@@ -0,0 +1,218 @@
+"""
+    array_marked_pattern_graph.py
+
+    A MarkedPatternGraph stored as a matrix of edge marks over integer node
+    ids, for graphs with many nodes.
+
+    - ArrayMarkedPatternGraph
+"""
+
+import numpy as np
+from causal_discovery.graphs.marked_pattern.edges import NoEdge, UndirectedEdge, UnmarkedArrow, MarkedArrow
+from causal_discovery.graphs.marked_pattern_graph import MarkedPatternGraph
+
+
+class ArrayMarkedPatternGraph(MarkedPatternGraph):
+    """
+        Same interface and behavior as MarkedPatternGraph, which keeps a set
+        of nodes per node and arrowhead type. Here, each node gets an integer
+        id, and marks[i, j] holds the arrowhead types that
+        MarkedPatternGraph.dict[node_i] has for node_j, as bits of an int8.
+
+        Mark lookups are O(1), neighbors are found by scanning one row, and
+        edge listings are done on the whole matrix with numpy.
+
+        The matrix grows by doubling as nodes get added.
+
+        Parameters: see MarkedPatternGraph.
+    """
+    MARK_BITS = {
+        MarkedPatternGraph.NO_ARROWHEAD: 1,
+        MarkedPatternGraph.UNMARKED_ARROWHEAD: 2,
+        MarkedPatternGraph.MARKED_ARROWHEAD: 4,
+    }
+
+    TAIL = MARK_BITS[MarkedPatternGraph.NO_ARROWHEAD]
+    ARROWHEAD = MARK_BITS[MarkedPatternGraph.UNMARKED_ARROWHEAD]
+    MARKED = MARK_BITS[MarkedPatternGraph.MARKED_ARROWHEAD]
+
+    @property
+    def dict(self):
+        """
+            Returns: dict
+                The marks in the layout of MarkedPatternGraph.dict. Built on
+                every call; meant for debugging.
+        """
+        return {
+            node: {
+                arrowhead_type: set(
+                    self.names[j] for j in np.flatnonzero(
+                        self._matrix()[i] & bit
+                    )
+                )
+                for arrowhead_type, bit in self.MARK_BITS.items()
+            }
+            for i, node in enumerate(self.names)
+        }
+
+    def add_undirected_edge(self, node_tuple):
+        node_1, node_2 = self._instantiate_node_tuple(node_tuple)
+        i, j = self.ids[node_1], self.ids[node_2]
+
+        self.marks[i, j] |= self.TAIL
+        self.marks[j, i] |= self.TAIL
+
+        self._changed('add_undirected_edge', (node_1, node_2))
+
+    def remove_undirected_edge(self, undirected_edge):
+        node_1, node_2 = self._instantiate_node_tuple(undirected_edge)
+        i, j = self.ids[node_1], self.ids[node_2]
+
+        self.marks[i, j] &= ~self.TAIL
+        self.marks[j, i] &= ~self.TAIL
+
+        self._changed('remove_undirected_edge', (node_1, node_2))
+
+    def add_arrowhead(self, node_tuple):
+        self._set_mark(node_tuple, self.ARROWHEAD, 'add_arrowhead')
+
+    def add_marked_arrowhead(self, node_tuple):
+        self._set_mark(node_tuple, self.MARKED, 'add_marked_arrowhead')
+
+    def has_arrowhead(self, node_tuple):
+        return self._has_mark(node_tuple, self.ARROWHEAD | self.MARKED)
+
+    def has_marked_arrowhead(self, node_tuple):
+        return self._has_mark(node_tuple, self.MARKED)
+
+    def has_unmarked_arrowhead(self, node_tuple):
+        return self._has_mark(node_tuple, self.ARROWHEAD)
+
+    def _marked_children(self, node):
+        if node not in self.ids:
+            return []
+
+        return self._names_of(
+            np.flatnonzero(self._matrix()[self.ids[node]] & self.MARKED)
+        )
+
+    def get_edges(self):
+        matrix = self._matrix()
+
+        return self._undirected_pairs((matrix != 0) | (matrix.T != 0))
+
+    def get_edge(self, node_1, node_2):
+        if node_1 not in self.ids or node_2 not in self.ids:
+            return NoEdge(node_1, node_2)
+
+        mark = self.marks[self.ids[node_1], self.ids[node_2]]
+
+        if mark & self.TAIL:
+            return UndirectedEdge(node_1, node_2)
+
+        if mark & self.ARROWHEAD:
+            return UnmarkedArrow(node_1, node_2)
+
+        if mark & self.MARKED:
+            return MarkedArrow(node_1, node_2)
+
+    def get_neighbors(self, node):
+        if node not in self.ids:
+            return set({})
+
+        return set(
+            self._names_of(np.flatnonzero(self._matrix()[self.ids[node]]))
+        )
+
+    def get_nodes(self):
+        return set(self.names).union(self.nodes)
+
+    def get_undirected_edges(self):
+        tails = self._has_bit(self.TAIL)
+
+        return self._undirected_pairs(tails & tails.T)
+
+    def get_unmarked_arrows(self):
+        return self._directed_pairs(
+            self._has_bit(self.ARROWHEAD) & self._has_bit(self.TAIL).T
+        )
+
+    def get_marked_arrows(self):
+        return self._directed_pairs(self._has_bit(self.MARKED))
+
+    def get_bidirectional_edges(self):
+        arrowheads = self._has_bit(self.ARROWHEAD)
+
+        return self._undirected_pairs(arrowheads & arrowheads.T)
+
+    def _instantiate_storage(self):
+        self.ids = {}
+        self.names = []
+        self.marks = np.zeros((0, 0), dtype=np.int8)
+
+    def _instantiate_dict_for_var(self, var):
+        if len(self.names) == self.marks.shape[0]:
+            capacity = max(2 * self.marks.shape[0], 8)
+            marks = np.zeros((capacity, capacity), dtype=np.int8)
+            marks[:len(self.names), :len(self.names)] = self._matrix()
+            self.marks = marks
+
+        self.ids[var] = len(self.names)
+        self.names.append(var)
+
+    def _instantiate_node_tuple(self, node_tuple):
+        _node_tuple = tuple(node_tuple)
+
+        assert len(_node_tuple) == 2
+
+        node_1 = _node_tuple[0]
+        node_2 = _node_tuple[1]
+
+        if node_1 not in self.ids:
+            self._instantiate_dict_for_var(node_1)
+
+        if node_2 not in self.ids:
+            self._instantiate_dict_for_var(node_2)
+
+        return node_1, node_2
+
+    def _set_mark(self, node_tuple, bit, method_name):
+        """
+            Replaces the marks node_1 has for node_2 by bit.
+        """
+        node_1, node_2 = self._instantiate_node_tuple(node_tuple)
+
+        self.marks[self.ids[node_1], self.ids[node_2]] = bit
+
+        self._changed(method_name, (node_1, node_2))
+
+    def _has_mark(self, node_tuple, bits):
+        node_1, node_2 = self._instantiate_node_tuple(node_tuple)
+
+        return bool(self.marks[self.ids[node_1], self.ids[node_2]] & bits)
+
+    def _matrix(self):
+        """
+            Returns: numpy.ndarray
+                The marks of the nodes added so far (a view, not a copy).
+        """
+        return self.marks[:len(self.names), :len(self.names)]
+
+    def _has_bit(self, bit):
+        return (self._matrix() & bit) != 0
+
+    def _names_of(self, ids):
+        return [self.names[i] for i in ids]
+
+    def _directed_pairs(self, mask):
+        rows, columns = np.nonzero(mask)
+
+        return set(zip(self._names_of(rows), self._names_of(columns)))
+
+    def _undirected_pairs(self, mask):
+        rows, columns = np.nonzero(np.triu(mask))
+
+        return set(
+            frozenset({self.names[i], self.names[j]})
+            for i, j in zip(rows, columns)
+        )
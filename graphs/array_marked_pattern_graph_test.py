@@ -0,0 +1,92 @@
+import random
+import pytest
+from causal_discovery.graphs.marked_pattern.edges import UndirectedEdge, UnmarkedArrow, MarkedArrow, NoEdge
+from causal_discovery.graphs.marked_pattern_graph import MarkedPatternGraph
+from causal_discovery.graphs.array_marked_pattern_graph import ArrayMarkedPatternGraph
+
+def assert_same_graph(graph, array_graph):
+    assert array_graph == graph
+    assert array_graph.get_edges() == graph.get_edges()
+    assert array_graph.dict == graph.dict
+
+    for node_1 in graph.get_nodes():
+        assert array_graph.get_neighbors(node_1) == graph.get_neighbors(node_1)
+
+        for node_2 in graph.get_nodes():
+            assert type(array_graph.get_edge(node_1, node_2)) \
+                == type(graph.get_edge(node_1, node_2))
+
+@pytest.mark.parametrize('seed', range(5))
+def test_same_as_marked_pattern_graph_after_random_changes(seed):
+    rng = random.Random(seed)
+    nodes = ['n{}'.format(i) for i in range(12)]
+    graphs = [
+        MarkedPatternGraph(nodes=nodes[:4]),
+        ArrayMarkedPatternGraph(nodes=nodes[:4])
+    ]
+    methods = [
+        'add_undirected_edge',
+        'remove_undirected_edge',
+        'add_arrowhead',
+        'add_marked_arrowhead',
+        'add_marked_arrow',
+        'add_bidirectional_edge',
+    ]
+
+    for _ in range(200):
+        method = rng.choice(methods)
+        node_tuple = tuple(rng.sample(nodes, 2))
+
+        for graph in graphs:
+            getattr(graph, method)(node_tuple)
+
+    assert_same_graph(*graphs)
+
+def test_get_edge():
+    graph = ArrayMarkedPatternGraph(
+        nodes=['a', 'b', 'c', 'd'],
+        undirected_edges=[('a', 'b')],
+        unmarked_arrows=[('b', 'c')],
+        marked_arrows=[('c', 'd')]
+    )
+
+    assert isinstance(graph.get_edge('a', 'b'), UndirectedEdge)
+    assert isinstance(graph.get_edge('b', 'c'), UnmarkedArrow)
+    assert isinstance(graph.get_edge('c', 'd'), MarkedArrow)
+    assert isinstance(graph.get_edge('a', 'e'), NoEdge)
+
+def test_grows_past_initial_capacity():
+    nodes = ['x{}'.format(i) for i in range(100)]
+    graph = ArrayMarkedPatternGraph(
+        nodes=nodes,
+        undirected_edges=list(zip(nodes[:-1], nodes[1:]))
+    )
+
+    assert len(graph.get_undirected_edges()) == 99
+    assert graph.get_neighbors('x50') == set({'x49', 'x51'})
+    assert graph.has_path(('x0', 'x99'))
+
+def test_copy_keeps_backend():
+    graph = ArrayMarkedPatternGraph(
+        nodes=['a', 'b', 'c'],
+        unmarked_arrows=[('a', 'b')],
+        bidirectional_edges=[('b', 'c')]
+    )
+    copy = graph.copy()
+
+    assert isinstance(copy, ArrayMarkedPatternGraph)
+    assert copy == graph
+
+    copy.remove_undirected_edge(('a', 'b'))
+    assert copy != graph
+
+def test_snapshot_keeps_backend():
+    graph = ArrayMarkedPatternGraph(nodes=['a', 'b'], undirected_edges=[('a', 'b')])
+    graph.record_mutations()
+    graph.add_arrowhead(('a', 'b'))
+    snapshot = graph.snapshot()
+    graph.add_arrowhead(('b', 'a'))
+
+    assert isinstance(snapshot.graph(), ArrayMarkedPatternGraph)
+    assert snapshot.graph().get_unmarked_arrows() == set({('a', 'b')})
+
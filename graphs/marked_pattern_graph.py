@@ -1,8 +1,56 @@
 from graphviz import Digraph
 from causal_discovery.graphs.marked_pattern.edges import NoEdge, UndirectedEdge, UnmarkedArrow, MarkedArrow
 import re
+from collections.abc import Set
 from itertools import combinations
 
+
+class SetView(Set):
+    """
+        A read-only, live view of a set. Set operations (union, -, etc.)
+        return new sets.
+
+        Parameters:
+            items: set
+    """
+    def __init__(self, items):
+        self._items = items
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return repr(self._items)
+
+    @classmethod
+    def _from_iterable(cls, it):
+        return set(it)
+
+    def union(self, *others):
+        return self._items.union(*others)
+
+    def intersection(self, *others):
+        return self._items.intersection(*others)
+
+    def difference(self, *others):
+        return self._items.difference(*others)
+
+    def issubset(self, other):
+        return self._items.issubset(other)
+
+    def issuperset(self, other):
+        return self._items.issuperset(other)
+
+    def copy(self):
+        return set(self._items)
+
+
 class MarkedPatternGraph(object):
     NO_ARROWHEAD = "-"
     UNMARKED_ARROWHEAD = "->"
@@ -39,6 +87,21 @@ class MarkedPatternGraph(object):
             undirected_edges: list[sets[str]]
                 E.g. [set(('a', 'b')), set(('b', 'c'))] => a ---- b, b ---- c
 
+        Attributes:
+            version: int
+                Goes up every time the graph changes. Lets caches of things
+                computed from the graph tell when they're stale.
+            mutation_log: list or None
+                The changes made since record_mutations was called, or None
+                if they aren't being recorded. The recording is local: it's
+                left out when the graph gets pickled (e.g. to be shipped to
+                a worker).
+
+        The edges of each type are indexed as the graph changes. The getters
+        (get_edges, get_undirected_edges, etc.) return read-only live views
+        of the indexes, in O(1): copy one (e.g. with set()) before changing
+        the graph while iterating over it.
+
     """
     def __init__(
         self,
@@ -53,7 +116,10 @@ class MarkedPatternGraph(object):
         assert len(nodes) > 0
 
         self.nodes = nodes
-        self.dict = {}
+        self.version = 0
+        self.mutation_log = None
+        self._recording_base = None
+        self._instantiate_storage()
 
         self.add_bidirectional_edges(bidirectional_edges)
 
@@ -72,6 +138,7 @@ class MarkedPatternGraph(object):
 
     def add_nodes(self, nodes):
         self.nodes = list(set(self.nodes).union(set(nodes)))
+        self._changed('add_nodes', list(nodes))
 
     def add_marked_arrows(self, marked_arrows):
         """
@@ -123,6 +190,9 @@ class MarkedPatternGraph(object):
         self.dict[node_2][self.NO_ARROWHEAD] = \
             self.dict[node_2][self.NO_ARROWHEAD].union(set({node_1}))
 
+        self._index_pair(node_1, node_2)
+        self._changed('add_undirected_edge', (node_1, node_2))
+
     def add_undirected_edges(self, undirected_edges):
         """
             Parameters:
@@ -155,6 +225,9 @@ class MarkedPatternGraph(object):
         self.dict[node_2][self.NO_ARROWHEAD] = \
             self.dict[node_2][self.NO_ARROWHEAD] - set({node_1})
 
+        self._index_pair(node_1, node_2)
+        self._changed('remove_undirected_edge', (node_1, node_2))
+
     def add_bidirectional_edges(self, bidirectional_edges):
         """
             Parameters:
@@ -212,6 +285,9 @@ class MarkedPatternGraph(object):
         self.dict[node_1][self.UNMARKED_ARROWHEAD] = \
             self.dict[node_1][self.UNMARKED_ARROWHEAD].union(set({node_2}))
 
+        self._index_pair(node_1, node_2)
+        self._changed('add_arrowhead', (node_1, node_2))
+
     def add_marked_arrowhead(self, node_tuple):
         """
             Parameters:
@@ -228,6 +304,9 @@ class MarkedPatternGraph(object):
         self.dict[node_1][self.MARKED_ARROWHEAD] = \
             self.dict[node_1][self.MARKED_ARROWHEAD].union(set({node_2}))
 
+        self._index_pair(node_1, node_2)
+        self._changed('add_marked_arrowhead', (node_1, node_2))
+
     def has_arrowhead(self, node_tuple):
         """
             If the edge has an arrowhead pointing to the second node, return
@@ -308,52 +387,48 @@ class MarkedPatternGraph(object):
     def has_path(self, node_tuple):
         node_1, node_2 = self._instantiate_node_tuple(node_tuple)
 
-        visited = {}
-
-        self._is_node_in_path(
-            node_to_find=node_2,
-            journey_node=node_1,
-            visited=visited
-        )
+        # Iterative, so that long chains don't hit the recursion limit. To
+        # check many pairs, see graphs.union_find.connected_components.
+        visited = set({})
+        to_visit = [node_1]
 
-        return node_2 in visited
+        while len(to_visit) > 0:
+            journey_node = to_visit.pop()
 
-    def _is_node_in_path(self, node_to_find, journey_node, visited):
-        for neighbor in list(self.get_neighbors(journey_node)):
-            if neighbor in visited:
-                continue
+            for neighbor in self.get_neighbors(journey_node):
+                if neighbor == node_2:
+                    return True
 
-            visited[neighbor] = True
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    to_visit.append(neighbor)
 
-            if node_to_find == neighbor:
-                return
-
-            self._is_node_in_path(
-                node_to_find=node_to_find,
-                journey_node=neighbor,
-                visited=visited,
-            )
+        return False
 
     def _is_node_certainly_a_descendant(self, node, possibly_a_descendant_node):
-        children = list(self.dict[node][self.MARKED_ARROWHEAD])
+        # Iterative, and follows every marked child (not just the first).
+        visited = set({node})
+        to_visit = [node]
 
-        for child in children:
-            if child == possibly_a_descendant_node:
-                return True
+        while len(to_visit) > 0:
+            for child in self._marked_children(to_visit.pop()):
+                if child == possibly_a_descendant_node:
+                    return True
 
-            return self._is_node_certainly_a_descendant(child, possibly_a_descendant_node)
+                if child not in visited:
+                    visited.add(child)
+                    to_visit.append(child)
 
         return False
 
-    def get_edges(self):
-        edges = set({})
+    def _marked_children(self, node):
+        if node not in self.dict:
+            return set({})
 
-        for node, ends in self.dict.items():
-            for arrowhead_type in self.ARROWHEAD_TYPES:
-                for other_node in list(ends[arrowhead_type]):
-                    edges = edges.union(set({frozenset({node, other_node})}))
+        return self.dict[node][self.MARKED_ARROWHEAD]
 
-        return edges
+    def get_edges(self):
+        return SetView(self.edge_index['edges'])
 
     def get_edge(self, node_1, node_2):
         if node_1 not in self.dict or node_2 not in self.dict:
@@ -391,7 +466,7 @@ class MarkedPatternGraph(object):
             return neighbors
 
         for arrowhead_type in self.ARROWHEAD_TYPES:
-            neighbors = neighbors.union(self.dict[node][arrowhead_type])
+            neighbors.update(self.dict[node][arrowhead_type])
 
         return neighbors
 
@@ -428,45 +503,121 @@ class MarkedPatternGraph(object):
         return nodes
 
     def get_undirected_edges(self):
-        undirected_edges = set({})
+        return SetView(self.edge_index['undirected_edges'])
 
-        for node, ends in self.dict.items():
-            for other_node in list(ends[self.NO_ARROWHEAD]):
-                if self.dict[other_node][self.NO_ARROWHEAD].intersection(set({node})) != set({}):
-                    undirected_edges = undirected_edges.union(set({frozenset({node, other_node})}))
+    def get_unmarked_arrows(self):
+        return SetView(self.edge_index['unmarked_arrows'])
 
-        return undirected_edges
+    def get_marked_arrows(self):
+        return SetView(self.edge_index['marked_arrows'])
 
-    def get_unmarked_arrows(self):
-        unmarked_arrows = set({})
+    def get_bidirectional_edges(self):
+        return SetView(self.edge_index['bidirectional_edges'])
 
-        for node, ends in self.dict.items():
-            for other_node in list(ends[self.UNMARKED_ARROWHEAD]):
-                if self.dict[other_node][self.NO_ARROWHEAD].intersection(set({node})) != set({}):
-                    unmarked_arrows = unmarked_arrows.union(set({(node, other_node)}))
+    def record_mutations(self, record=True):
+        """
+            Starts recording the changes made to the graph, so that
+            snapshots of it can be taken cheaply (see snapshot), or stops
+            if record is False. Snapshots taken so far stay valid.
+        """
+        if not record:
+            self.mutation_log = None
+            self._recording_base = None
+            return
 
-        return unmarked_arrows
+        self._recording_base = self.copy()
+        self.mutation_log = []
 
-    def get_marked_arrows(self):
-        marked_arrows = set({})
+    def snapshot(self):
+        """
+            Returns: GraphSnapshot
+                The graph as it is now. Nothing gets copied: the snapshot
+                points at a position in the mutation log, and the graph gets
+                rebuilt from it when asked for.
 
-        for node, ends in self.dict.items():
-            for other_node in list(ends[self.MARKED_ARROWHEAD]):
-                marked_arrows = marked_arrows.union(set({(node, other_node)}))
+                If changes aren't being recorded, the snapshot holds a copy
+                of the graph instead.
+        """
+        if self.mutation_log is None:
+            return GraphSnapshot(base=self.copy(), mutation_log=[], length=0)
 
-        return marked_arrows
+        return GraphSnapshot(
+            base=self._recording_base,
+            mutation_log=self.mutation_log,
+            length=len(self.mutation_log)
+        )
 
-    def get_bidirectional_edges(self):
-        bidirectional_edges = set({})
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['mutation_log'] = None
+        state['_recording_base'] = None
+
+        return state
+
+    def _changed(self, method_name, args):
+        self.version += 1
+
+        if self.mutation_log is not None:
+            self.mutation_log.append((method_name, args))
+
+    def _instantiate_storage(self):
+        self.dict = {}
+        self.edge_index = {
+            'edges': set(),
+            'undirected_edges': set(),
+            'unmarked_arrows': set(),
+            'marked_arrows': set(),
+            'bidirectional_edges': set(),
+        }
+
+    def _index_pair(self, node_1, node_2):
+        """
+            Updates the edge indexes for the pair, after its marks changed.
+        """
+        ends_1 = self.dict[node_1]
+        ends_2 = self.dict[node_2]
+        pair = frozenset({node_1, node_2})
 
-        for node, ends in self.dict.items():
-            for other_node in list(ends[self.UNMARKED_ARROWHEAD]):
-                if self.dict[other_node][self.UNMARKED_ARROWHEAD].intersection(set({node})) != set({}):
-                    bidirectional_edges = bidirectional_edges.union(
-                        set({frozenset({node, other_node})})
-                    )
+        def update(index, edge, present):
+            if present:
+                self.edge_index[index].add(edge)
+            else:
+                self.edge_index[index].discard(edge)
 
-        return bidirectional_edges
+        update(
+            'edges',
+            pair,
+            any(
+                node_2 in ends_1[arrowhead_type]
+                or node_1 in ends_2[arrowhead_type]
+                for arrowhead_type in self.ARROWHEAD_TYPES
+            )
+        )
+        update(
+            'undirected_edges',
+            pair,
+            node_2 in ends_1[self.NO_ARROWHEAD]
+            and node_1 in ends_2[self.NO_ARROWHEAD]
+        )
+        update(
+            'bidirectional_edges',
+            pair,
+            node_2 in ends_1[self.UNMARKED_ARROWHEAD]
+            and node_1 in ends_2[self.UNMARKED_ARROWHEAD]
+        )
+
+        for from_node, to_node in [(node_1, node_2), (node_2, node_1)]:
+            update(
+                'unmarked_arrows',
+                (from_node, to_node),
+                to_node in self.dict[from_node][self.UNMARKED_ARROWHEAD]
+                and from_node in self.dict[to_node][self.NO_ARROWHEAD]
+            )
+            update(
+                'marked_arrows',
+                (from_node, to_node),
+                to_node in self.dict[from_node][self.MARKED_ARROWHEAD]
+            )
 
     def _instantiate_dict_for_var(self, var):
         self.dict[var] = {
@@ -541,7 +692,7 @@ class MarkedPatternGraph(object):
         return set(mi)
 
     def copy(self):
-        return MarkedPatternGraph(
+        return type(self)(
             nodes=self.get_nodes(),
             marked_arrows=self.get_marked_arrows(),
             unmarked_arrows=self.get_unmarked_arrows(),
@@ -569,3 +720,34 @@ class MarkedPatternGraph(object):
                 ) \
 
 
+class GraphSnapshot(object):
+    """
+        A graph as it was at some point, stored as the graph at the start of
+        a recording plus the number of changes made since. The log is shared
+        with the graph being recorded, which only ever appends to it.
+
+        Parameters:
+            base: MarkedPatternGraph
+                The graph when recording started. Not changed.
+            mutation_log: list[tuple]
+                The changes (method name, arguments) made since.
+            length: int
+                How many of them the snapshot includes.
+    """
+    def __init__(self, base, mutation_log, length):
+        self.base = base
+        self.mutation_log = mutation_log
+        self.length = length
+
+    def graph(self):
+        """
+            Returns: MarkedPatternGraph
+                A new graph, equal to the recorded one at the time of the
+                snapshot.
+        """
+        graph = self.base.copy()
+
+        for method_name, args in self.mutation_log[:self.length]:
+            getattr(graph, method_name)(args)
+
+        return graph
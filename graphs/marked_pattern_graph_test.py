@@ -1,3 +1,4 @@
+import pickle
 import pytest
 from causal_discovery.graphs.marked_pattern.edges import UndirectedEdge, UnmarkedArrow, MarkedArrow, NoEdge
 from causal_discovery.graphs.marked_pattern_graph import MarkedPatternGraph
@@ -35,6 +36,16 @@ def test_has_path_when_there_is_a_longer_one():
 
     assert graph.has_path(('x', 'y')) == True
 
+def test_has_path_on_a_long_chain():
+    nodes = ['x{}'.format(i) for i in range(5000)]
+    graph = MarkedPatternGraph(
+        nodes=nodes + ['y'],
+        undirected_edges=list(zip(nodes[:-1], nodes[1:]))
+    )
+
+    assert graph.has_path(('x0', 'x4999')) == True
+    assert graph.has_path(('x0', 'y')) == False
+
 def test_equals_same():
     var_names = ['a', 'b', 'c', 'd', 'e']
 
@@ -480,3 +491,73 @@ def test_undirected_complete():
     assert isinstance(graph.get_edge('a', 'b'), UndirectedEdge)
     assert isinstance(graph.get_edge('a', 'c'), UndirectedEdge)
     assert isinstance(graph.get_edge('c', 'b'), UndirectedEdge)
+
+def test_version_goes_up_on_changes():
+    graph = MarkedPatternGraph(nodes=['x', 'y', 'z'], undirected_edges=[('x', 'y')])
+    version = graph.version
+
+    graph.get_neighbors('x')
+    assert graph.version == version
+
+    graph.add_marked_arrowhead(('x', 'y'))
+    assert graph.version > version
+    version = graph.version
+
+    graph.remove_undirected_edge(('x', 'y'))
+    assert graph.version > version
+
+def test_edge_getters_are_read_only_live_views():
+    graph = MarkedPatternGraph(nodes=['x', 'y', 'z'], undirected_edges=[('x', 'y')])
+    undirected_edges = graph.get_undirected_edges()
+    unmarked_arrows = graph.get_unmarked_arrows()
+
+    assert not hasattr(undirected_edges, 'add')
+
+    graph.add_arrowhead(('x', 'y'))
+    graph.add_undirected_edge(('y', 'z'))
+
+    assert undirected_edges == set({frozenset({'y', 'z'})})
+    assert unmarked_arrows == set({('x', 'y')})
+    assert graph.get_edges() - undirected_edges == set({frozenset({'x', 'y'})})
+
+def test_snapshots_rebuild_the_graph_at_the_time_they_were_taken():
+    graph = MarkedPatternGraph(nodes=['x', 'y', 'z'], undirected_edges=[('x', 'y')])
+    graph.record_mutations()
+    before = graph.copy()
+    snapshot = graph.snapshot()
+
+    graph.add_undirected_edge(('y', 'z'))
+    graph.add_marked_arrowhead(('x', 'y'))
+    after = graph.copy()
+    later_snapshot = graph.snapshot()
+
+    graph.remove_undirected_edge(('y', 'z'))
+    graph.record_mutations(False)
+    graph.add_arrowhead(('y', 'x'))
+
+    assert snapshot.graph() == before
+    assert later_snapshot.graph() == after
+    assert later_snapshot.graph() is not later_snapshot.graph()
+    assert graph.mutation_log is None
+
+
+def test_pickling_leaves_the_recording_out():
+    graph = MarkedPatternGraph(nodes=['x', 'y'], undirected_edges=[('x', 'y')])
+    graph.record_mutations()
+    graph.add_arrowhead(('x', 'y'))
+
+    unpickled = pickle.loads(pickle.dumps(graph))
+
+    assert unpickled == graph
+    assert unpickled.mutation_log is None
+    assert graph.mutation_log == [('add_arrowhead', ('x', 'y'))]
+    assert unpickled.snapshot().graph() == graph
+
+def test_has_marked_path_through_any_child():
+    graph = MarkedPatternGraph(
+        nodes=['a', 'b', 'c', 'd'],
+        marked_arrows=[('a', 'b'), ('a', 'c'), ('c', 'd')]
+    )
+
+    assert graph.has_marked_path(('a', 'd'))
+    assert not graph.has_marked_path(('d', 'a'))
@@ -0,0 +1,96 @@
+"""
+    union_find.py
+
+    Disjoint sets, used for answering "is there a path between these two
+    nodes?" in constant time once the connected components of a graph are
+    known.
+
+    - UnionFind
+    - connected_components
+"""
+
+class UnionFind(object):
+    """
+        Disjoint sets of items, with path compression and union by size.
+
+        Parameters:
+            items: iterable
+                Each item starts in a set of its own.
+    """
+    def __init__(self, items=()):
+        self.parents = {}
+        self.sizes = {}
+
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """
+            Puts item in a set of its own, if it isn't in a set already.
+        """
+        if item not in self.parents:
+            self.parents[item] = item
+            self.sizes[item] = 1
+
+    def find(self, item):
+        """
+            Returns: the representative of the set of item.
+        """
+        root = item
+
+        while self.parents[root] != root:
+            root = self.parents[root]
+
+        while self.parents[item] != root:
+            self.parents[item], item = root, self.parents[item]
+
+        return root
+
+    def union(self, item_1, item_2):
+        """
+            Merges the sets of the two items.
+        """
+        root_1 = self.find(item_1)
+        root_2 = self.find(item_2)
+
+        if root_1 == root_2:
+            return
+
+        if self.sizes[root_1] < self.sizes[root_2]:
+            root_1, root_2 = root_2, root_1
+
+        self.parents[root_2] = root_1
+        self.sizes[root_1] += self.sizes[root_2]
+
+    def connected(self, item_1, item_2):
+        """
+            Returns: bool
+                Whether the two items are in the same set. Items that were
+                never added aren't connected to anything.
+        """
+        if item_1 not in self.parents or item_2 not in self.parents:
+            return False
+
+        return self.find(item_1) == self.find(item_2)
+
+
+def connected_components(graph):
+    """
+        Parameters:
+            graph:
+                responds to:
+                    - get_nodes()
+                    - get_neighbors(node)
+
+        Returns: UnionFind
+            Two nodes are connected if there's a path between them, whatever
+            the types of the edges along it.
+    """
+    components = UnionFind(graph.get_nodes())
+
+    for node in graph.get_nodes():
+        for neighbor in graph.get_neighbors(node):
+            components.add(neighbor)
+            components.union(node, neighbor)
+
+    return components
@@ -0,0 +1,34 @@
+import pytest
+from causal_discovery.graphs.marked_pattern_graph import MarkedPatternGraph
+from causal_discovery.graphs.union_find import UnionFind, connected_components
+
+def test_union_find():
+    union_find = UnionFind(['a', 'b', 'c', 'd'])
+
+    union_find.union('a', 'b')
+    union_find.union('c', 'd')
+
+    assert union_find.connected('a', 'b')
+    assert not union_find.connected('a', 'c')
+
+    union_find.union('b', 'd')
+
+    assert union_find.connected('a', 'c')
+    assert not union_find.connected('a', 'e')
+
+def test_connected_components_match_has_path():
+    graph = MarkedPatternGraph(
+        nodes=['a', 'b', 'c', 'd', 'e', 'f', 'MI_a'],
+        undirected_edges=[('a', 'b')],
+        unmarked_arrows=[('b', 'c')],
+        marked_arrows=[('d', 'MI_a')],
+        bidirectional_edges=[('e', 'd')]
+    )
+
+    components = connected_components(graph)
+
+    for node_1 in graph.get_nodes():
+        for node_2 in graph.get_nodes():
+            if node_1 != node_2:
+                assert components.connected(node_1, node_2) == \
+                    graph.has_path((node_1, node_2))
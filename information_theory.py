@@ -7,6 +7,8 @@
     Available functions
     -------------------
 
+    - counts
+    - total_count
     - entropy
     - conditional_entropy
     - conditional_mutual_information
@@ -14,11 +16,50 @@
     - regret
     - sci_is_independent
 
+    Every function that takes data also takes "weights", the number of
+    observations each row stands for, so that data can be a count table
+    instead of raw rows. The results are the same as for the data where each
+    row is repeated as many times as its weight.
+
 """
 
 import numpy as np
+import pandas as pd
+
+def counts(data, variables, weights=None):
+    """
+        Number of observations of each combination of values of the
+        variables. Rows with missing values for any of the variables are left
+        out.
+
+        Parameters:
+            data : pandas.DataFrame
+            variables: list[str]
+            weights: array-like. Defaults to None.
+                The number of observations each row stands for. If None, each
+                row counts once.
+
+        Returns: pandas.Series
+            Indexed by the combinations of values of the variables.
+    """
+    if weights is None:
+        weights = np.ones(data.shape[0])
+
+    return pd.Series(np.asarray(weights), index=data.index)\
+        .groupby([data[variable] for variable in variables])\
+        .sum()
+
+def total_count(data, weights=None):
+    """
+        Returns: float
+            The number of observations in data.
+    """
+    if weights is None:
+        return data.shape[0]
+
+    return np.asarray(weights).sum()
 
-def entropy(data, variables=[], base_2=False):
+def entropy(data, variables=[], base_2=False, weights=None):
     """
         Computes Shannon entropy.
 
@@ -29,6 +70,9 @@ def entropy(data, variables=[], base_2=False):
             variables: list[str]
                 A list of variable names to include in the entropy calculation.
 
+            weights: array-like. Defaults to None.
+                The number of observations each row stands for.
+
         Examples:
             Say that X is multinomially distributed with 4 classes, and they are
             uniformly distributed. The Shannon entropy is:
@@ -58,24 +102,25 @@ def entropy(data, variables=[], base_2=False):
             >>> assert calc.calculate() == approx(2, abs=0.01)
     """
 
-    data = data.copy()
-    count_col_name = 'tmp. count'
-    data[count_col_name] = 0
-    total_count = data.shape[0]
-
     assert len(variables) > 0
 
-    variable_counts = data.groupby(list(variables)).count()
-    probas = variable_counts / total_count
+    variable_counts = counts(data, list(variables), weights)
+    probas = variable_counts[variable_counts > 0] / total_count(data, weights)
 
     if base_2:
         log_func = np.log2
     else:
         log_func = np.log
 
-    return -(probas * log_func(probas)).sum()[count_col_name]
+    return -(probas * log_func(probas)).sum()
 
-def conditional_entropy(data, conditioning_set=[], variables=[], base_2=False):
+def conditional_entropy(
+    data,
+    conditioning_set=[],
+    variables=[],
+    base_2=False,
+    weights=None
+):
     """
         Computes H(X | Y) = H(X,Y) - H(Y) where Y is the conditioning_set and X
         and Y are the variables.
@@ -96,6 +141,9 @@ def conditional_entropy(data, conditioning_set=[], variables=[], base_2=False):
                 entropy for the set of variables (i.e. instead of computing
                 H(X|Y), it'll return H(X), the entropy of X).
 
+            weights: array-like. Defaults to None.
+                The number of observations each row stands for.
+
         Examples:
             Say there's a variable X and Y and they are independent. X and Y are
             multinomial variables with 4 possible values:
@@ -145,7 +193,12 @@ def conditional_entropy(data, conditioning_set=[], variables=[], base_2=False):
     assert len(set(variables)) > 0
 
     if len(conditioning_set) == 0:
-        return entropy(data=data, variables=variables, base_2=base_2)
+        return entropy(
+            data=data,
+            variables=variables,
+            base_2=base_2,
+            weights=weights
+        )
 
     vars_and_conditioning_set = \
         list(set(variables).union(set(conditioning_set)))
@@ -153,14 +206,23 @@ def conditional_entropy(data, conditioning_set=[], variables=[], base_2=False):
     return entropy(
                data=data,
                variables=vars_and_conditioning_set,
-               base_2=base_2
+               base_2=base_2,
+               weights=weights
            ) - entropy(
                data=data,
                variables=conditioning_set,
-               base_2=base_2
+               base_2=base_2,
+               weights=weights
            )
 
-def conditional_mutual_information(data, vars_1, vars_2, conditioning_set=[], base_2=False):
+def conditional_mutual_information(
+    data,
+    vars_1,
+    vars_2,
+    conditioning_set=[],
+    base_2=False,
+    weights=None
+):
     """
         Computes I(X;Y|Z) = H(X|Z) - H(X|Y,Z). Essentially, this tells us
         whether or not Y tells us something about X, after we've known about
@@ -181,6 +243,8 @@ def conditional_mutual_information(data, vars_1, vars_2, conditioning_set=[], ba
 
                 If conditioning_set is empty, this computes mutual information:
                 I(X;Y) = H(X) - H(X|Y).
+            weights: array-like. Defaults to None.
+                The number of observations each row stands for.
 
         Examples:
             Ex 1: Say there's a variable X and Y and they are independent. X
@@ -255,12 +319,14 @@ def conditional_mutual_information(data, vars_1, vars_2, conditioning_set=[], ba
         data=data,
         variables=vars_1,
         conditioning_set=conditioning_set,
-        base_2=base_2
+        base_2=base_2,
+        weights=weights
     ) - conditional_entropy(
         data=data,
         variables=vars_1,
         conditioning_set=list(set(conditioning_set).union(vars_2)),
-        base_2=base_2
+        base_2=base_2,
+        weights=weights
     )
 
 def multinomial_normalizing_sum(num_classes, sample_size, d=10):
@@ -300,30 +366,25 @@ def multinomial_normalizing_sum(num_classes, sample_size, d=10):
 
     return summation
 
-def regret(data, variables=[], conditioning_set=[]):
+def regret(data, variables=[], conditioning_set=[], weights=None):
     assert len(variables) > 0
 
-    data_copy = data.copy()
-    data_copy['tmp counts'] = 0
-
-    num_classes = data_copy.groupby(variables).count().shape[0]
+    variable_counts = counts(data, variables, weights)
+    num_classes = (variable_counts > 0).sum()
 
     if len(conditioning_set) == 0:
         return np.log(
             multinomial_normalizing_sum(
                 num_classes=num_classes,
-                sample_size=data.shape[0]
+                sample_size=total_count(data, weights)
             )
         )
 
-    conditioning_set_counts = \
-        data_copy.\
-        groupby(conditioning_set).\
-        count()[['tmp counts']]
+    conditioning_set_counts = counts(data, conditioning_set, weights)
 
     summation = 0
 
-    for indices, count in conditioning_set_counts.iterrows():
+    for count in conditioning_set_counts[conditioning_set_counts > 0]:
         summation += np.log(
             multinomial_normalizing_sum(
                 num_classes=num_classes,
@@ -331,13 +392,14 @@ def regret(data, variables=[], conditioning_set=[]):
             )
         )
 
-    return summation['tmp counts']
+    return summation
 
 def stochastic_complexity_score(
     testwise_deleted_data,
     vars_1,
     vars_2,
     conditioning_set,
-    sample_size
+    sample_size,
+    weights=None
 ):
-    return sample_size *  conditional_mutual_information( data=testwise_deleted_data, vars_1=vars_1, vars_2=vars_2, conditioning_set=conditioning_set) + regret( data=testwise_deleted_data, variables=vars_1, conditioning_set=conditioning_set) - regret( data=testwise_deleted_data, variables=vars_1, conditioning_set=list(set(conditioning_set).union(vars_2)))
+    return sample_size *  conditional_mutual_information( data=testwise_deleted_data, vars_1=vars_1, vars_2=vars_2, conditioning_set=conditioning_set, weights=weights) + regret( data=testwise_deleted_data, variables=vars_1, conditioning_set=conditioning_set, weights=weights) - regret( data=testwise_deleted_data, variables=vars_1, conditioning_set=list(set(conditioning_set).union(vars_2)), weights=weights)
@@ -3,7 +3,8 @@ import numpy as np
 import pytest
 from pytest import approx
 from causal_discovery.information_theory import entropy,\
-    conditional_entropy, multinomial_normalizing_sum, conditional_mutual_information
+    conditional_entropy, multinomial_normalizing_sum, conditional_mutual_information,\
+    regret
 from causal_discovery.constraint_based.ci_tests.sci_is_independent import sci_is_independent
 
 def test_entropy_uniform_multinomial_with_4_possible_values_size_10000():
@@ -108,3 +109,51 @@ def test_binomial_example_with_10_data_points_mns0():
     mns = multinomial_normalizing_sum(num_classes=2, sample_size=2)
 
     assert mns == approx(2.5, abs=0.01)
+
+def test_weights_of_count_table_match_raw_rows(
+    df_Z_causes_X_and_Y
+):
+    data = df_Z_causes_X_and_Y(size=500)
+    data.loc[:20, 'x'] = np.nan
+
+    count_table = data.groupby(['x', 'y', 'z'], dropna=False).size()
+    table = count_table.index.to_frame(index=False)
+    weights = count_table.values
+
+    assert entropy(data=table, variables=['x', 'y'], weights=weights) \
+        == approx(entropy(data=data, variables=['x', 'y']))
+
+    assert conditional_entropy(
+        data=table,
+        variables=['x'],
+        conditioning_set=['z'],
+        weights=weights
+    ) == approx(conditional_entropy(
+        data=data,
+        variables=['x'],
+        conditioning_set=['z']
+    ))
+
+    assert conditional_mutual_information(
+        data=table,
+        vars_1=['x'],
+        vars_2=['y'],
+        conditioning_set=['z'],
+        weights=weights
+    ) == approx(conditional_mutual_information(
+        data=data,
+        vars_1=['x'],
+        vars_2=['y'],
+        conditioning_set=['z']
+    ))
+
+    assert regret(
+        data=table,
+        variables=['x'],
+        conditioning_set=['y', 'z'],
+        weights=weights
+    ) == approx(regret(
+        data=data,
+        variables=['x'],
+        conditioning_set=['y', 'z']
+    ))